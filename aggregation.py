@@ -0,0 +1,123 @@
+"""Tổng hợp thống kê PR theo cột - nhóm theo một hoặc nhiều chiều bất kỳ trên dữ liệu đã cache"""
+from array import array
+from datetime import date
+
+# Các chiều có thể nhóm: tên chiều -> trường của bản ghi PR
+DIMENSIONS = ('developer', 'project', 'repo', 'label', 'day', 'week', 'month')
+_RECORD_FIELDS = {'developer': 'creator', 'project': 'project_id', 'repo': 'repo', 'day': 'created_at'}
+
+
+def _week_of(day):
+    year, week, _ = date.fromisoformat(day).isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+class _Dictionary:
+    """Mã hóa giá trị thành số nguyên (dictionary encoding)"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class ColumnarPRs:
+    """Bản ghi PR lưu thành các cột: mỗi chiều là mảng mã số nguyên, thời gian là mảng double.
+
+    Label là chiều nhiều giá trị nên lưu dạng CSR (offsets + codes): PR có n label đóng góp vào n nhóm."""
+
+    def __init__(self, records):
+        self.size = len(records)
+        self.estimate = array('d', (r['estimate_hours'] for r in records))
+        self.actual = array('d', (r['actual_hours'] for r in records))
+
+        self.values = {}
+        self.codes = {}
+        for dimension, field in _RECORD_FIELDS.items():
+            dictionary = _Dictionary()
+            self.codes[dimension] = array('i', (dictionary.encode(r.get(field) or 'Unknown') for r in records))
+            self.values[dimension] = dictionary.values
+
+        # Tuần/tháng suy ra từ danh sách ngày khác nhau (ít hơn nhiều so với số PR)
+        days = self.values['day']
+        for dimension, derive in (('week', _week_of), ('month', lambda day: day[:7])):
+            dictionary = _Dictionary()
+            day_to_code = array('i', (dictionary.encode(derive(day)) for day in days))
+            self.codes[dimension] = array('i', (day_to_code[code] for code in self.codes['day']))
+            self.values[dimension] = dictionary.values
+
+        labels = _Dictionary()
+        self.label_offsets = array('i', [0])
+        self.label_codes = array('i')
+        for r in records:
+            self.label_codes.extend(labels.encode(label) for label in r.get('labels', []))
+            self.label_offsets.append(len(self.label_codes))
+        self.values['label'] = labels.values
+
+    def _rows_and_codes(self, dimensions):
+        """Trả về (chỉ số dòng, mã nhóm kết hợp) - dòng bị lặp lại theo label nếu nhóm theo label"""
+        if 'label' in dimensions:
+            offsets = self.label_offsets
+            rows = array('i', (row for row in range(self.size) for _ in range(offsets[row + 1] - offsets[row])))
+        else:
+            rows = None
+
+        combined = None
+        for dimension in dimensions:
+            if dimension == 'label':
+                codes = self.label_codes
+            elif rows is not None:
+                dimension_codes = self.codes[dimension]
+                codes = [dimension_codes[row] for row in rows]
+            else:
+                codes = self.codes[dimension]
+            radix = len(self.values[dimension])
+            combined = list(codes) if combined is None else [c * radix + d for c, d in zip(combined, codes)]
+        return rows, combined
+
+    def group_by(self, dimensions):
+        """Nhóm theo danh sách chiều, trả về tổng số PR, thời gian và hiệu suất của mỗi nhóm"""
+        unknown = [d for d in dimensions if d not in DIMENSIONS]
+        if not dimensions or unknown:
+            raise ValueError(f'Invalid group_by: {", ".join(unknown) or "(empty)"} '
+                             f'(choose from {", ".join(DIMENSIONS)})')
+
+        rows, combined = self._rows_and_codes(dimensions)
+        if rows is None:
+            estimate, actual = self.estimate, self.actual
+        else:
+            estimate = [self.estimate[row] for row in rows]
+            actual = [self.actual[row] for row in rows]
+
+        totals = {}
+        for code, estimate_hours, actual_hours in zip(combined, estimate, actual):
+            group = totals.get(code)
+            if group is None:
+                totals[code] = [1, estimate_hours, actual_hours]
+            else:
+                group[0] += 1
+                group[1] += estimate_hours
+                group[2] += actual_hours
+
+        radixes = [len(self.values[d]) for d in dimensions]
+        groups = []
+        for code, (count, estimate_hours, actual_hours) in totals.items():
+            key = {}
+            for dimension, radix in zip(reversed(dimensions), reversed(radixes)):
+                code, value_code = divmod(code, radix)
+                key[dimension] = self.values[dimension][value_code]
+            groups.append({
+                'key': {dimension: key[dimension] for dimension in dimensions},
+                'total_prs': count,
+                'total_estimate': round(estimate_hours, 2),
+                'total_actual': round(actual_hours, 2),
+                'efficiency': round(estimate_hours / actual_hours * 100, 1) if actual_hours > 0 else 100
+            })
+        groups.sort(key=lambda g: tuple(g['key'][d] for d in dimensions))
+        return groups
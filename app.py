@@ -1,13 +1,37 @@
-from flask import Flask, render_template, request, jsonify, current_app
-from github import Github
+from flask import Flask, render_template, request, jsonify, current_app, redirect, url_for, Response, make_response, \
+    stream_with_context
 from github.PaginatedList import PaginatedList
+from werkzeug.datastructures import MultiDict
 import re
-from datetime import datetime, timedelta
+import copy
+from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
-from functools import lru_cache
 import time
 import sys
+import tempfile
+import threading
+import atexit
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from aggregation import DIMENSIONS, ColumnarPRs
+from cache_backend import create_cache_backend
+from export import EXPORT_FORMATS, stream_export
+from github_client import GitHubClientManager, HttpResponseCache
+from github_search import GraphQLSearchBackend, PartitionedCrawler, RestSearchBackend, SharedRateLimiter
+from jobs import JOB_DONE, JOB_ERROR, FetchProgress, JobStore
+from label_index import LabelIndex, fetch_org_labels
+from metrics import (MetricsRegistry, finish_request, github_endpoint, server_timing_header, span,
+                     start_request, timed_iter)
+from pr_index import PRIndex, normalize_labels
+from prewarm import LEADER_LOCK as PREWARM_LEADER_LOCK, PrewarmScheduler, QueryStats
+from pr_parser import convert_to_hours, get_project_id, parse_pr_batch, parse_pr_info
+from pr_record import compact_record, deep_sizeof
+from response_cache import ResponseCache
+from snapshot import SnapshotReader, SnapshotRestoringCache, remove_snapshot, write_snapshot
+from webhooks import WEBHOOK_EVENTS, WebhookPullRequest, WebhookQueue, verify_signature
 
 # Load biến môi trường từ file .env
 load_dotenv()
@@ -22,9 +46,127 @@ MAX_PRS = int(os.getenv('MAX_PRS', '1000'))
 CACHE_TIMEOUT = int(os.getenv('CACHE_TIMEOUT', '3600'))
 # Thời gian timeout cho GitHub API (60 giây)
 GITHUB_TIMEOUT = int(os.getenv('GITHUB_TIMEOUT', '60'))
+# Loại cache backend: sqlite (dùng chung giữa các worker) hoặc memory
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite')
+# Thư mục lưu cache dùng chung
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'review-ai-cache'))
+# Dung lượng tối đa của cache (mặc định 256MB), vượt quá sẽ xóa theo LRU
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+# Stale-while-revalidate: entry trẻ hơn CACHE_SOFT_TTL được coi là mới; từ CACHE_SOFT_TTL tới
+# CACHE_HARD_TTL vẫn trả về ngay và được làm mới ở nền; quá CACHE_HARD_TTL phải chờ fetch lại
+CACHE_SOFT_TTL = int(os.getenv('CACHE_SOFT_TTL', str(CACHE_TIMEOUT)))
+CACHE_HARD_TTL = max(CACHE_SOFT_TTL, int(os.getenv('CACHE_HARD_TTL', str(CACHE_SOFT_TTL * 4))))
+# Số thread làm mới cache ở nền
+REFRESH_WORKERS = int(os.getenv('REFRESH_WORKERS', '2'))
+# Thời gian tối đa chờ một lần fetch đang chạy ở worker khác (giây)
+FETCH_WAIT_TIMEOUT = int(os.getenv('FETCH_WAIT_TIMEOUT', '300'))
+# Làm mới tăng dần: khi cache hết hạn chỉ lấy các PR được cập nhật (updated:>=...) thay vì crawl lại
+INCREMENTAL_REFRESH = os.getenv('INCREMENTAL_REFRESH', '1') == '1'
+# Thời gian giữ entry đã hết hạn để làm mới tăng dần; sau khoảng này sẽ crawl lại toàn bộ (24 giờ)
+CACHE_RETENTION = int(os.getenv('CACHE_RETENTION', '86400'))
+# Khoảng lùi (giây) khi truy vấn updated:>= để không bỏ sót PR
+DELTA_REFRESH_OVERLAP = int(os.getenv('DELTA_REFRESH_OVERLAP', '300'))
+# Kết quả đã crawl đầy đủ quá khoảng này (giây) thì crawl lại toàn bộ thay vì làm mới tăng dần
+DELTA_REFRESH_MAX_AGE = int(os.getenv('DELTA_REFRESH_MAX_AGE', str(CACHE_RETENTION)))
+# Index PR cục bộ: trả lời truy vấn từ index, chỉ crawl GitHub cho các khoảng ngày chưa đồng bộ
+PR_INDEX_ENABLED = os.getenv('PR_INDEX_ENABLED', '1') == '1'
+# Thời gian một khoảng ngày đã đồng bộ được coi là còn hiệu lực (mặc định bằng CACHE_RETENTION)
+PR_INDEX_SYNC_TTL = int(os.getenv('PR_INDEX_SYNC_TTL', str(CACHE_RETENTION)))
+# Backend lấy PR: rest (search API qua PyGithub) hoặc graphql (search GraphQL, 100 PR/trang, chỉ lấy trường cần thiết).
+# id PR của hai backend khác nhau (issue id / pull request id) nên cache và index được tách riêng theo backend.
+FETCH_BACKEND = os.getenv('FETCH_BACKEND', 'rest')
+GITHUB_GRAPHQL_URL = os.getenv('GITHUB_GRAPHQL_URL', 'https://api.github.com/graphql')
+# URL gốc của GitHub REST API (GitHub Enterprise hoặc server giả lập trong benchmarks/); để trống dùng api.github.com
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', '')
+# Số thread crawl song song các trang/cửa sổ kết quả search
+CRAWL_WORKERS = int(os.getenv('CRAWL_WORKERS', '4'))
+# Giới hạn số request search mỗi phút của cả server, chia giữa các worker (GitHub cho phép 30 request/phút với token)
+SEARCH_RATE_LIMIT = int(os.getenv('SEARCH_RATE_LIMIT', '30'))
+# Số PR mỗi trang search (tối đa 100)
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '100'))
+# Số connection tối đa trong pool HTTP dùng chung tới GitHub
+GITHUB_POOL_SIZE = int(os.getenv('GITHUB_POOL_SIZE', str(max(10, CRAWL_WORKERS * 2))))
+# Khi số request search còn lại thấp hơn ngưỡng này, crawl sẽ giãn request tới thời điểm reset
+SEARCH_RATE_RESERVE = int(os.getenv('SEARCH_RATE_RESERVE', '3'))
+# Cache HTTP với ETag/Last-Modified cho các request GET tới GitHub (304 không tính vào rate limit)
+HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', '1') == '1'
+# Dung lượng tối đa của cache HTTP (mặc định 128MB)
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', str(128 * 1024 * 1024)))
+# Báo cáo chưa có trong cache được tạo bằng job chạy nền, trình duyệt poll tiến độ thay vì chờ request
+ASYNC_REPORTS = os.getenv('ASYNC_REPORTS', '1') == '1'
+# Số job báo cáo chạy đồng thời trong mỗi worker
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# Job không cập nhật tiến độ quá khoảng này (giây) được coi là đã chết
+JOB_STALE_TIMEOUT = int(os.getenv('JOB_STALE_TIMEOUT', '600'))
+# Làm nóng cache nền cho các truy vấn phổ biến
+PREWARM_ENABLED = os.getenv('PREWARM_ENABLED', '1') == '1'
+# Chu kỳ chạy scheduler (giây)
+PREWARM_INTERVAL = int(os.getenv('PREWARM_INTERVAL', '300'))
+# Số truy vấn phổ biến nhất được làm nóng
+PREWARM_TOP_N = int(os.getenv('PREWARM_TOP_N', '5'))
+# Chỉ tính các truy vấn được dùng trong khoảng này (giây)
+PREWARM_WINDOW = int(os.getenv('PREWARM_WINDOW', '604800'))
+# Phần rate limit tối đa prewarm được dùng: dừng khi budget còn lại dưới (1 - share)
+PREWARM_BUDGET_SHARE = float(os.getenv('PREWARM_BUDGET_SHARE', '0.5'))
+# Thời gian (giây) trước khi danh sách label của org được làm mới từ các repo
+LABEL_INDEX_TTL = int(os.getenv('LABEL_INDEX_TTL', '3600'))
+# Số org tối đa được giữ trong index label
+LABEL_INDEX_MAX_ORGS = int(os.getenv('LABEL_INDEX_MAX_ORGS', '20'))
+# Số repo được lấy label song song khi làm mới
+LABEL_FETCH_WORKERS = int(os.getenv('LABEL_FETCH_WORKERS', '8'))
+# Thời gian (giây) chờ trước khi thử lại khi làm mới label lỗi (VD: org không tồn tại hoặc sai tên)
+LABEL_RETRY_AFTER = int(os.getenv('LABEL_RETRY_AFTER', '300'))
+# Số truy vấn tối đa trong một yêu cầu so sánh và số org được fetch song song
+COMPARE_MAX_QUERIES = int(os.getenv('COMPARE_MAX_QUERIES', '20'))
+COMPARE_WORKERS = int(os.getenv('COMPARE_WORKERS', '4'))
+# Secret dùng để kiểm tra chữ ký webhook GitHub (webhook bị tắt nếu không cấu hình)
+GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET', '')
+# Số event webhook tối đa chờ xử lý
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+# Số PR mỗi lô khi export từ cache
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '500'))
+# Cache response đã render (HTML/JSON nén sẵn, ETag/304) theo phiên bản dữ liệu, trong bộ nhớ của từng worker
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', '1') == '1'
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Snapshot cache kết quả và index label ra đĩa (định kỳ và khi worker tắt); worker mới khôi phục từ snapshot
+# để phục vụ ngay. Đặt SNAPSHOT_PATH trên volume được giữ lại qua các lần deploy.
+# Mặc định chỉ bật với cache memory: cache sqlite đã nằm trên đĩa, snapshot chỉ là bản sao của nó
+SNAPSHOT_ENABLED = os.getenv('SNAPSHOT_ENABLED', '1' if CACHE_BACKEND == 'memory' else '0') == '1'
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', os.path.join(CACHE_DIR, 'cache_snapshot.bin'))
+# Chu kỳ ghi snapshot (giây), 0 = chỉ ghi khi worker tắt
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', '600'))
+# Thêm header Server-Timing (thời gian GitHub/parse/tổng hợp/render) vào mọi response
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING', '0') == '1'
 # Ngày bắt đầu mặc định (30 ngày trước)
 DEFAULT_SINCE_DATE = os.getenv('DEFAULT_SINCE_DATE', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
 
+# Số đo hiệu năng của process (xem /metrics)
+_metrics = MetricsRegistry()
+_github_request_seconds = _metrics.histogram(
+    'reviewai_github_request_seconds', 'Latency of GitHub API requests', ('endpoint', 'method', 'status'))
+_stage_seconds = _metrics.histogram(
+    'reviewai_stage_seconds', 'Time spent in each processing stage (github, parse, aggregate, render...)', ('stage',))
+_http_request_seconds = _metrics.histogram(
+    'reviewai_http_request_seconds', 'Latency of requests served by this worker', ('endpoint', 'status'))
+
+
+def observe_github_response(method, url, status, elapsed, headers):
+    _github_request_seconds.observe(elapsed, endpoint=github_endpoint(url), method=method.upper(), status=str(status))
+
+
+# Github client dùng chung cho cả process (connection pool + theo dõi rate limit)
+_github_clients = GitHubClientManager(
+    GITHUB_TOKEN, base_url=GITHUB_API_URL or None, pool_size=GITHUB_POOL_SIZE,
+    http_cache=HttpResponseCache(os.path.join(CACHE_DIR, 'http_cache.sqlite3'), HTTP_CACHE_MAX_BYTES)
+    if HTTP_CACHE_ENABLED else None,
+    on_response=observe_github_response)
+
+
+def get_github(timeout=GITHUB_TIMEOUT, per_page=30):
+    """Lấy Github client dùng chung"""
+    return _github_clients.get(timeout, per_page)
+
+
 def get_system_info():
     """Trả về thông tin hệ thống cho templates"""
     return {
@@ -33,210 +175,338 @@ def get_system_info():
         'debug': os.getenv('FLASK_DEBUG', '0') == '1'
     }
 
-def convert_to_hours(time_str):
-    if not time_str or time_str.strip().lower() == 'n/a':
-        return 0
+def build_search_query(org_name, label, since_date=None, until_date=None):
+    """Xây dựng query tìm kiếm PR cho GitHub search API"""
+    query = f'org:{org_name} is:pr'
 
-    time_str = time_str.strip().lower()
+    # Xử lý label (có thể là một hoặc nhiều label)
+    if isinstance(label, (list, tuple)) and label:
+        # Nếu là danh sách labels - sử dụng phép AND
+        label_conditions = [f'label:"{l}"' for l in label if l and l.strip()]
+        if label_conditions:
+            query += f' {" ".join(label_conditions)}'
+    elif label and isinstance(label, str):
+        # Nếu là một label duy nhất
+        query += f' label:"{label}"'
 
-    # Nếu là phút (30p, 45m)
-    minute_match = re.fullmatch(r'(\d+)[mp]', time_str)
-    if minute_match:
-        return round(float(minute_match.group(1)) / 60, 2)
+    if since_date:
+        query += f' created:>={since_date}'
 
-    # Nếu là giờ với định dạng số thực có đơn vị (1.5h, 1,5h)
-    hour_match = re.fullmatch(r'([0-9]+([.,][0-9]+)?)h', time_str)
-    if hour_match:
-        return float(hour_match.group(1).replace(',', '.'))
+    if until_date:
+        query += f' created:<={until_date}'
 
-    # Nếu là số thực không đơn vị (1.5, 1,5) hoặc số nguyên
-    number_match = re.fullmatch(r'([0-9]+([.,][0-9]+)?)', time_str)
-    if number_match:
-        return float(number_match.group(1).replace(',', '.'))
-        
-    # Kiểm tra thêm định dạng 'Xh Ym' hoặc 'X,Yh'
-    complex_time_match = re.fullmatch(r'([0-9]+)h\s+([0-9]+)[mp]', time_str)
-    if complex_time_match:
-        hours = float(complex_time_match.group(1))
-        minutes = float(complex_time_match.group(2))
-        return hours + round(minutes / 60, 2)
-        
-    # Kiểm tra định dạng '1,5' hoặc '1.5' không có đơn vị
-    decimal_match = re.search(r'([0-9]+[.,][0-9]+)', time_str)
-    if decimal_match:
-        return float(decimal_match.group(1).replace(',', '.'))
+    return query
 
-    return 0
 
+def build_pr_record(pr, parsed_data):
+    """Tạo bản ghi PR để lưu cache và hiển thị"""
+    # Lấy tên repo từ html_url (https://github.com/<org>/<repo>/pull/<number>) để tránh gọi thêm API
+    url_parts = pr.html_url.split('/')
+    return {
+        'id': pr.id,
+        'title': pr.title,
+        'issue_number': parsed_data['issue_number'],
+        'project_id': parsed_data['project_id'],
+        'estimate_time': parsed_data['estimate_time'],
+        'actual_time': parsed_data['actual_time'],
+        'estimate_hours': parsed_data['estimate_hours'],
+        'actual_hours': parsed_data['actual_hours'],
+        'creator': pr.user.login,
+        'created_at': pr.created_at.strftime('%Y-%m-%d'),
+        'repo': url_parts[4] if len(url_parts) > 4 else '',
+        'labels': [l.name for l in pr.labels],
+        'url': pr.html_url
+    }
 
-def get_project_id(issue_number):
-    """Trích xuất ID project từ issue number (VD: AIP123-456 -> AIP123)"""
-    if issue_number and issue_number != 'N/A':
-        match = re.match(r'(AIP\d+)', issue_number, re.IGNORECASE)
-        if match:
-            return match.group(1).upper()  # Chuẩn hóa về dạng viết hoa
-    return 'Unknown'
 
+def new_stats():
+    """Tạo cấu trúc thống kê rỗng"""
+    return {'total_estimate': 0, 'total_actual': 0, 'developers': {}, 'projects': {}}
 
-def parse_pr_info(pr):
-    # Parse issue number - tìm trong cả title và body
-    issue_match = re.search(r'AIP\d+-\d+', pr.title, re.IGNORECASE) or re.search(r'AIP\d+-\d+', pr.body or '',
-                                                                                 re.IGNORECASE)
-    issue_number = issue_match.group(0).upper() if issue_match else "N/A"  # Chuẩn hóa về dạng viết hoa
 
-    # Parse estimate time từ body
-    time_pattern = r'(?:Est(?:imate)?|Actual)\s*Time:?\s*([0-9]+([.,][0-9]+)?)[hpm]'
-    times = re.finditer(time_pattern, pr.body or '', re.IGNORECASE)
+def add_record_to_stats(stats, record, sign=1):
+    """Cộng (sign=1) hoặc trừ (sign=-1) đóng góp của một PR vào thống kê.
 
-    estimate_time = "N/A"
-    actual_time = "N/A"
+    Danh sách developers của project chỉ được thêm vào ở đây; khi trừ cần gọi
+    refresh_project_developers để tính lại."""
+    dev = record['creator']
+    estimate_hours = record['estimate_hours']
+    actual_hours = record['actual_hours']
 
-    for match in times:
-        # Extract the full time value including the unit (h, m, p)
-        full_match = match.group(0)
-        time_value = match.group(1)  # This is just the number part (e.g., "1,5")
-        
-        # Add the unit back to make it compatible with convert_to_hours
-        if 'h' in full_match.lower():
-            time_value = time_value + 'h'
-        elif 'm' in full_match.lower() or 'p' in full_match.lower():
-            time_value = time_value + 'm'
-            
-        # Check if it's an estimate time (both full 'estimate' and abbreviated 'est' forms)
-        if 'est' in full_match.lower() and not full_match.lower().startswith('actual'):
-            estimate_time = time_value
-        elif 'actual' in full_match.lower():
-            actual_time = time_value
-
-    # Chuyển đổi thời gian sang giờ
-    estimate_hours = convert_to_hours(estimate_time)
-    actual_hours = convert_to_hours(actual_time)
-
-    # Lấy project ID
-    project_id = get_project_id(issue_number)
-
-    parsed_result = {
-        'issue_number': issue_number,
-        'project_id': project_id,
-        'estimate_time': f"{estimate_hours}h",
-        'actual_time': f"{actual_hours}h",
-        'estimate_hours': estimate_hours,
-        'actual_hours': actual_hours
+    # Cập nhật thống kê theo developer
+    developers_stats = stats['developers']
+    if dev not in developers_stats:
+        developers_stats[dev] = {'total_prs': 0, 'total_estimate': 0, 'total_actual': 0}
+    developers_stats[dev]['total_prs'] += sign
+    developers_stats[dev]['total_estimate'] += sign * estimate_hours
+    developers_stats[dev]['total_actual'] += sign * actual_hours
+    if developers_stats[dev]['total_prs'] <= 0:
+        del developers_stats[dev]
+
+    # Cập nhật thống kê theo project
+    project = record['project_id']
+    projects_stats = stats['projects']
+    if project not in projects_stats:
+        projects_stats[project] = {
+            'total_prs': 0,
+            'total_estimate': 0,
+            'total_actual': 0,
+            'developers': []
+        }
+    projects_stats[project]['total_prs'] += sign
+    projects_stats[project]['total_estimate'] += sign * estimate_hours
+    projects_stats[project]['total_actual'] += sign * actual_hours
+    if sign > 0 and dev not in projects_stats[project]['developers']:
+        projects_stats[project]['developers'].append(dev)
+        projects_stats[project]['developers'].sort()
+    if projects_stats[project]['total_prs'] <= 0:
+        del projects_stats[project]
+
+    # Cập nhật tổng thời gian
+    stats['total_estimate'] += sign * estimate_hours
+    stats['total_actual'] += sign * actual_hours
+
+
+def refresh_project_developers(stats, prs_data, projects):
+    """Tính lại danh sách developers cho các project (sau khi trừ PR khỏi thống kê)"""
+    developers = {project: set() for project in projects if project in stats['projects']}
+    for record in prs_data:
+        if record['project_id'] in developers:
+            developers[record['project_id']].add(record['creator'])
+    for project, devs in developers.items():
+        stats['projects'][project]['developers'] = sorted(devs)
+
+
+def build_result(prs_data, stats, actual_total, total_count, timestamp=None):
+    """Đóng gói kết quả để lưu cache và render"""
+    timestamp = timestamp or time.time()
+    return {
+        # Bản ghi gọn (__slots__, chuỗi intern) để nhiều kết quả cache tốn ít bộ nhớ
+        'prs_data': [compact_record(record) for record in prs_data],
+        'stats': {
+            'total_prs': len(prs_data),
+            'total_prs_found': actual_total,  # Thêm tổng số PRs tìm thấy
+            'total_prs_processed': total_count,  # Thêm tổng số PRs đã xử lý
+            'total_estimate': round(stats['total_estimate'], 2),
+            'total_actual': round(stats['total_actual'], 2),
+            'developers': stats['developers'],
+            'projects': stats['projects']
+        },
+        'timestamp': timestamp,
+        # Thời điểm crawl đầy đủ gần nhất (delta refresh giữ nguyên giá trị này)
+        'full_fetch_at': timestamp
     }
-    return parsed_result
 
-def fetch_and_parse_prs_internal(org_name, label, since_date, until_date=None):
+
+def create_crawler():
+    """Tạo crawler theo FETCH_BACKEND, dùng rate limiter search chung của process"""
+    if FETCH_BACKEND == 'graphql':
+        backend = GraphQLSearchBackend(GITHUB_TOKEN, GITHUB_GRAPHQL_URL, GITHUB_TIMEOUT, session=_github_clients)
+        resource = 'graphql'
+    else:
+        backend = RestSearchBackend(get_github(per_page=SEARCH_PAGE_SIZE), SEARCH_PAGE_SIZE)
+        resource = 'search'
+    return PartitionedCrawler(backend, _search_rate_limiter, max_workers=CRAWL_WORKERS,
+                              throttle=lambda: _github_clients.rate_limits.throttle(resource, SEARCH_RATE_RESERVE))
+
+
+def fetch_and_parse_prs_internal(org_name, label, since_date, until_date=None, progress=None):
     """Fetch và parse PRs - hàm nội bộ không có cache"""
 
     try:
-        # Thiết lập timeout cho GitHub API
-        g = Github(GITHUB_TOKEN, timeout=GITHUB_TIMEOUT)
-        org = g.get_organization(org_name)
-        
-        # Xây dựng query với date range
-        query = f'org:{org_name} is:pr'
-        
-        # Xử lý label (có thể là một hoặc nhiều label)
-        if isinstance(label, (list, tuple)) and label:
-            # Nếu là danh sách labels - sử dụng phép AND
-            label_conditions = [f'label:"{l}"' for l in label if l and l.strip()]
-            if label_conditions:
-                query += f' {" ".join(label_conditions)}'
-        elif label and isinstance(label, str):
-            # Nếu là một label duy nhất
-            query += f' label:"{label}"'
-            
-        if since_date:
-            query += f' created:>={since_date}'
-            
-        if until_date:
-            query += f' created:<={until_date}'
-            
-        prs = g.search_issues(query=query)
-        # Lấy tổng số PRs thực tế
-        actual_total = prs.totalCount
-        
-        # Nếu MAX_PRS = 0, lấy tất cả PRs
-        if MAX_PRS == 0:
-            total_count = actual_total
-        else:
-            total_count = min(actual_total, MAX_PRS)
+        # Query không chứa điều kiện created: - crawler tự chia khoảng thời gian thành các cửa sổ
+        query = build_search_query(org_name, label)
+        crawler = create_crawler()
 
         prs_data = []
-        developers_stats = {}
-        projects_stats = {}
-        total_estimate = 0
-        total_actual = 0
-
-        # Xử lý từng batch PRs với kích thước batch tối ưu
-        batch_size = 30  # Tăng kích thước batch để giảm số lần gọi API
-        for i in range(0, total_count, batch_size):
-            current_batch_size = min(batch_size, total_count - i)
-            batch = list(prs[i:min(i + batch_size, total_count)])
-
-            for pr in batch:
-                parsed_data = parse_pr_info(pr)
-
-                # Cập nhật thống kê theo developer
-                dev = pr.user.login
-                if dev not in developers_stats:
-                    developers_stats[dev] = {'total_prs': 0, 'total_estimate': 0, 'total_actual': 0}
-                developers_stats[dev]['total_prs'] += 1
-                developers_stats[dev]['total_estimate'] += parsed_data['estimate_hours']
-                developers_stats[dev]['total_actual'] += parsed_data['actual_hours']
-
-                # Cập nhật thống kê theo project
-                project = parsed_data['project_id']
-                if project not in projects_stats:
-                    projects_stats[project] = {
-                        'total_prs': 0,
-                        'total_estimate': 0,
-                        'total_actual': 0,
-                        'developers': set()
-                    }
-                projects_stats[project]['total_prs'] += 1
-                projects_stats[project]['total_estimate'] += parsed_data['estimate_hours']
-                projects_stats[project]['total_actual'] += parsed_data['actual_hours']
-                projects_stats[project]['developers'].add(dev)
-
-                # Cập nhật tổng thời gian
-                total_estimate += parsed_data['estimate_hours']
-                total_actual += parsed_data['actual_hours']
-
-                pr_info = {
-                    'title': pr.title,
-                    'issue_number': parsed_data['issue_number'],
-                    'estimate_time': parsed_data['estimate_time'],
-                    'actual_time': parsed_data['actual_time'],
-                    'creator': pr.user.login,
-                    'created_at': pr.created_at.strftime('%Y-%m-%d'),
-                    'url': pr.html_url
-                }
-                prs_data.append(pr_info)
-
-        # Chuyển developers set thành list
-        for project in projects_stats:
-            projects_stats[project]['developers'] = sorted(list(projects_stats[project]['developers']))
-
-        result = {
-            'prs_data': prs_data,
-            'stats': {
-                'total_prs': len(prs_data),
-                'total_prs_found': actual_total,  # Thêm tổng số PRs tìm thấy
-                'total_prs_processed': total_count,  # Thêm tổng số PRs đã xử lý
-                'total_estimate': round(total_estimate, 2),
-                'total_actual': round(total_actual, 2),
-                'developers': developers_stats,
-                'projects': projects_stats
-            },
-            'timestamp': time.time()
-        }
-        
-        return result
+        stats = new_stats()
+
+        # Nếu MAX_PRS = 0, lấy tất cả PRs (vượt giới hạn 1000 kết quả bằng cách chia cửa sổ)
+        on_plan = progress.expect if progress else None
+        pages = crawler.iter_pages(query, since_date, until_date, limit=MAX_PRS, on_plan=on_plan)
+        for page in timed_iter(pages, 'github', _stage_seconds):
+            with span('parse', _stage_seconds):
+                parsed_page = parse_pr_batch(page)
+            with span('aggregate', _stage_seconds):
+                for pr, parsed in zip(page, parsed_page):
+                    record = build_pr_record(pr, parsed)
+                    add_record_to_stats(stats, record)
+                    prs_data.append(record)
+            if progress:
+                progress.page_done(len(page))
+
+        # Các trang về không theo thứ tự - sắp xếp lại mới nhất trước
+        prs_data.sort(key=lambda r: (r['created_at'], r['id']), reverse=True)
+        return build_result(prs_data, stats, crawler.total_found, len(prs_data))
 
     except Exception as e:
         raise
 
+
+def refresh_prs_delta(cached, org_name, label, since_date, until_date=None, progress=None):
+    """Làm mới kết quả đã cache bằng cách chỉ lấy các PR được cập nhật từ lần refresh trước.
+
+    PR được cập nhật được lấy không kèm điều kiện label để PR bị gỡ label của truy vấn cũng được loại khỏi kết quả.
+    Trả về None nếu không thể refresh tăng dần - khi đó cần crawl lại toàn bộ: cache cũ không có id PR,
+    lần crawl đầy đủ đã quá DELTA_REFRESH_MAX_AGE hoặc số PR thay đổi chạm giới hạn MAX_PRS."""
+    prs_data = cached['prs_data']
+    if any('id' not in record for record in prs_data):
+        return None
+    if time.time() - cached.get('full_fetch_at', cached['timestamp']) >= DELTA_REFRESH_MAX_AGE:
+        return None
+
+    refresh_started = time.time()
+    # Lùi lại một khoảng nhỏ để không bỏ sót PR cập nhật sát thời điểm refresh trước
+    updated_since = datetime.fromtimestamp(cached['timestamp'] - DELTA_REFRESH_OVERLAP, timezone.utc)
+    query = build_search_query(org_name, [])
+    query += f" updated:>={updated_since.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+    on_plan = progress.expect if progress else None
+    changed = []
+    crawler = create_crawler()
+    pages = crawler.iter_pages(query, since_date, until_date, limit=MAX_PRS, on_plan=on_plan)
+    for page in timed_iter(pages, 'github', _stage_seconds):
+        changed.extend(page)
+        if progress:
+            progress.page_done(len(page))
+    # Thay đổi nhiều hơn số PR lấy được: không biết PR nào bị bỏ sót nên crawl lại toàn bộ
+    if crawler.total_found > len(changed) or (MAX_PRS and len(changed) >= MAX_PRS):
+        return None
+
+    with span('parse', _stage_seconds):
+        changed_records = [build_pr_record(pr, parsed) for pr, parsed in zip(changed, parse_pr_batch(changed))]
+    # Giữ index PR cục bộ đồng bộ với các thay đổi (index lưu mọi label của PR)
+    if PR_INDEX_ENABLED:
+        _pr_index.upsert(org_name, changed_records)
+
+    wanted = {l.lower() for l in normalize_labels(label)}
+    matching = [record for record in changed_records if wanted <= {l.lower() for l in record['labels']}]
+    lost_label = [record['url'] for record in changed_records if not wanted <= {l.lower() for l in record['labels']}]
+    with span('aggregate', _stage_seconds):
+        result = apply_pr_changes(cached, matching, removed_urls=lost_label)
+    result['timestamp'] = refresh_started
+    result['full_fetch_at'] = cached.get('full_fetch_at', cached['timestamp'])
+    return result
+
+
+def apply_pr_changes(cached, records, removed_urls=()):
+    """Áp dụng các PR mới/thay đổi và các PR bị loại bỏ lên kết quả đã cache, điều chỉnh thống kê tăng dần.
+
+    PR được nhận diện theo url vì id của search REST (id issue) khác id pull request trong webhook.
+    Kết quả được sắp xếp mới nhất trước và giới hạn MAX_PRS PR giống một lần crawl đầy đủ.
+    Trả về kết quả mới (kết quả cũ không bị sửa vì các request khác có thể đang đọc)."""
+    prs_data = list(cached['prs_data'])
+    stats = copy.deepcopy(cached['stats'])
+    positions = {record['url']: i for i, record in enumerate(prs_data)}
+    touched_projects = set()
+    added = 0
+
+    for record in records:
+        position = positions.get(record['url'])
+        if position is not None:
+            # Trừ đóng góp cũ của PR trước khi cộng lại giá trị mới
+            old_record = prs_data[position]
+            add_record_to_stats(stats, old_record, sign=-1)
+            touched_projects.add(old_record['project_id'])
+            prs_data[position] = record
+        else:
+            positions[record['url']] = len(prs_data)
+            prs_data.append(record)
+            added += 1
+        add_record_to_stats(stats, record)
+
+    removed = set(removed_urls) & positions.keys()
+    if removed:
+        for url in removed:
+            old_record = prs_data[positions[url]]
+            add_record_to_stats(stats, old_record, sign=-1)
+            touched_projects.add(old_record['project_id'])
+        prs_data = [record for record in prs_data if record['url'] not in removed]
+
+    prs_data.sort(key=lambda r: (r['created_at'], r['id']), reverse=True)
+    dropped = 0
+    if MAX_PRS and len(prs_data) > MAX_PRS:
+        # PR cũ nhất vượt giới hạn bị bỏ giống khi crawl đầy đủ (vẫn được tính vào total_prs_found)
+        for old_record in prs_data[MAX_PRS:]:
+            add_record_to_stats(stats, old_record, sign=-1)
+            touched_projects.add(old_record['project_id'])
+        dropped = len(prs_data) - MAX_PRS
+        del prs_data[MAX_PRS:]
+
+    refresh_project_developers(stats, prs_data, touched_projects)
+    for group in ('developers', 'projects'):
+        for values in stats[group].values():
+            values['total_estimate'] = round(values['total_estimate'], 2)
+            values['total_actual'] = round(values['total_actual'], 2)
+
+    result = build_result(prs_data, stats,
+                          stats['total_prs_found'] + added - len(removed),
+                          stats['total_prs_processed'] + added - len(removed) - dropped,
+                          timestamp=cached['timestamp'])
+    result['full_fetch_at'] = cached.get('full_fetch_at', cached['timestamp'])
+    for field in ('query', 'revision'):
+        if field in cached:
+            result[field] = cached[field]
+    return result
+
+def sync_index_spans(org_name, label, spans, progress=None):
+    """Crawl các khoảng ngày chưa đồng bộ vào index PR; trả về số PR bị bỏ qua do MAX_PRS"""
+    truncated = 0
+    for span_since, span_until in spans:
+        fetched = fetch_and_parse_prs_internal(org_name, label, span_since, span_until, progress)
+        _pr_index.upsert(org_name, fetched['prs_data'])
+        skipped = fetched['stats']['total_prs_found'] - fetched['stats']['total_prs_processed']
+        if skipped > 0:
+            # Bị giới hạn bởi MAX_PRS - chưa đồng bộ đầy đủ nên lần sau sẽ lấy lại
+            truncated += skipped
+        else:
+            _pr_index.mark_synced(org_name, label, span_since, span_until)
+    return truncated
+
+
+def fetch_and_parse_prs_indexed(org_name, label, since_date, until_date=None, progress=None):
+    """Trả lời truy vấn từ index PR cục bộ, chỉ crawl GitHub cho các khoảng ngày chưa đồng bộ"""
+    truncated = sync_index_spans(org_name, label, _pr_index.uncovered_spans(org_name, label, since_date, until_date),
+                                 progress)
+
+    with span('index', _stage_seconds):
+        prs_data = _pr_index.query(org_name, label, since_date, until_date)
+        # Thống kê lấy từ rollup theo ngày; truy vấn nhiều label (AND) phải cộng từng PR
+        stats = _pr_index.rollup_stats(org_name, label, since_date, until_date)
+    with span('aggregate', _stage_seconds):
+        if stats is None:
+            stats = new_stats()
+            for record in prs_data:
+                add_record_to_stats(stats, record)
+        return build_result(prs_data, stats, len(prs_data) + truncated, len(prs_data))
+
+
+def get_index_stats_result(org_name, labels, since_date, until_date):
+    """Thống kê cho trang báo cáo chỉ từ rollup của index (không tải danh sách PR).
+
+    Ngày hôm nay không bao giờ được đồng bộ lâu dài nên khoảng ngày kết thúc hôm nay (trang mặc định) chỉ
+    crawl riêng ngày hôm nay; rollup được cập nhật khi upsert nên sau đó vẫn trả lời được từ rollup.
+    Trả về None nếu index còn thiếu ngày trước hôm nay, truy vấn có nhiều label hoặc ngày hôm nay bị cắt bởi MAX_PRS."""
+    if not PR_INDEX_ENABLED or not since_date or len(normalize_labels(labels)) > 1:
+        return None
+    spans = _pr_index.uncovered_spans(org_name, labels, since_date, until_date)
+    today = datetime.now().strftime('%Y-%m-%d')
+    if any(span_since < today for span_since, _ in spans) or sync_index_spans(org_name, labels, spans):
+        return None
+    stats = _pr_index.rollup_stats(org_name, labels, since_date, until_date)
+    return {
+        'stats': {
+            'total_prs': stats['total_prs'],
+            'total_prs_found': stats['total_prs'],
+            'total_prs_processed': stats['total_prs'],
+            'total_estimate': round(stats['total_estimate'], 2),
+            'total_actual': round(stats['total_actual'], 2),
+            'developers': stats['developers'],
+            'projects': stats['projects']
+        },
+        'timestamp': time.time()
+    }
+
+
 # Sử dụng cache key tự động tạo từ các tham số
 def create_cache_key(org_name, label, since_date, until_date=None):
     # Chuyển label thành chuỗi để có thể hash được
@@ -245,37 +515,420 @@ def create_cache_key(org_name, label, since_date, until_date=None):
     else:
         label_str = str(label) if label else 'all'
     
-    # Tạo key cho cache
+    # Tạo key cho cache (tách riêng theo backend vì id PR khác nhau)
     key = f"{org_name}_{label_str}_{since_date}"
+    if FETCH_BACKEND != 'rest':
+        key = f"{FETCH_BACKEND}:{key}"
     if until_date:
         key += f"_{until_date}"
     
     return key
 
-# Cache dictionary để lưu kết quả
-_pr_cache = {}
-_cache_timestamp = {}
 
-def fetch_and_parse_prs(org_name, label, since_date, until_date=None):
-    """Fetch và parse PRs với cache tự quản lý"""
-    # Tạo cache key
-    cache_key = create_cache_key(org_name, label, since_date, until_date)
+def peek_cached(cache_key):
+    """Giá trị trong cache không tính vào hit/miss và LRU (kiểm tra nội bộ, không phải lượt đọc của request)"""
+    entry = _pr_cache.peek(cache_key)
+    return entry[0] if entry is not None else None
+
+
+def cache_key_org(cache_key):
+    """Org của cache key do create_cache_key tạo ([backend:]org_label_since...; tên org GitHub không chứa '_')"""
+    return cache_key.partition('_')[0].rpartition(':')[2]
+
+# Cache dùng chung để lưu kết quả (TTL + LRU theo dung lượng).
+# Entry được giữ tới CACHE_HARD_TTL (hoặc CACHE_RETENTION khi bật làm mới tăng dần); độ tươi được kiểm tra theo CACHE_SOFT_TTL.
+_pr_cache = create_cache_backend(CACHE_BACKEND, CACHE_DIR,
+                                 max(CACHE_RETENTION, CACHE_HARD_TTL) if INCREMENTAL_REFRESH else CACHE_HARD_TTL,
+                                 CACHE_MAX_BYTES)
+# Rate limiter cho search API dùng chung cho mọi crawl của mọi worker (SEARCH_RATE_LIMIT là tổng cho cả server)
+_search_rate_limiter = SharedRateLimiter(os.path.join(CACHE_DIR, 'rate_limit.sqlite3'), SEARCH_RATE_LIMIT)
+_response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+# Bộ đếm cache đọc từ backend lúc scrape (backend sqlite dùng chung nên giống nhau ở mọi worker)
+for _counter in ('hits', 'misses', 'evictions'):
+    _metrics.collector(f'reviewai_cache_{_counter}_total', 'counter', f'Result cache {_counter}',
+                       lambda name=_counter: [({'backend': CACHE_BACKEND}, _pr_cache.stats()[name])])
+_metrics.collector('reviewai_cache_bytes', 'gauge', 'Bytes stored in the result cache',
+                   lambda: [({'backend': CACHE_BACKEND}, _pr_cache.stats()['total_bytes'])])
+_metrics.collector('reviewai_cache_entries', 'gauge', 'Entries in the result cache',
+                   lambda: [({'backend': CACHE_BACKEND}, _pr_cache.stats()['entries'])])
+_metrics.collector('reviewai_github_rate_limit_remaining', 'gauge', 'Remaining GitHub API budget per resource',
+                   lambda: [({'resource': resource}, info['remaining'])
+                            for resource, info in sorted(_github_clients.rate_limits.snapshot().items())])
+
+# Index PR cục bộ dùng chung giữa các worker
+_pr_index_file = 'pr_index.sqlite3' if FETCH_BACKEND == 'rest' else f'pr_index_{FETCH_BACKEND}.sqlite3'
+# Ngày hôm nay được crawl lại sau CACHE_SOFT_TTL giống kết quả trong cache
+_pr_index = (PRIndex(os.path.join(CACHE_DIR, _pr_index_file), PR_INDEX_SYNC_TTL, CACHE_SOFT_TTL)
+             if PR_INDEX_ENABLED else None)
+
+# Trạng thái job báo cáo dùng chung giữa các worker và thread pool chạy job
+_job_store = JobStore(os.path.join(CACHE_DIR, 'jobs.sqlite3'), JOB_STALE_TIMEOUT)
+_job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='report-job')
+
+# Các lần fetch đang chạy trong process theo cache key (single-flight)
+_inflight = {}
+_inflight_lock = threading.Lock()
+# Thread pool cho việc làm mới nền (stale-while-revalidate)
+_refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='cache-refresh')
+
+
+# Index label theo org dùng chung giữa các worker
+_label_index = LabelIndex(os.path.join(CACHE_DIR, 'labels.sqlite3'), LABEL_INDEX_TTL, LABEL_INDEX_MAX_ORGS)
+# Các org đang được làm mới label trong process
+_label_refreshing = set()
+
+# Thống kê tần suất truy vấn cho prewarm
+_query_stats = QueryStats(os.path.join(CACHE_DIR, 'prewarm.sqlite3'))
+
+
+# Lần ghi snapshot gần nhất của worker này
+_snapshot_writes = {'last_write': None, 'entries': None}
+# Cache memory: entry được ghi trước mốc này đã có trong snapshot (entry khôi phục giữ stored_at cũ)
+_snapshot_since = time.time()
+
+
+def restore_snapshot():
+    """Khôi phục từ snapshot lúc khởi động: chỉ đọc index, dữ liệu được nạp khi cần.
+
+    Cache memory: entry được giải mã khi key được dùng lần đầu. Cache sqlite (dùng chung, thường đã còn dữ liệu
+    sau khi worker restart): chỉ chép nguyên blob của các key file cache chưa có."""
+    global _pr_cache
+    snapshot = SnapshotReader.open(SNAPSHOT_PATH)
+    if snapshot is not None:
+        _label_index.load(snapshot.labels)
+    if CACHE_BACKEND == 'memory':
+        _pr_cache = SnapshotRestoringCache(_pr_cache, snapshot)
+    elif snapshot is not None:
+        present = set(_pr_cache.keys())
+        _pr_cache.load(snapshot.iter_entries([key for key in snapshot.live_keys() if key not in present]))
+        snapshot.close()
+
+
+def save_snapshot():
+    """Ghi cache kết quả và index label ra snapshot.
+
+    Cache memory: mỗi worker chỉ gộp các entry đã ghi từ lần lưu trước của mình vào snapshot (lần lưu khi worker
+    tắt không phải serialize lại toàn bộ cache). Cache sqlite: dữ liệu giống nhau ở mọi worker nên mỗi chu kỳ
+    (kể cả khi worker tắt) chỉ một worker ghi."""
+    global _snapshot_since
+    merge = CACHE_BACKEND == 'memory'
+    if not merge:
+        owner = f'{os.getpid()}:{threading.get_ident()}'
+        # Không unlock: khóa hết hạn trước chu kỳ sau
+        if not _pr_cache.try_lock('snapshot:writer', owner, max(1, SNAPSHOT_INTERVAL * 0.9)):
+            return None
+    started = time.time()
+    try:
+        with span('snapshot', _stage_seconds):
+            entries = _pr_cache.dump(since=_snapshot_since) if merge else _pr_cache.dump()
+            written = write_snapshot(SNAPSHOT_PATH, entries, _label_index.dump(), merge=merge)
+    except Exception as e:
+        print(f"Error writing cache snapshot: {e}")
+        return None
+    if written is not None:
+        _snapshot_since = started
+        _snapshot_writes.update(last_write=time.time(), entries=written)
+    return written
+
+
+def snapshot_stats():
+    """Trạng thái snapshot cho /cache-stats"""
+    try:
+        info = os.stat(SNAPSHOT_PATH)
+        file_info = {'size': info.st_size, 'modified_at': info.st_mtime}
+    except FileNotFoundError:
+        file_info = None
+    stats = {'path': SNAPSHOT_PATH, 'interval': SNAPSHOT_INTERVAL, 'file': file_info, **_snapshot_writes}
+    if isinstance(_pr_cache, SnapshotRestoringCache):
+        stats.update(_pr_cache.snapshot_stats())
+    return stats
+
+
+def _snapshot_loop():
+    while True:
+        time.sleep(SNAPSHOT_INTERVAL)
+        save_snapshot()
+
+
+if SNAPSHOT_ENABLED:
+    restore_snapshot()
+    # gunicorn tắt worker bằng SIGTERM rồi thoát bằng sys.exit nên atexit được gọi (kể cả khi recycle)
+    atexit.register(save_snapshot)
+    if SNAPSHOT_INTERVAL > 0:
+        threading.Thread(target=_snapshot_loop, name='cache-snapshot', daemon=True).start()
+
+
+class _InflightFetch:
+    """Kết quả của một lần fetch đang chạy - các request khác cùng key chờ trên đây"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def refresh_cache_entry(cache_key, org_name, label, since_date, until_date=None, cached=None, progress=None):
+    """Lấy dữ liệu mới cho cache key (tăng dần nếu có thể) và lưu vào cache"""
+    result = None
+    # Cache đã hết hạn nhưng còn trong thời gian lưu giữ: chỉ lấy các PR đã thay đổi
+    if cached is not None and INCREMENTAL_REFRESH:
+        result = refresh_prs_delta(cached, org_name, label, since_date, until_date, progress)
+
+    # Nếu không có trong cache hoặc không thể làm mới tăng dần, lấy dữ liệu mới
+    if result is None:
+        if PR_INDEX_ENABLED and since_date:
+            result = fetch_and_parse_prs_indexed(org_name, label, since_date, until_date, progress)
+        else:
+            result = fetch_and_parse_prs_internal(org_name, label, since_date, until_date, progress)
+
+    # Tham số truy vấn được lưu kèm để webhook biết PR thuộc entry nào
+    result['query'] = {'org': org_name, 'labels': normalize_labels(label), 'since': since_date,
+                       'until': until_date or ''}
 
-    # Kiểm tra cache
-    current_time = time.time()
-    if cache_key in _pr_cache and current_time - _cache_timestamp.get(cache_key, 0) < CACHE_TIMEOUT:
-        return _pr_cache[cache_key]
-    
-    # Nếu không có trong cache hoặc cache đã hết hạn, lấy dữ liệu mới
-    result = fetch_and_parse_prs_internal(org_name, label, since_date, until_date)
-    
     # Lưu vào cache
-    _pr_cache[cache_key] = result
-    _cache_timestamp[cache_key] = current_time
-    
+    _pr_cache.set(cache_key, result)
+    _label_index.observe(org_name, result['prs_data'])
     return result
 
 
+class _LeaseProgress:
+    """Bọc progress của lần fetch (có thể None): gia hạn khóa fetch theo từng trang để lần crawl dài hơn
+    FETCH_WAIT_TIMEOUT không bị worker khác coi là đã chết rồi crawl lại cùng key"""
+
+    def __init__(self, lock_name, owner, progress=None):
+        self.lock_name = lock_name
+        self.owner = owner
+        self.progress = progress
+        self._renewed_at = time.time()
+
+    def expect(self, total):
+        if self.progress:
+            self.progress.expect(total)
+
+    def page_done(self, prs):
+        # Không cần ghi khóa sau mỗi trang - gia hạn khi đã dùng hết một phần ba thời hạn
+        if time.time() - self._renewed_at >= FETCH_WAIT_TIMEOUT / 3:
+            _pr_cache.try_lock(self.lock_name, self.owner, FETCH_WAIT_TIMEOUT)
+            self._renewed_at = time.time()
+        if self.progress:
+            self.progress.page_done(prs)
+
+
+def _fetch_with_lease(cache_key, fetch, cached, wait_for_other=True, progress=None):
+    """Giành khóa fetch dùng chung giữa các worker. Nếu worker khác đang fetch cùng key thì chờ
+    kết quả của worker đó trong cache thay vì gọi GitHub thêm một lần nữa.
+
+    fetch(progress) nhận progress đã được bọc để gia hạn khóa trong lúc crawl."""
+    lock_name = f'fetch:{cache_key}'
+    owner = f'{os.getpid()}:{threading.get_ident()}'
+    previous_timestamp = cached['timestamp'] if cached is not None else 0
+    deadline = time.time() + FETCH_WAIT_TIMEOUT
+
+    while True:
+        if _pr_cache.try_lock(lock_name, owner, FETCH_WAIT_TIMEOUT):
+            try:
+                # Worker khác có thể vừa fetch xong trước khi ta giành được khóa
+                current = peek_cached(cache_key)
+                if current is not None and current['timestamp'] > previous_timestamp:
+                    return current
+                return fetch(_LeaseProgress(lock_name, owner, progress))
+            finally:
+                _pr_cache.unlock(lock_name, owner)
+
+        if not wait_for_other:
+            return cached
+        if time.time() >= deadline:
+            # Quá thời gian chờ - tự fetch
+            return fetch(progress)
+        time.sleep(0.5)
+        # Poll không tính vào hit/miss của cache
+        current = peek_cached(cache_key)
+        if current is not None and current['timestamp'] > previous_timestamp:
+            return current
+
+
+@contextmanager
+def _fetch_lease(cache_key):
+    """Giữ khóa fetch của cache key khi sửa entry tại chỗ (webhook) để không ghi đè kết quả của lần fetch
+    đang chạy ở worker khác. Quá FETCH_WAIT_TIMEOUT vẫn chưa giành được khóa thì sửa mà không có khóa."""
+    lock_name = f'fetch:{cache_key}'
+    owner = f'{os.getpid()}:{threading.get_ident()}'
+    deadline = time.time() + FETCH_WAIT_TIMEOUT
+    locked = _pr_cache.try_lock(lock_name, owner, FETCH_WAIT_TIMEOUT)
+    while not locked and time.time() < deadline:
+        time.sleep(0.5)
+        locked = _pr_cache.try_lock(lock_name, owner, FETCH_WAIT_TIMEOUT)
+    try:
+        yield
+    finally:
+        if locked:
+            _pr_cache.unlock(lock_name, owner)
+
+
+def _single_flight(cache_key, fetch, cached, wait_for_other=True, progress=None):
+    """Đảm bảo mỗi cache key chỉ có một lần fetch đang chạy; các request khác chờ kết quả"""
+    with _inflight_lock:
+        call = _inflight.get(cache_key)
+        leader = call is None
+        if leader:
+            call = _inflight[cache_key] = _InflightFetch()
+    if not leader:
+        return call.wait()
+
+    try:
+        call.result = _fetch_with_lease(cache_key, fetch, cached, wait_for_other, progress)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(cache_key, None)
+        call.done.set()
+
+
+def _refresh_in_background(cache_key, org_name, label, since_date, until_date, cached):
+    """Làm mới entry đã cũ ở thread nền (chỉ một lần refresh cho mỗi key)"""
+    with _inflight_lock:
+        if cache_key in _inflight:
+            return
+
+    def refresh():
+        try:
+            _single_flight(cache_key,
+                           lambda progress: refresh_cache_entry(cache_key, org_name, label, since_date, until_date,
+                                                                cached, progress),
+                           cached, wait_for_other=False)
+        except Exception as e:
+            print(f"Error refreshing cache for {cache_key}: {e}")
+
+    _refresh_executor.submit(refresh)
+
+
+def fetch_and_parse_prs(org_name, label, since_date, until_date=None, progress=None):
+    """Fetch và parse PRs với cache dùng chung (progress: FetchProgress để báo tiến độ cho job)"""
+    # Tạo cache key
+    cache_key = create_cache_key(org_name, label, since_date, until_date)
+
+    # Kiểm tra cache (backend tự loại bỏ entry đã quá thời gian lưu giữ)
+    cached = _pr_cache.get(cache_key)
+    if cached is not None:
+        age = time.time() - cached['timestamp']
+        if age < CACHE_SOFT_TTL:
+            return cached
+        # Stale-while-revalidate: trả về ngay dữ liệu cũ, làm mới ở nền
+        if age < CACHE_HARD_TTL:
+            _refresh_in_background(cache_key, org_name, label, since_date, until_date, cached)
+            return cached
+
+    # Cache trống hoặc quá cũ: chờ fetch (gộp các request cùng key thành một lần fetch)
+    return _single_flight(cache_key,
+                          lambda progress: refresh_cache_entry(cache_key, org_name, label, since_date, until_date,
+                                                               cached, progress),
+                          cached, progress=progress)
+
+
+def refresh_org_labels(org_name):
+    """Lấy lại label từ mọi repo của org (chỉ một worker làm cho mỗi org)"""
+    lock_name = f'labels:{org_name}'
+    # Kết quả âm: lần làm mới lỗi gần đây (VD: org sai tên) - không gọi lại GitHub cho tới khi khóa này hết hạn
+    failed_name = f'labels-failed:{org_name}'
+    owner = f'{os.getpid()}:{threading.get_ident()}'
+    if _pr_cache.is_locked(failed_name) or not _pr_cache.try_lock(lock_name, owner, 300):
+        return
+    try:
+        labels = fetch_org_labels(get_github(per_page=100), org_name, LABEL_FETCH_WORKERS)
+        _label_index.replace_repo_labels(org_name, labels)
+    except Exception:
+        _pr_cache.try_lock(failed_name, owner, LABEL_RETRY_AFTER)
+        raise
+    finally:
+        _pr_cache.unlock(lock_name, owner)
+
+
+def get_available_labels(org_name):
+    """Danh sách label của org cho trang báo cáo - không chờ GitHub, làm mới ở nền khi đã quá TTL"""
+    labels, stale = _label_index.get(org_name)
+    if stale and GITHUB_TOKEN:
+        with _inflight_lock:
+            if org_name in _label_refreshing:
+                return labels
+            _label_refreshing.add(org_name)
+
+        def refresh():
+            try:
+                refresh_org_labels(org_name)
+            except Exception as e:
+                print(f"Error refreshing labels for {org_name}: {e}")
+            finally:
+                with _inflight_lock:
+                    _label_refreshing.discard(org_name)
+
+        _refresh_executor.submit(refresh)
+    return labels
+
+
+def prewarm_refresh(cache_key, params):
+    """Làm mới một truy vấn cho prewarm (bỏ qua nếu request khác đang fetch cùng key)"""
+    org_name, labels, since_date, until_date = params
+    cached = peek_cached(cache_key)
+    _single_flight(cache_key,
+                   lambda progress: refresh_cache_entry(cache_key, org_name, labels, since_date, until_date,
+                                                        cached, progress),
+                   cached, wait_for_other=False)
+
+
+# cache key -> (stored_at, timestamp của dữ liệu): entry chỉ được giải mã lại khi đã được ghi lại
+_data_timestamps = {}
+_DATA_TIMESTAMPS_MAX = 1024
+
+
+def prewarm_cache_age(cache_key):
+    """Tuổi dữ liệu theo timestamp của kết quả, giống stale-while-revalidate (stored_at đổi cả khi entry chỉ
+    được ghi lại, VD: webhook sửa entry, nên không phản ánh lần fetch gần nhất).
+
+    Được gọi cho mỗi truy vấn ở mỗi lượt prewarm và /prewarm-stats nên chỉ đọc stored_at (không giải mã);
+    timestamp được lấy từ entry một lần cho mỗi lần entry được ghi."""
+    stored_at = _pr_cache.stored_at(cache_key)
+    if stored_at is None:
+        return None
+    known = _data_timestamps.get(cache_key)
+    if known is None or known[0] != stored_at:
+        entry = _pr_cache.peek(cache_key)
+        if entry is None:
+            return None
+        if len(_data_timestamps) >= _DATA_TIMESTAMPS_MAX:
+            _data_timestamps.clear()
+        known = _data_timestamps[cache_key] = (stored_at, entry[0]['timestamp'])
+    return time.time() - known[1]
+
+
+def prewarm_budget_available():
+    """Prewarm chỉ dùng tối đa PREWARM_BUDGET_SHARE của rate limit, phần còn lại dành cho người dùng"""
+    resource = 'search' if FETCH_BACKEND == 'rest' else 'graphql'
+    return _github_clients.rate_limits.remaining_fraction(resource) > 1 - PREWARM_BUDGET_SHARE
+
+
+def default_prewarm_queries():
+    """Trang mặc định (không có tham số) luôn được làm nóng"""
+    org_name, labels, since_date, until_date = parse_report_params(MultiDict())
+    return [(create_cache_key(org_name, labels, since_date, until_date), [org_name, labels, since_date, until_date])]
+
+
+_prewarm_scheduler = PrewarmScheduler(_query_stats, _pr_cache, prewarm_refresh, prewarm_cache_age,
+                                      prewarm_budget_available, PREWARM_INTERVAL, PREWARM_TOP_N, PREWARM_WINDOW,
+                                      CACHE_SOFT_TTL, default_prewarm_queries)
+if PREWARM_ENABLED and GITHUB_TOKEN:
+    _prewarm_scheduler.start()
+
+
 @app.route('/health')
 def health_check():
     """Endpoint kiểm tra trạng thái ứng dụng"""
@@ -286,7 +939,7 @@ def health_check():
         
         if GITHUB_TOKEN:
             try:
-                g = Github(GITHUB_TOKEN, timeout=5)  # Timeout ngắn cho health check
+                g = get_github(timeout=5)  # Timeout ngắn cho health check
                 # Thử một API call đơn giản
                 _ = g.get_rate_limit()
                 github_status = 'connected'
@@ -302,8 +955,10 @@ def health_check():
             'github_token': 'configured' if GITHUB_TOKEN else 'missing',
             'github_api_status': github_status,
             'github_error': error_message,
+            'github_rate_limits': _github_clients.rate_limits.snapshot(),
             'max_prs': MAX_PRS,
             'cache_timeout': CACHE_TIMEOUT,
+            'cache_backend': CACHE_BACKEND,
             'github_timeout': GITHUB_TIMEOUT,
             'default_since_date': DEFAULT_SINCE_DATE,
             'environment': os.getenv('FLASK_ENV', 'development')
@@ -316,21 +971,80 @@ def health_check():
             'timestamp': datetime.now().isoformat()
         }), 500
 
-@app.route('/', methods=['GET'])
-def index():
-    # Lấy tham số từ request hoặc sử dụng giá trị mặc định
-    org_name = request.args.get('org', 'AperoVN')
-    
+def parse_report_params(args):
+    """Đọc tham số org/labels/since/until của báo cáo từ request"""
+    org_name = args.get('org', 'AperoVN')
+
     # Xử lý labels (có thể có nhiều label)
-    labels = request.args.getlist('label')
+    labels = args.getlist('label')
     if not labels:
         # Nếu không có label nào được chọn, sử dụng giá trị mặc định
-        default_label = request.args.get('default_label', 'AI Generate')
+        default_label = args.get('default_label', 'AI Generate')
         if default_label:
             labels = [default_label]
-    
-    since_date = request.args.get('since', DEFAULT_SINCE_DATE)
-    until_date = request.args.get('until', '')
+
+    since_date = args.get('since', DEFAULT_SINCE_DATE)
+    until_date = args.get('until', '')
+    return org_name, labels, since_date, until_date
+
+
+def get_usable_cached_result(org_name, labels, since_date, until_date, peek=False):
+    """Trả về kết quả trong cache nếu có thể hiển thị ngay (chưa quá CACHE_HARD_TTL).
+
+    peek=True khi chỉ kiểm tra trước rồi request đọc lại qua fetch_and_parse_prs: lần kiểm tra không được
+    tính vào hit/miss để mỗi request chỉ được đếm một lần."""
+    cache_key = create_cache_key(org_name, labels, since_date, until_date)
+    cached = peek_cached(cache_key) if peek else _pr_cache.get(cache_key)
+    if cached is not None and time.time() - cached['timestamp'] < CACHE_HARD_TTL:
+        return cached
+    return None
+
+
+def render_result_page(org_name, labels, since_date, until_date, cache_result, fetch_time):
+    """Render trang kết quả từ dữ liệu đã fetch (fetch_time None: trang tự hiển thị thời gian phản hồi)"""
+    # Lấy danh sách labels
+    available_labels = []
+    try:
+        available_labels = get_available_labels(org_name)
+    except Exception:
+        pass
+
+    # Kết hợp dữ liệu với system info
+    template_data = {
+        **get_system_info(),
+        # Bảng PR và biểu đồ lấy dữ liệu qua /api/prs và /api/charts
+        'stats': cache_result['stats'],
+        'org_name': org_name,
+        'labels': labels,  # Danh sách labels đã chọn
+        'since_date': since_date,
+        'until_date': until_date,
+        'available_labels': available_labels,
+        'report_params': {'org': org_name, 'label': labels, 'since': since_date, 'until': until_date},
+        'fetch_time': None if fetch_time is None else f"{fetch_time:.2f}s"
+    }
+
+    with span('render', _stage_seconds):
+        return render_template('result.html', **template_data)
+
+
+def render_fetch_error(e):
+    """Render trang lỗi khi fetch dữ liệu thất bại"""
+    # Chuẩn bị thông báo lỗi chi tiết
+    error_type = type(e).__name__
+    error_message = f"Lỗi khi xử lý dữ liệu: {error_type}: {str(e)}"
+
+    # Thêm thông tin về timeout nếu có thể là lỗi timeout
+    if "timeout" in str(e).lower() or "time out" in str(e).lower():
+        error_message += f"\n\nLỗi có thể do timeout khi gọi GitHub API. Timeout hiện tại: {GITHUB_TIMEOUT}s"
+        error_message += "\nThử tăng giá trị GITHUB_TIMEOUT trong biến môi trường hoặc giảm phạm vi tìm kiếm."
+
+    return render_template('error.html', error=error_message, **get_system_info())
+
+
+@app.route('/', methods=['GET'])
+def index():
+    # Lấy tham số từ request hoặc sử dụng giá trị mặc định
+    org_name, labels, since_date, until_date = parse_report_params(request.args)
     
     # Xử lý yêu cầu
     
@@ -338,56 +1052,652 @@ def index():
         error_message = "GitHub Token chưa được cấu hình. Vui lòng kiểm tra biến môi trường GITHUB_TOKEN."
         return render_template('error.html', error=error_message, **get_system_info())
 
+    try:
+        cache_key = create_cache_key(org_name, labels, since_date, until_date)
+        _query_stats.record(cache_key, [org_name, labels, since_date, until_date])
+        # Trang có danh sách label của org: label thay đổi (làm mới, webhook) cũng làm trang cũ mất hiệu lực
+        return cached_response('index', cache_key, lambda: render_index(org_name, labels, since_date, until_date),
+                               page_version=lambda: tuple(get_available_labels(org_name)))
+    except Exception as e:
+        return render_fetch_error(e)
+
+
+def render_index(org_name, labels, since_date, until_date):
+    """Tạo trang báo cáo; trả về (kết quả đã render, response) - kết quả None nếu trang không được cache"""
     try:
         start_time = time.time()
-        
-        # Lấy danh sách labels
-        available_labels = []
-        try:
-            available_labels = get_recent_pr_labels(org_name)
-        except Exception:
-            pass
+        cached = get_usable_cached_result(org_name, labels, since_date, until_date, peek=True)
+
+        # Khoảng ngày đã đồng bộ trong index: render từ rollup, bảng PR tự tải qua /api/prs
+        if cached is None:
+            stats_result = get_index_stats_result(org_name, labels, since_date, until_date)
+            if stats_result is not None:
+                return None, render_result_page(org_name, labels, since_date, until_date, stats_result,
+                                                time.time() - start_time)
+
+        # Chưa có dữ liệu trong cache: tạo job chạy nền thay vì giữ request trong lúc crawl GitHub
+        if ASYNC_REPORTS and cached is None:
+            job_id = submit_report_job(org_name, labels, since_date, until_date)
+            return None, redirect(url_for('view_job', job_id=job_id))
         
         # Sử dụng cache để lấy dữ liệu
         # Chuyển danh sách labels thành tuple hoặc chuỗi để có thể cache được
         cache_result = fetch_and_parse_prs(org_name, labels, since_date, until_date)
         
-        fetch_time = time.time() - start_time
-
-        # Kết hợp dữ liệu với system info
-        template_data = {
-            **get_system_info(),
-            'prs': cache_result['prs_data'],
-            'stats': cache_result['stats'],
-            'org_name': org_name,
-            'labels': labels,  # Danh sách labels đã chọn
-            'since_date': since_date,
-            'until_date': until_date,
-            'available_labels': available_labels,
-            'fetch_time': f"{fetch_time:.2f}s"
+        # Trang này được lưu trong cache response: thời gian phản hồi do trình duyệt đo (fetch_time=None)
+        return cache_result, render_result_page(org_name, labels, since_date, until_date, cache_result, None)
+
+    except Exception as e:
+        return None, render_fetch_error(e)
+
+
+def cached_response(name, cache_key, render, page_version=None):
+    """Trả về response qua cache response: 304 nếu trình duyệt đã có đúng phiên bản, body nén sẵn nếu đã render.
+
+    Phiên bản dữ liệu là thời điểm entry của cache_key được ghi nên mọi lần làm mới (crawl, delta, webhook)
+    đều làm response cũ mất hiệu lực; page_version (nếu có) trả về phần còn lại mà trang phụ thuộc
+    (VD: danh sách label của org). render() trả về (kết quả, response); response chỉ được lưu khi
+    kết quả không None và phiên bản không đổi trong lúc render."""
+    if not RESPONSE_CACHE_ENABLED:
+        return render()[1]
+    key = (name, tuple(sorted(request.args.items(multi=True))))
+
+    def current_version():
+        stored_at = _pr_cache.stored_at(cache_key)
+        if stored_at is None or page_version is None:
+            return stored_at
+        return stored_at, page_version()
+
+    version = current_version()
+    if version is not None:
+        entry = _response_cache.get(key, version)
+        # Dữ liệu cần làm mới: đi qua đường thường để kích hoạt làm mới nền
+        if entry is not None and time.time() - entry.data_timestamp < CACHE_SOFT_TTL:
+            return _response_cache.respond(entry, request)
+
+    result, response = render()
+    response = make_response(response)
+    if (result is None or version is None or response.status_code != 200
+            or current_version() != version):
+        return response
+    with span('compress', _stage_seconds):
+        entry = _response_cache.put(key, version, result['timestamp'], response.get_data(), response.mimetype)
+    return _response_cache.respond(entry, request)
+
+
+def run_report_job(job_id, org_name, labels, since_date, until_date):
+    """Chạy job báo cáo ở thread nền, ghi tiến độ và kết quả vào JobStore"""
+    _job_store.start(job_id)
+    try:
+        fetch_and_parse_prs(org_name, labels, since_date, until_date, progress=FetchProgress(_job_store, job_id))
+        _job_store.finish(job_id)
+    except Exception as e:
+        _job_store.finish(job_id, error=f'{type(e).__name__}: {str(e)}')
+
+
+def submit_report_job(org_name, labels, since_date, until_date):
+    """Tạo job báo cáo (dùng lại job đang chạy nếu cùng truy vấn), trả về job id"""
+    cache_key = create_cache_key(org_name, labels, since_date, until_date)
+    params = {'org': org_name, 'labels': labels, 'since': since_date, 'until': until_date}
+    job_id, created = _job_store.submit(cache_key, params)
+    if created:
+        _job_executor.submit(run_report_job, job_id, org_name, labels, since_date, until_date)
+    return job_id
+
+
+# Thêm route để tạo job báo cáo chạy nền
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    try:
+        if not GITHUB_TOKEN:
+            return jsonify({
+                'status': 'error',
+                'message': 'GitHub Token chưa được cấu hình',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        org_name, labels, since_date, until_date = parse_report_params(request.values)
+        job_id = submit_report_job(org_name, labels, since_date, until_date)
+        return jsonify({
+            'status': 'success',
+            'job_id': job_id,
+            'status_url': url_for('job_status', job_id=job_id),
+            'view_url': url_for('view_job', job_id=job_id),
+            'timestamp': datetime.now().isoformat()
+        }), 202
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error creating job: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+# Thêm route để poll tiến độ job
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = _job_store.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job not found',
+            'timestamp': datetime.now().isoformat()
+        }), 404
+    return jsonify({**job, 'view_url': url_for('view_job', job_id=job_id), 'timestamp': datetime.now().isoformat()})
+
+# Thêm route để hiển thị kết quả của job (hoặc trang chờ khi job chưa xong)
+@app.route('/jobs/<job_id>/view', methods=['GET'])
+def view_job(job_id):
+    job = _job_store.get(job_id)
+    if job is None:
+        return render_template('error.html', error='Không tìm thấy job báo cáo.', **get_system_info())
+    if job['status'] == JOB_ERROR:
+        return render_template('error.html', error=f"Lỗi khi xử lý dữ liệu: {job['error']}", **get_system_info())
+    if job['status'] != JOB_DONE:
+        return render_template('job.html', job=job, **get_system_info())
+
+    params = job['params']
+    try:
+        cache_result = get_usable_cached_result(params['org'], params['labels'], params['since'], params['until'])
+        if cache_result is None:
+            # Kết quả đã bị xóa khỏi cache - chạy lại job
+            new_job_id = submit_report_job(params['org'], params['labels'], params['since'], params['until'])
+            return redirect(url_for('view_job', job_id=new_job_id))
+        fetch_time = (job['finished_at'] or job['updated_at']) - (job['started_at'] or job['created_at'])
+        return render_result_page(params['org'], params['labels'], params['since'], params['until'],
+                                  cache_result, fetch_time)
+    except Exception as e:
+        return render_fetch_error(e)
+
+def compute_efficiency(estimate_hours, actual_hours):
+    """Hiệu suất (%) = estimate / actual; mặc định 100% khi chưa có actual"""
+    return (estimate_hours / actual_hours * 100) if actual_hours > 0 else 100
+
+
+def efficiency_class(efficiency):
+    return 'efficiency-high' if efficiency >= 90 else 'efficiency-medium' if efficiency >= 70 else 'efficiency-low'
+
+
+def _record_hours(record, field):
+    # Bản ghi cache cũ chỉ có chuỗi "1.5h"
+    hours = record.get(f'{field}_hours')
+    return hours if hours is not None else float(record[f'{field}_time'].replace('h', '') or 0)
+
+
+def pr_table_row(record):
+    """Dòng dữ liệu cho bảng PR (DataTables)"""
+    estimate_hours = _record_hours(record, 'estimate')
+    actual_hours = _record_hours(record, 'actual')
+    efficiency = compute_efficiency(estimate_hours, actual_hours)
+    return {
+        'issue_number': record['issue_number'],
+        'title': record['title'],
+        'creator': record['creator'],
+        'estimate_time': record['estimate_time'],
+        'actual_time': record['actual_time'],
+        'efficiency': round(efficiency, 1),
+        'efficiency_class': efficiency_class(efficiency),
+        'created_at': record['created_at'],
+        'url': record['url']
+    }
+
+
+# Khóa sắp xếp theo thứ tự cột của bảng PR trong result.html
+PR_TABLE_SORT_KEYS = [
+    lambda r: r['issue_number'],
+    lambda r: r['title'].lower(),
+    lambda r: r['creator'].lower(),
+    lambda r: _record_hours(r, 'estimate'),
+    lambda r: _record_hours(r, 'actual'),
+    lambda r: compute_efficiency(_record_hours(r, 'estimate'), _record_hours(r, 'actual')),
+    lambda r: r['created_at'],
+]
+# Các cột dùng cho tìm kiếm toàn bảng
+PR_TABLE_SEARCH_FIELDS = ('issue_number', 'title', 'creator', 'created_at')
+
+# Thứ tự đã sắp xếp của các kết quả gần đây: (cache key, timestamp, revision, cột, chiều) -> danh sách bản ghi
+_sorted_prs = OrderedDict()
+_sorted_prs_lock = threading.Lock()
+
+
+def get_sorted_prs(cache_key, result, column, descending):
+    """Sắp xếp prs_data theo cột, ghi nhớ kết quả để các trang tiếp theo không phải sắp xếp lại"""
+    memo_key = (cache_key, result['timestamp'], result.get('revision', 0), column, descending)
+    with _sorted_prs_lock:
+        if memo_key in _sorted_prs:
+            _sorted_prs.move_to_end(memo_key)
+            return _sorted_prs[memo_key]
+    with span('sort', _stage_seconds):
+        rows = sorted(result['prs_data'], key=PR_TABLE_SORT_KEYS[column], reverse=descending)
+    with _sorted_prs_lock:
+        _sorted_prs[memo_key] = rows
+        while len(_sorted_prs) > 16:
+            _sorted_prs.popitem(last=False)
+    return rows
+
+
+# API phân trang phía server cho bảng PR (giao thức server-side của DataTables)
+@app.route('/api/prs', methods=['GET'])
+def api_prs():
+    try:
+        org_name, labels, since_date, until_date = parse_report_params(request.args)
+        result = fetch_and_parse_prs(org_name, labels, since_date, until_date)
+
+        draw = request.args.get('draw', 0, type=int)
+        start = max(request.args.get('start', 0, type=int), 0)
+        length = request.args.get('length', 25, type=int)
+        column = request.args.get('order[0][column]', 6, type=int)
+        if column not in range(len(PR_TABLE_SORT_KEYS)):
+            column = 6
+        descending = request.args.get('order[0][dir]', 'desc') == 'desc'
+
+        rows = get_sorted_prs(create_cache_key(org_name, labels, since_date, until_date), result, column, descending)
+
+        # Tìm kiếm toàn bảng và theo từng cột
+        search = request.args.get('search[value]', '').strip().lower()
+        column_filters = []
+        for i, field in enumerate(('issue_number', 'title', 'creator', 'estimate_time', 'actual_time', None,
+                                   'created_at')):
+            value = request.args.get(f'columns[{i}][search][value]', '').strip().lower()
+            if value and field:
+                column_filters.append((field, value))
+        if search or column_filters:
+            rows = [r for r in rows
+                    if (not search or any(search in str(r[field]).lower() for field in PR_TABLE_SEARCH_FIELDS))
+                    and all(value in str(r[field]).lower() for field, value in column_filters)]
+
+        page = rows[start:] if length < 0 else rows[start:start + length]
+        return jsonify({
+            'draw': draw,
+            'recordsTotal': len(result['prs_data']),
+            'recordsFiltered': len(rows),
+            'data': [pr_table_row(record) for record in page]
+        })
+    except Exception as e:
+        return jsonify({
+            'draw': request.args.get('draw', 0, type=int),
+            'error': f'Error getting PRs: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+# Dạng cột của các kết quả gần đây: (cache key, timestamp, revision) -> ColumnarPRs
+_columnar_prs = OrderedDict()
+_columnar_prs_lock = threading.Lock()
+
+
+def get_columnar_prs(cache_key, result):
+    """Chuyển prs_data sang dạng cột một lần cho mỗi kết quả cache, dùng lại cho mọi lần nhóm"""
+    memo_key = (cache_key, result['timestamp'], result.get('revision', 0))
+    with _columnar_prs_lock:
+        if memo_key in _columnar_prs:
+            _columnar_prs.move_to_end(memo_key)
+            return _columnar_prs[memo_key]
+    with span('aggregate', _stage_seconds):
+        columns = ColumnarPRs(result['prs_data'])
+    with _columnar_prs_lock:
+        _columnar_prs[memo_key] = columns
+        while len(_columnar_prs) > 8:
+            _columnar_prs.popitem(last=False)
+    return columns
+
+
+# API thống kê nhóm theo chiều bất kỳ (VD: group_by=developer,week hoặc project,label)
+@app.route('/api/aggregate', methods=['GET'])
+def api_aggregate():
+    try:
+        group_by = [d.strip() for d in request.args.get('group_by', 'developer').split(',') if d.strip()]
+        if not group_by or any(d not in DIMENSIONS for d in group_by):
+            return jsonify({
+                'status': 'error',
+                'message': f'Invalid group_by (choose from {", ".join(DIMENSIONS)})',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+
+        org_name, labels, since_date, until_date = parse_report_params(request.args)
+        cache_key = create_cache_key(org_name, labels, since_date, until_date)
+
+        def render():
+            result = fetch_and_parse_prs(org_name, labels, since_date, until_date)
+            columns = get_columnar_prs(cache_key, result)
+            with span('aggregate', _stage_seconds):
+                groups = columns.group_by(group_by)
+            return result, jsonify({
+                'status': 'success',
+                'group_by': group_by,
+                'groups': groups,
+                'total_prs': columns.size,
+                'timestamp': datetime.now().isoformat()
+            })
+
+        return cached_response('aggregate', cache_key, render)
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error aggregating PRs: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+# API dữ liệu gọn cho các biểu đồ
+@app.route('/api/charts', methods=['GET'])
+def api_charts():
+    try:
+        org_name, labels, since_date, until_date = parse_report_params(request.args)
+        return cached_response('charts', create_cache_key(org_name, labels, since_date, until_date),
+                               lambda: charts_response(org_name, labels, since_date, until_date))
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error getting chart data: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+
+def charts_response(org_name, labels, since_date, until_date):
+    """Dữ liệu biểu đồ: trả về (kết quả, response JSON)"""
+    result = fetch_and_parse_prs(org_name, labels, since_date, until_date)
+    stats = result['stats']
+    developers = list(stats['developers'].items())
+    return result, jsonify({
+        'status': 'success',
+        'developers': {
+            'labels': [dev for dev, _ in developers],
+            'total_prs': [dev_stats['total_prs'] for _, dev_stats in developers],
+            'total_estimate': [round(dev_stats['total_estimate'], 2) for _, dev_stats in developers],
+            'total_actual': [round(dev_stats['total_actual'], 2) for _, dev_stats in developers]
+        },
+        'totals': {
+            'estimate': stats['total_estimate'],
+            'actual': stats['total_actual']
         }
+    })
+
+def iter_pr_batches(org_name, labels, since_date, until_date, batch_size=EXPORT_BATCH_SIZE):
+    """Trả về từng lô bản ghi PR cho export.
+
+    Dùng kết quả trong cache nếu còn dùng được; nếu không thì crawl GitHub và trả về từng trang
+    ngay khi parse xong (không giữ toàn bộ kết quả trong bộ nhớ, thứ tự theo trang về)."""
+    cached = get_usable_cached_result(org_name, labels, since_date, until_date)
+    if cached is not None:
+        prs_data = cached['prs_data']
+        for i in range(0, len(prs_data), batch_size):
+            yield prs_data[i:i + batch_size]
+        return
+
+    crawler = create_crawler()
+    query = build_search_query(org_name, labels)
+    for page in timed_iter(crawler.iter_pages(query, since_date, until_date, limit=MAX_PRS), 'github', _stage_seconds):
+        with span('parse', _stage_seconds):
+            records = [build_pr_record(pr, parsed) for pr, parsed in zip(page, parse_pr_batch(page))]
+        yield records
+
+
+# Export báo cáo dạng CSV/NDJSON (streaming, dòng tổng hợp ở cuối)
+@app.route('/export', methods=['GET'])
+def export_prs():
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unsupported export format: {fmt} (use {", ".join(EXPORT_FORMATS)})',
+            'timestamp': datetime.now().isoformat()
+        }), 400
+
+    org_name, labels, since_date, until_date = parse_report_params(request.args)
+    batches = iter_pr_batches(org_name, labels, since_date, until_date)
+    filename = f"prs-{org_name}-{since_date}-{until_date or 'now'}.{fmt}"
+    return Response(stream_with_context(stream_export(batches, fmt, new_stats(), add_record_to_stats)),
+                    mimetype=EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                             'X-Accel-Buffering': 'no'})
+
+def normalize_compare_spec(spec):
+    """Chuẩn hóa một truy vấn so sánh (org, labels, since, until) từ JSON"""
+    labels = spec.get('labels', spec.get('label', ['AI Generate']))
+    if isinstance(labels, str):
+        labels = [labels]
+    return {
+        'org': spec.get('org') or 'AperoVN',
+        # Label không phân biệt hoa thường giống search của GitHub
+        'labels': sorted({l.strip().lower(): l.strip() for l in labels if l and l.strip()}.values(), key=str.lower),
+        'since': spec.get('since') or DEFAULT_SINCE_DATE,
+        'until': spec.get('until') or ''
+    }
+
+
+def plan_compare_fetches(specs):
+    """Gom các truy vấn thành ít lần fetch nhất. PR có đủ label của một truy vấn thì cũng có mọi tập con
+    của chúng, nên lần fetch theo tập label A phục vụ được mọi truy vấn có tập label chứa A. Mỗi org fetch
+    theo các tập label nhỏ nhất (không chứa tập label của truy vấn khác; truy vấn không label phục vụ
+    mọi truy vấn của org) với khoảng ngày bao các truy vấn được phục vụ. Các truy vấn không có label
+    chung vẫn fetch riêng để không phải lấy toàn bộ PR của org.
+    Trả về [(org, labels, since, until, [chỉ số truy vấn])]"""
+    by_org = {}
+    for i, spec in enumerate(specs):
+        by_org.setdefault(spec['org'].lower(), []).append(i)
+
+    fetches = []
+    for indexes in by_org.values():
+        label_sets = {i: frozenset(l.lower() for l in specs[i]['labels']) for i in indexes}
+        bases = []
+        for label_set in sorted(set(label_sets.values()), key=lambda labels: (len(labels), sorted(labels))):
+            if not any(base <= label_set for base in bases):
+                bases.append(label_set)
+        groups = {base: [] for base in bases}
+        for i in indexes:
+            groups[next(base for base in bases if base <= label_sets[i])].append(i)
+        for base, group in groups.items():
+            labels = [l for l in specs[group[0]]['labels'] if l.lower() in base]
+            untils = [specs[i]['until'] for i in group]
+            fetches.append((specs[group[0]]['org'], labels, min(specs[i]['since'] for i in group),
+                            '' if '' in untils else max(untils), group))
+    return fetches
+
+
+def compare_spec_fetch(spec):
+    """Tham số fetch riêng cho một truy vấn so sánh"""
+    return spec['org'], spec['labels'], spec['since'], spec['until']
+
+
+def result_truncated(result):
+    """Kết quả bị cắt bởi MAX_PRS (GitHub tìm thấy nhiều PR hơn số đã lấy)"""
+    return result['stats']['total_prs_found'] > result['stats']['total_prs_processed']
 
-        return render_template('result.html', **template_data)
 
+def compare_spec_stats(records, spec):
+    """Lọc các PR của lần fetch chung theo truy vấn và tổng hợp thống kê"""
+    wanted = {l.lower() for l in spec['labels']}
+    stats = new_stats()
+    total = 0
+    for record in records:
+        if record['created_at'] < spec['since'] or (spec['until'] and record['created_at'] > spec['until']):
+            continue
+        if wanted and not wanted <= {l.lower() for l in record.get('labels', [])}:
+            continue
+        add_record_to_stats(stats, record)
+        total += 1
+    return {
+        'total_prs': total,
+        'total_estimate': round(stats['total_estimate'], 2),
+        'total_actual': round(stats['total_actual'], 2),
+        'efficiency': round(compute_efficiency(stats['total_estimate'], stats['total_actual']), 1),
+        'developers': stats['developers'],
+        'projects': stats['projects']
+    }
+
+
+# So sánh nhiều truy vấn (org, labels, khoảng ngày) trong một request - PR được fetch chung
+@app.route('/api/compare', methods=['POST'])
+def api_compare():
+    payload = request.get_json(silent=True) or {}
+    queries = payload.get('queries')
+    if not isinstance(queries, list) or not queries or len(queries) > COMPARE_MAX_QUERIES:
+        return jsonify({
+            'status': 'error',
+            'message': f'"queries" must be a list of 1-{COMPARE_MAX_QUERIES} query objects',
+            'timestamp': datetime.now().isoformat()
+        }), 400
+
+    try:
+        specs = [normalize_compare_spec(spec) for spec in queries]
+        fetches = plan_compare_fetches(specs)
+
+        # Lần fetch chưa có trong cache chạy bằng job nền thay vì giữ request trong lúc crawl GitHub;
+        # client poll các job rồi gửi lại yêu cầu so sánh
+        if ASYNC_REPORTS:
+            cold = []
+            for fetch in fetches:
+                cached = get_usable_cached_result(*fetch[:4], peek=True)
+                if cached is None:
+                    cold.append(fetch[:4])
+                elif result_truncated(cached):
+                    # Lần fetch chung bị cắt: các truy vấn hẹp hơn sẽ được fetch riêng
+                    cold.extend(compare_spec_fetch(specs[i]) for i in fetch[4]
+                                if compare_spec_fetch(specs[i]) != fetch[:4]
+                                and get_usable_cached_result(*compare_spec_fetch(specs[i]), peek=True) is None)
+            if cold:
+                job_ids = [submit_report_job(*fetch) for fetch in cold]
+                return jsonify({
+                    'status': 'pending',
+                    'message': 'Data is being fetched; retry the comparison when the jobs are done',
+                    'jobs': [{'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}
+                             for job_id in job_ids],
+                    'timestamp': datetime.now().isoformat()
+                }), 202
+
+        results = [None] * len(specs)
+
+        def run(fetch):
+            org_name, labels, since_date, until_date, indexes = fetch
+            shared = fetch_and_parse_prs(org_name, labels, since_date, until_date)
+            for i in indexes:
+                result = shared
+                # Lần fetch chung bị cắt bởi MAX_PRS thì truy vấn hẹp hơn có thể thiếu PR - fetch riêng truy vấn đó
+                if result_truncated(shared) and compare_spec_fetch(specs[i]) != fetch[:4]:
+                    result = fetch_and_parse_prs(*compare_spec_fetch(specs[i]))
+                results[i] = {**specs[i], 'stats': compare_spec_stats(result['prs_data'], specs[i]),
+                              'truncated': result_truncated(result)}
+
+        # Các org khác nhau được fetch song song
+        with ThreadPoolExecutor(max_workers=max(1, min(COMPARE_WORKERS, len(fetches))),
+                                thread_name_prefix='compare') as executor:
+            list(executor.map(run, fetches))
+
+        return jsonify({
+            'status': 'success',
+            'results': results,
+            'fetches': [{'org': org_name, 'labels': labels, 'since': since_date, 'until': until_date}
+                        for org_name, labels, since_date, until_date, _ in fetches],
+            'timestamp': datetime.now().isoformat()
+        })
     except Exception as e:
-        # Chuẩn bị thông báo lỗi chi tiết
-        error_type = type(e).__name__
-        error_message = f"Lỗi khi xử lý dữ liệu: {error_type}: {str(e)}"
-        
-        # Thêm thông tin về timeout nếu có thể là lỗi timeout
-        if "timeout" in str(e).lower() or "time out" in str(e).lower():
-            error_message += f"\n\nLỗi có thể do timeout khi gọi GitHub API. Timeout hiện tại: {GITHUB_TIMEOUT}s"
-            error_message += "\nThử tăng giá trị GITHUB_TIMEOUT trong biến môi trường hoặc giảm phạm vi tìm kiếm."
-        
-        return render_template('error.html', error=error_message, **get_system_info())
+        return jsonify({
+            'status': 'error',
+            'message': f'Error comparing queries: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+def record_matches_query(record, query):
+    """PR có thuộc kết quả của truy vấn (org đã khớp) hay không - cùng điều kiện với search query"""
+    if record['created_at'] < query['since'] or (query['until'] and record['created_at'] > query['until']):
+        return False
+    return {l.lower() for l in query['labels']} <= {l.lower() for l in record['labels']}
+
+
+def apply_pull_request_event(org_name, record):
+    """Cập nhật index, rollup và mọi kết quả đã cache của org theo PR vừa thay đổi"""
+    if PR_INDEX_ENABLED:
+        # Webhook chứa id pull request; PR đã có trong index giữ id đã lưu (id issue với backend rest)
+        known_id = _pr_index.find_id(record['url'])
+        if known_id is not None:
+            record['id'] = known_id
+        _pr_index.upsert(org_name, [record])
+    _label_index.observe(org_name, [record])
+
+    for cache_key in _pr_cache.keys():
+        # Lọc theo org trong cache key để không giải mã entry của org khác
+        if cache_key_org(cache_key).lower() != org_name.lower():
+            continue
+        with _fetch_lease(cache_key):
+            # peek: việc cập nhật của webhook không tính là hit và không làm entry "mới dùng" trong LRU
+            entry = _pr_cache.peek(cache_key)
+            cached = entry[0] if entry is not None else None
+            query = cached.get('query') if cached is not None else None
+            if query is None or query['org'].lower() != org_name.lower():
+                continue
+            present = any(r['url'] == record['url'] for r in cached['prs_data'])
+            if record_matches_query(record, query):
+                result = apply_pr_changes(cached, [record])
+            elif present:
+                # PR không còn khớp truy vấn (VD: bị gỡ label)
+                result = apply_pr_changes(cached, [], removed_urls=[record['url']])
+            else:
+                continue
+            result['revision'] = cached.get('revision', 0) + 1
+            # Giữ nguyên thời gian lưu giữ còn lại của entry
+            stored_at = _pr_cache.stored_at(cache_key) or time.time()
+            _pr_cache.set(cache_key, result, ttl=max(1, _pr_cache.ttl - (time.time() - stored_at)))
+
+
+def handle_webhook_event(event, payload):
+    """Xử lý một event webhook (chạy trên thread của hàng đợi)"""
+    org_name = (payload.get('organization') or payload.get('repository', {}).get('owner') or {}).get('login')
+    if not org_name:
+        return
+    if event == 'pull_request':
+        pr = WebhookPullRequest(payload['pull_request'])
+        apply_pull_request_event(org_name, build_pr_record(pr, parse_pr_info(pr)))
+    elif event == 'label':
+        label = payload['label']['name']
+        if payload['action'] == 'deleted':
+            _label_index.remove_label(org_name, label)
+        else:
+            old_name = payload.get('changes', {}).get('name', {}).get('from')
+            if old_name:
+                _label_index.remove_label(org_name, old_name)
+            _label_index.add_repo_label(org_name, label)
+
+
+_webhook_queue = WebhookQueue(handle_webhook_event, WEBHOOK_QUEUE_SIZE)
+
+
+# Nhận webhook pull_request / label từ GitHub (có chữ ký), xử lý ở nền
+@app.route('/webhooks/github', methods=['POST'])
+def github_webhook():
+    if not GITHUB_WEBHOOK_SECRET:
+        return jsonify({
+            'status': 'error',
+            'message': 'GITHUB_WEBHOOK_SECRET is not configured',
+            'timestamp': datetime.now().isoformat()
+        }), 503
+    if not verify_signature(GITHUB_WEBHOOK_SECRET, request.get_data(),
+                            request.headers.get('X-Hub-Signature-256', '')):
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid signature',
+            'timestamp': datetime.now().isoformat()
+        }), 401
+
+    event = request.headers.get('X-GitHub-Event', '')
+    payload = request.get_json(silent=True)
+    if event not in WEBHOOK_EVENTS or event == 'ping' or payload is None:
+        return jsonify({'status': 'ignored', 'event': event, 'timestamp': datetime.now().isoformat()})
+    if not _webhook_queue.submit(event, payload):
+        return jsonify({
+            'status': 'error',
+            'message': 'Webhook queue is full',
+            'timestamp': datetime.now().isoformat()
+        }), 503
+    return jsonify({'status': 'queued', 'event': event, 'timestamp': datetime.now().isoformat()}), 202
 
 # Thêm route để xóa cache khi cần thiết
 @app.route('/clear-cache', methods=['GET'])
 def clear_cache():
     try:
-        global _pr_cache, _cache_timestamp
-        _pr_cache = {}
-        _cache_timestamp = {}
+        # Xóa cache dùng chung - có hiệu lực với tất cả worker
+        # (response đã render ở worker khác không còn phiên bản dữ liệu tương ứng nên cũng mất hiệu lực)
+        _pr_cache.clear()
+        _response_cache.clear()
+        # Không để lần khởi động sau khôi phục lại dữ liệu vừa xóa
+        if SNAPSHOT_ENABLED:
+            remove_snapshot(SNAPSHOT_PATH)
         return jsonify({
             'status': 'success',
             'message': 'Cache cleared successfully',
@@ -400,71 +1710,149 @@ def clear_cache():
             'timestamp': datetime.now().isoformat()
         }), 500
 
-# Lấy danh sách labels của một organization
-@lru_cache(maxsize=5)
-def get_organization_labels(org_name):
-    """Lấy danh sách các labels phổ biến trong các repository của organization"""
+# Đo thời gian mỗi request; các bước (github, parse, aggregate, render...) được cộng dồn trong request
+@app.before_request
+def start_request_timing():
+    start_request()
+
+
+@app.after_request
+def finish_request_timing(response):
+    total, timings = finish_request()
+    if total is not None:
+        _http_request_seconds.observe(total, endpoint=request.endpoint or 'unknown', status=str(response.status_code))
+        if SERVER_TIMING_ENABLED:
+            response.headers['Server-Timing'] = server_timing_header(total, timings)
+    return response
+
+
+# Số đo hiệu năng theo định dạng Prometheus (số đo của worker đang trả lời request)
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Thêm route để xem thống kê cache
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
     try:
-        g = Github(GITHUB_TOKEN, timeout=GITHUB_TIMEOUT)
-        org = g.get_organization(org_name)
-        
-        # Lấy các repository của organization
-        repos = org.get_repos()[:10]  # Giới hạn số lượng repo để tránh timeout
-        
-        # Tập hợp để lưu trữ các labels duy nhất
-        all_labels = set()
-        
-        # Lấy labels từ mỗi repository
-        for repo in repos:
-            try:
-                repo_labels = repo.get_labels()
-                for label in repo_labels:
-                    all_labels.add(label.name)
-            except Exception as e:
-                print(f"Error fetching labels from repo {repo.name}: {e}")
+        stats = _pr_cache.stats()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0
+        stats['soft_ttl'] = CACHE_SOFT_TTL
+        stats['hard_ttl'] = CACHE_HARD_TTL
+        with _inflight_lock:
+            stats['inflight_fetches'] = len(_inflight)
+        if PR_INDEX_ENABLED:
+            stats['pr_index'] = _pr_index.stats()
+        if HTTP_CACHE_ENABLED:
+            stats['http_cache'] = _github_clients.http_cache.stats()
+        stats['label_index'] = _label_index.stats()
+        stats['webhooks'] = _webhook_queue.stats()
+        stats['response_cache'] = _response_cache.stats()
+        if SNAPSHOT_ENABLED:
+            stats['snapshot'] = snapshot_stats()
+        stats['timestamp'] = datetime.now().isoformat()
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error getting cache stats: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
 
-        # Trả về danh sách labels đã sắp xếp
-        return sorted(list(all_labels))
-    except Exception:
-        return []
+# Thống kê scheduler làm nóng cache
+@app.route('/prewarm-stats', methods=['GET'])
+def prewarm_stats():
+    try:
+        cache_stats = _pr_cache.stats()
+        lookups = cache_stats.get('hits', 0) + cache_stats.get('misses', 0)
+        return jsonify({
+            'status': 'success',
+            'enabled': PREWARM_ENABLED and bool(GITHUB_TOKEN),
+            'interval': PREWARM_INTERVAL,
+            'top_n': PREWARM_TOP_N,
+            'budget_share': PREWARM_BUDGET_SHARE,
+            'leader_active': _pr_cache.is_locked(PREWARM_LEADER_LOCK),
+            'scheduler': _query_stats.stats(),
+            'top_queries': [{'cache_key': cache_key, 'hits': hits, 'age': prewarm_cache_age(cache_key)}
+                            for cache_key, _, hits in _query_stats.top(PREWARM_TOP_N, PREWARM_WINDOW)],
+            'cache_hit_rate': round(cache_stats.get('hits', 0) / lookups, 4) if lookups else 0,
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error getting prewarm stats: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
 
-# Lấy danh sách labels từ các PRs gần đây
-@lru_cache(maxsize=5)
-def get_recent_pr_labels(org_name, limit=100):
-    """Lấy danh sách các labels từ các PRs gần đây"""
+# Dung lượng bộ nhớ của từng entry cache và các bảng ghi nhớ trong worker này
+@app.route('/cache-memory', methods=['GET'])
+def cache_memory():
     try:
-        g = Github(GITHUB_TOKEN, timeout=GITHUB_TIMEOUT)
-        
-        # Tìm kiếm các PRs gần đây
-        query = f'org:{org_name} is:pr sort:created-desc'
-        prs = g.search_issues(query=query)
-        
-        # Tập hợp để lưu trữ các labels duy nhất
-        all_labels = set()
-        
-        # Lấy labels từ mỗi PR
-        count = 0
-        for pr in prs:
-            if count >= limit:
-                break
-                
-            for label in pr.labels:
-                all_labels.add(label.name)
-                
-            count += 1
-        
-        # Trả về danh sách labels đã sắp xếp
-        return sorted(list(all_labels))
-    except Exception:
-        return []
+        entries = []
+        for cache_key in _pr_cache.keys():
+            entry = _pr_cache.peek(cache_key)
+            if entry is None:
+                continue
+            value, stored_bytes = entry
+            records = len(value.get('prs_data', [])) if isinstance(value, dict) else 0
+            memory_bytes = deep_sizeof(value)
+            entries.append({
+                'cache_key': cache_key,
+                'records': records,
+                'memory_bytes': memory_bytes,
+                'bytes_per_record': round(memory_bytes / records, 1) if records else None,
+                'stored_bytes': stored_bytes
+            })
+        entries.sort(key=lambda e: e['memory_bytes'], reverse=True)
+        with _sorted_prs_lock:
+            # Danh sách đã sắp xếp dùng chung bản ghi với cache nên chỉ tính phần danh sách
+            sorted_bytes = sum(sys.getsizeof(rows) for rows in _sorted_prs.values())
+        with _columnar_prs_lock:
+            columnar_bytes = deep_sizeof(list(_columnar_prs.values()))
+        return jsonify({
+            'status': 'success',
+            'backend': CACHE_BACKEND,
+            'entries': entries,
+            'total_memory_bytes': sum(e['memory_bytes'] for e in entries),
+            'memos': {'sorted_prs': {'entries': len(_sorted_prs), 'memory_bytes': sorted_bytes},
+                      'columnar_prs': {'entries': len(_columnar_prs), 'memory_bytes': columnar_bytes}},
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error getting cache memory: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+# Thêm route để xem budget rate limit còn lại của GitHub API
+@app.route('/rate-limit', methods=['GET'])
+def rate_limit_status():
+    try:
+        limits = _github_clients.rate_limits.snapshot()
+        for info in limits.values():
+            info['reset_at'] = datetime.fromtimestamp(info['reset']).isoformat() if info['reset'] else None
+        return jsonify({
+            'status': 'success',
+            'resources': limits,
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error getting rate limit: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
 
 # Thêm route để lấy danh sách labels
 @app.route('/labels', methods=['GET'])
 def get_labels():
     try:
         org_name = request.args.get('org', 'AperoVN')
-        labels = get_recent_pr_labels(org_name)
-        
+        labels = get_available_labels(org_name)
+
         return jsonify({
             'status': 'success',
             'labels': labels,
@@ -486,7 +1874,41 @@ def show_config():
         config = {
             'max_prs': MAX_PRS,
             'github_timeout': GITHUB_TIMEOUT,
+            'github_pool_size': GITHUB_POOL_SIZE,
+            'http_cache_enabled': HTTP_CACHE_ENABLED,
             'cache_timeout': CACHE_TIMEOUT,
+            'cache_soft_ttl': CACHE_SOFT_TTL,
+            'cache_hard_ttl': CACHE_HARD_TTL,
+            'cache_retention': CACHE_RETENTION,
+            'delta_refresh_max_age': DELTA_REFRESH_MAX_AGE,
+            'incremental_refresh': INCREMENTAL_REFRESH,
+            'fetch_backend': FETCH_BACKEND,
+            'github_api_url': GITHUB_API_URL or 'https://api.github.com',
+            'crawl_workers': CRAWL_WORKERS,
+            'search_rate_limit': SEARCH_RATE_LIMIT,
+            'search_page_size': SEARCH_PAGE_SIZE,
+            'async_reports': ASYNC_REPORTS,
+            'job_workers': JOB_WORKERS,
+            'export_batch_size': EXPORT_BATCH_SIZE,
+            'server_timing': SERVER_TIMING_ENABLED,
+            'response_cache_enabled': RESPONSE_CACHE_ENABLED,
+            'response_cache_max_bytes': RESPONSE_CACHE_MAX_BYTES,
+            'snapshot_enabled': SNAPSHOT_ENABLED,
+            'snapshot_path': SNAPSHOT_PATH,
+            'snapshot_interval': SNAPSHOT_INTERVAL,
+            'webhook_configured': bool(GITHUB_WEBHOOK_SECRET),
+            'compare_max_queries': COMPARE_MAX_QUERIES,
+            'label_index_ttl': LABEL_INDEX_TTL,
+            'label_retry_after': LABEL_RETRY_AFTER,
+            'prewarm_enabled': PREWARM_ENABLED,
+            'prewarm_interval': PREWARM_INTERVAL,
+            'prewarm_top_n': PREWARM_TOP_N,
+            'prewarm_budget_share': PREWARM_BUDGET_SHARE,
+            'pr_index_enabled': PR_INDEX_ENABLED,
+            'pr_index_sync_ttl': PR_INDEX_SYNC_TTL,
+            'cache_backend': CACHE_BACKEND,
+            'cache_dir': CACHE_DIR,
+            'cache_max_bytes': CACHE_MAX_BYTES,
             'default_since_date': DEFAULT_SINCE_DATE,
             'environment': os.getenv('FLASK_ENV', 'development'),
             'debug_mode': os.getenv('FLASK_DEBUG', '0') == '1',
@@ -0,0 +1,95 @@
+"""Benchmark parse PR: so sánh parser một lần quét với bản cũ trên tập PR tổng hợp.
+
+Chạy: python benchmarks/bench_parser.py [số PR] [số lần lặp]
+"""
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pr_parser import parse_pr_batch, parse_pr_info_legacy  # noqa: E402
+
+TIME_VALUES = ['1h', '2h', '1,5h', '1.5h', '0.25h', '30m', '45p', '90m', '1,5m', '3H', '10h', '0m']
+KEYWORDS = ['Estimate Time:', 'Est Time:', 'Estimate time', 'EST TIME:', 'Actual Time:', 'actual time:',
+            'ActualTime:', 'Estimate  Time :']
+FILLER = ['Fix crash khi mở màn hình chi tiết.', 'Refactor adapter cho danh sách sản phẩm.',
+          'Cập nhật dependency và sửa warning lint.', '- [x] Đã test trên Android 13',
+          '```kotlin\nval estimate = time.toHours()\n```', 'See https://github.com/AperoVN/app/pull/123']
+
+
+def _typical_body(rng):
+    lines = ['## Issued tickets', f'AIP{rng.randint(1, 300)}-{rng.randint(1, 999)}']
+    lines += rng.sample(FILLER, 3)
+    lines.append(f'{rng.choice(KEYWORDS[:4])} {rng.choice(TIME_VALUES)}')
+    lines.append(f'{rng.choice(KEYWORDS[4:])} {rng.choice(TIME_VALUES)}')
+    return '\n'.join(lines)
+
+
+def _long_body(rng):
+    # Body dài (log, diff dán vào PR) với dòng thời gian ở cuối
+    lines = [rng.choice(FILLER) for _ in range(400)]
+    lines.append(f'Estimate Time: {rng.choice(TIME_VALUES)}\nActual Time: {rng.choice(TIME_VALUES)}')
+    return '\n'.join(lines)
+
+
+def _pathological_body(rng):
+    kind = rng.randrange(4)
+    if kind == 0:
+        # Rất nhiều tiền tố gần khớp nhưng không có đơn vị
+        return 'Estimate Time: 1' * 2000
+    if kind == 1:
+        # Chuỗi số dài không có đơn vị
+        return 'Est Time: ' + '9' * 20000
+    if kind == 2:
+        # Nhiều dòng thời gian - dòng cuối được dùng
+        return '\n'.join(f'{rng.choice(KEYWORDS)} {rng.choice(TIME_VALUES)}' for _ in range(500))
+    return 'AIP' * 5000 + '-' * 100
+
+
+def make_corpus(size, seed=42, long_ratio=0.05, pathological_ratio=0.01):
+    """Tạo danh sách PR giả với phân bố body gần giống thực tế"""
+    rng = random.Random(seed)
+    prs = []
+    for i in range(size):
+        roll = rng.random()
+        if roll < pathological_ratio:
+            body = _pathological_body(rng)
+        elif roll < pathological_ratio + long_ratio:
+            body = _long_body(rng)
+        else:
+            body = _typical_body(rng)
+        title = f'[AIP{rng.randint(1, 300)}-{rng.randint(1, 999)}] Update' if rng.random() < 0.5 else 'Update'
+        prs.append(SimpleNamespace(title=title, body=body if rng.random() > 0.02 else None))
+    return prs
+
+
+def _measure(fn, prs, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(prs)
+        best = min(best, time.perf_counter() - start)
+    return len(prs) / best
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    prs = make_corpus(size)
+
+    legacy = [parse_pr_info_legacy(pr) for pr in prs]
+    if parse_pr_batch(prs) != legacy:
+        sys.exit('Kết quả parse khác với bản cũ')
+
+    legacy_rate = _measure(lambda batch: [parse_pr_info_legacy(pr) for pr in batch], prs, repeat)
+    batch_rate = _measure(parse_pr_batch, prs, repeat)
+    print(f'corpus: {size} PRs, best of {repeat}')
+    print(f'legacy parse_pr_info : {legacy_rate:12,.0f} PRs/s')
+    print(f'parse_pr_batch       : {batch_rate:12,.0f} PRs/s  ({batch_rate / legacy_rate:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""Server GitHub API giả lập để benchmark/load test không tốn rate limit thật.
+
+Phục vụ /search/issues, /orgs/<org>, /orgs/<org>/repos, /repos/<org>/<repo>/labels và /rate_limit từ dữ liệu
+sinh ngẫu nhiên (cố định theo seed), có độ trễ mỗi request và lỗi 403 (primary/secondary rate limit) tùy chỉnh.
+GET /_fake/stats trả về số request đã phục vụ theo endpoint.
+
+Chạy riêng: python benchmarks/fake_github.py --port 8765 --prs 5000 --latency 0.05 --error-rate 0.02
+rồi chạy app với GITHUB_API_URL=http://127.0.0.1:8765
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SEARCH_CAP = 1000
+LABEL_POOL = ['AI Generate', 'bug', 'feature', 'refactor', 'Needs QA', 'hotfix', 'documentation', 'performance']
+TIME_VALUES = ['1h', '2h', '1,5h', '0.5h', '30m', '45p', '90m', '3H', '4h', '6h']
+
+
+class Fixtures:
+    """Dữ liệu giả của một org: repo, label theo repo và PR (sinh một lần theo seed)"""
+
+    def __init__(self, org='AperoVN', prs=2000, repos=20, developers=25, days=90, seed=1):
+        rng = random.Random(seed)
+        self.org = org
+        self.repos = [f'app-{i}' for i in range(repos)]
+        self.repo_labels = {repo: sorted(set(rng.sample(LABEL_POOL, rng.randint(3, len(LABEL_POOL))))
+                                         | {f'{repo}-team'}) for repo in self.repos}
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.prs = []
+        for i in range(prs):
+            repo = rng.choice(self.repos)
+            labels = ['AI Generate'] if rng.random() < 0.8 else []
+            labels += rng.sample(self.repo_labels[repo], rng.randint(0, 2))
+            created = now - timedelta(seconds=rng.randint(0, days * 86400))
+            self.prs.append({
+                'id': 10_000_000 + i,
+                'number': i + 1,
+                'title': f'PR {i}: cập nhật màn hình {rng.randint(1, 50)}',
+                'body': (f'## Issued tickets\nAIP{rng.randint(1, 40)}-{rng.randint(1, 999)}\n'
+                         f'Estimate Time: {rng.choice(TIME_VALUES)}\nActual Time: {rng.choice(TIME_VALUES)}'),
+                'login': f'dev{rng.randrange(developers)}',
+                'created': created,
+                'repo': repo,
+                'labels': sorted(set(labels))
+            })
+        self.prs.sort(key=lambda pr: pr['created'], reverse=True)
+
+
+def _parse_time(value, end_of_day):
+    if 'T' in value:
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+    day = datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    return day + timedelta(days=1, seconds=-1) if end_of_day else day
+
+
+def search(fixtures, query):
+    """Lọc PR theo các qualifier mà app dùng: org:, label:"...", created:A..B / >= / <=, updated:>="""
+    if f'org:{fixtures.org}'.lower() not in query.lower():
+        return []
+    labels = [label.lower() for label in re.findall(r'label:"([^"]+)"', query)]
+    start, end = None, None
+    window = re.search(r'created:(\S+)\.\.(\S+)', query)
+    if window:
+        start, end = _parse_time(window.group(1), False), _parse_time(window.group(2), True)
+    since = re.search(r'created:>=(\S+)', query)
+    until = re.search(r'created:<=(\S+)', query)
+    if since:
+        start = max(start, _parse_time(since.group(1), False)) if start else _parse_time(since.group(1), False)
+    if until:
+        end = min(end, _parse_time(until.group(1), True)) if end else _parse_time(until.group(1), True)
+    updated = re.search(r'updated:>=(\S+)', query)
+    # PR giả không bao giờ được cập nhật sau khi tạo
+    updated_since = _parse_time(updated.group(1), False) if updated else None
+
+    results = []
+    for pr in fixtures.prs:
+        if start and pr['created'] < start or end and pr['created'] > end:
+            continue
+        if updated_since and pr['created'] < updated_since:
+            continue
+        pr_labels = {label.lower() for label in pr['labels']}
+        if all(label in pr_labels for label in labels):
+            results.append(pr)
+    return results
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixtures, port=0, latency=0.0, error_rate=0.0, retry_after=0.1, seed=1):
+        super().__init__(('127.0.0.1', port), FakeGitHubHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def count(self, endpoint):
+        with self.lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            # rate_limited đã được tính trong endpoint của request bị lỗi
+            total = sum(count for endpoint, count in self.counts.items() if endpoint != 'rate_limited')
+            return {'total': total, **self.counts}
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='fake-github', daemon=True).start()
+        return self
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        return
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        reset = str(int(time.time()) + 60)
+        default_headers = {'X-RateLimit-Limit': '1000000', 'X-RateLimit-Remaining': '999999',
+                           'X-RateLimit-Reset': reset, 'X-RateLimit-Used': '1', 'X-RateLimit-Resource': 'core'}
+        for name, value in {**default_headers, **(headers or {})}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _paginate(self, items, params, path):
+        per_page = int(params.get('per_page', ['30'])[0])
+        page = int(params.get('page', ['1'])[0])
+        chunk = items[(page - 1) * per_page:page * per_page]
+        headers = {}
+        if page * per_page < len(items):
+            headers['Link'] = f'<{self.server.url}{path}?per_page={per_page}&page={page + 1}>; rel="next"'
+        return chunk, headers
+
+    def _rate_limited(self, resource):
+        """Lỗi rate limit ngẫu nhiên theo error_rate: một nửa secondary (Retry-After), một nửa primary"""
+        server = self.server
+        if not server.error_rate or server.rng.random() >= server.error_rate:
+            return False
+        server.count('rate_limited')
+        if server.rng.random() < 0.5:
+            self._send(403, {'message': 'You have exceeded a secondary rate limit. '
+                                        'Please wait a few minutes before you try again.'},
+                       {'Retry-After': str(server.retry_after), 'X-RateLimit-Resource': resource})
+        else:
+            self._send(403, {'message': 'API rate limit exceeded for user.'},
+                       {'X-RateLimit-Remaining': '0', 'X-RateLimit-Resource': resource,
+                        'X-RateLimit-Reset': str(int(time.time() + server.retry_after))})
+        return True
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts == ['_fake', 'stats']:
+            return self._send(200, server.stats())
+        if server.latency:
+            time.sleep(server.latency)
+
+        base = server.url
+        fixtures = server.fixtures
+        if parts == ['search', 'issues']:
+            server.count('search')
+            if self._rate_limited('search'):
+                return
+            results = search(fixtures, params.get('q', [''])[0])
+            page, _ = self._paginate(results[:SEARCH_CAP], params, url.path)
+            return self._send(200, {
+                'total_count': len(results),
+                'incomplete_results': False,
+                'items': [self._issue(pr) for pr in page]
+            }, {'X-RateLimit-Resource': 'search'})
+        if parts == ['rate_limit']:
+            server.count('rate_limit')
+            reset = int(time.time()) + 60
+            resources = {name: {'limit': 1000000, 'remaining': 999999, 'reset': reset, 'used': 1}
+                         for name in ('core', 'search', 'graphql')}
+            return self._send(200, {'resources': resources, 'rate': resources['core']})
+        if len(parts) >= 2 and parts[0] == 'orgs' and parts[1].lower() == fixtures.org.lower():
+            if len(parts) == 2:
+                server.count('org')
+                return self._send(200, {'login': fixtures.org, 'id': 1, 'url': f'{base}/orgs/{fixtures.org}'})
+            if parts[2:] == ['repos']:
+                server.count('repos')
+                if self._rate_limited('core'):
+                    return
+                repos = [{'id': i, 'name': repo, 'full_name': f'{fixtures.org}/{repo}',
+                          'url': f'{base}/repos/{fixtures.org}/{repo}'} for i, repo in enumerate(fixtures.repos)]
+                page, headers = self._paginate(repos, params, url.path)
+                return self._send(200, page, headers)
+        if len(parts) == 4 and parts[0] == 'repos' and parts[3] == 'labels' and parts[2] in fixtures.repo_labels:
+            server.count('labels')
+            if self._rate_limited('core'):
+                return
+            labels = [{'name': label, 'color': 'ededed',
+                       'url': f'{base}/repos/{fixtures.org}/{parts[2]}/labels/{label}'}
+                      for label in fixtures.repo_labels[parts[2]]]
+            page, headers = self._paginate(labels, params, url.path)
+            return self._send(200, page, headers)
+
+        server.count('not_found')
+        return self._send(404, {'message': 'Not Found'})
+
+    def _issue(self, pr):
+        base = self.server.url
+        org = self.server.fixtures.org
+        created = pr['created'].strftime('%Y-%m-%dT%H:%M:%SZ')
+        return {
+            'id': pr['id'],
+            'number': pr['number'],
+            'title': pr['title'],
+            'body': pr['body'],
+            'state': 'open',
+            'user': {'login': pr['login'], 'id': 1},
+            'labels': [{'name': label} for label in pr['labels']],
+            'created_at': created,
+            'updated_at': created,
+            'url': f'{base}/repos/{org}/{pr["repo"]}/issues/{pr["number"]}',
+            'html_url': f'https://github.com/{org}/{pr["repo"]}/pull/{pr["number"]}',
+            'pull_request': {'url': f'{base}/repos/{org}/{pr["repo"]}/pulls/{pr["number"]}'}
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--org', default='AperoVN')
+    parser.add_argument('--prs', type=int, default=2000)
+    parser.add_argument('--repos', type=int, default=20)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--latency', type=float, default=0.0, help='Độ trễ mỗi request (giây)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Tỷ lệ request bị trả về 403 rate limit')
+    parser.add_argument('--retry-after', type=float, default=0.1)
+    args = parser.parse_args()
+
+    fixtures = Fixtures(args.org, args.prs, args.repos, days=args.days)
+    server = FakeGitHubServer(fixtures, args.port, args.latency, args.error_rate, args.retry_after)
+    print(f'Fake GitHub API for org {args.org} ({args.prs} PRs, {args.repos} repos) at {server.url}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""Load test app với server GitHub giả lập: đo throughput, độ trễ p50/p99, số request GitHub mỗi request và peak RSS.
+
+Các kịch bản:
+  fetch          fetch_and_parse_prs với khoảng ngày khác nhau mỗi lần (cache miss, crawl đầy đủ)
+  index          GET / với cùng một truy vấn (lần đầu crawl, sau đó phục vụ từ cache và render trang)
+  labels         GET /labels (đọc index label)
+  labels_refresh refresh_org_labels (lấy label của mọi repo trong org từ GitHub), chạy tuần tự
+
+Chạy: python benchmarks/load_test.py --prs 5000 --latency 0.02 --error-rate 0.01 --concurrency 8 --requests 40
+Dùng --github-url để chạy với server giả lập đã khởi động riêng (RSS khi đó chỉ gồm app).
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_github import FakeGitHubServer, Fixtures  # noqa: E402
+
+SCENARIOS = ('fetch', 'index', 'labels', 'labels_refresh')
+# Kịch bản chạy tuần tự bất kể --concurrency: các lần refresh_org_labels đồng thời trả về ngay khi khóa của org
+# đang được giữ nên throughput chỉ đo các lần gọi không làm gì
+SERIAL_SCENARIOS = ('labels_refresh',)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    # ru_maxrss tính bằng KB trên Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def github_calls(github_url):
+    with urllib.request.urlopen(f'{github_url}/_fake/stats') as response:
+        return json.load(response)
+
+
+def configure_app(github_url, args):
+    """Đặt cấu hình trước khi import app (app đọc biến môi trường lúc import)"""
+    os.environ.update({
+        'GITHUB_TOKEN': 'fake-token',
+        'GITHUB_API_URL': github_url,
+        'FETCH_BACKEND': 'rest',
+        'CACHE_DIR': tempfile.mkdtemp(prefix='review-ai-bench-'),
+        'CACHE_BACKEND': args.cache_backend,
+        'SEARCH_RATE_LIMIT': '100000',
+        'MAX_PRS': '0',
+        'PR_INDEX_ENABLED': '1' if args.pr_index else '0',
+        'HTTP_CACHE_ENABLED': '0',
+        'ASYNC_REPORTS': '0',
+        'PREWARM_ENABLED': '0'
+    })
+    import app
+    return app
+
+
+def make_scenario(name, app, args, client_local):
+    since_base = datetime.now() - timedelta(days=args.days)
+    labels = args.label
+
+    def client():
+        if not hasattr(client_local, 'client'):
+            client_local.client = app.app.test_client()
+        return client_local.client
+
+    if name == 'fetch':
+        def run(i):
+            # Mỗi request một khoảng ngày khác nhau để luôn là cache miss
+            since = (since_base + timedelta(days=i % max(1, args.days - 1))).strftime('%Y-%m-%d')
+            until = (datetime.now() + timedelta(days=i // max(1, args.days - 1))).strftime('%Y-%m-%d')
+            app.fetch_and_parse_prs(args.org, labels, since, until)
+    elif name == 'index':
+        params = {'org': args.org, 'label': labels, 'since': since_base.strftime('%Y-%m-%d')}
+
+        def run(i):
+            response = client().get('/', query_string=params)
+            if response.status_code != 200:
+                raise RuntimeError(f'HTTP {response.status_code}')
+    elif name == 'labels':
+        def run(i):
+            response = client().get('/labels', query_string={'org': args.org})
+            if response.status_code != 200:
+                raise RuntimeError(f'HTTP {response.status_code}')
+    else:
+        def run(i):
+            app.refresh_org_labels(args.org)
+    return run
+
+
+def wait_idle(app, timeout=60):
+    """Chờ các việc nền của kịch bản trước (làm mới label/cache) xong để không ảnh hưởng số đo"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with app._inflight_lock:
+            if not app._label_refreshing and not app._inflight:
+                return
+        time.sleep(0.05)
+
+
+def run_scenario(name, app, args, github_url):
+    wait_idle(app)
+    run = make_scenario(name, app, args, threading.local())
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def timed(i):
+        started = time.perf_counter()
+        try:
+            run(i)
+        except Exception as e:
+            with lock:
+                errors.append(f'{type(e).__name__}: {e}')
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    concurrency = 1 if name in SERIAL_SCENARIOS else args.concurrency
+    calls_before = github_calls(github_url)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    calls_after = github_calls(github_url)
+
+    calls = calls_after['total'] - calls_before['total']
+    return {
+        'scenario': name,
+        'requests': args.requests,
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'throughput_rps': round(args.requests / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'github_calls_per_request': round(calls / args.requests, 2),
+        'github_rate_limited': calls_after.get('rate_limited', 0) - calls_before.get('rate_limited', 0),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--org', default='AperoVN')
+    parser.add_argument('--label', default='AI Generate')
+    parser.add_argument('--prs', type=int, default=2000, help='Số PR của org giả lập')
+    parser.add_argument('--repos', type=int, default=20)
+    parser.add_argument('--days', type=int, default=90, help='Khoảng thời gian chứa các PR')
+    parser.add_argument('--latency', type=float, default=0.02, help='Độ trễ mỗi request GitHub (giây)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Tỷ lệ request GitHub bị 403 rate limit')
+    parser.add_argument('--retry-after', type=float, default=0.1)
+    parser.add_argument('--cache-backend', default='sqlite', choices=('sqlite', 'memory'))
+    parser.add_argument('--pr-index', action='store_true', help='Bật index PR cục bộ')
+    parser.add_argument('--github-url', help='Dùng server giả lập đang chạy thay vì khởi động trong process')
+    parser.add_argument('--json', action='store_true', help='In kết quả dạng JSON (để so sánh giữa các lần chạy)')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    github_url = args.github_url
+    if not github_url:
+        fixtures = Fixtures(args.org, args.prs, args.repos, days=args.days)
+        github_url = FakeGitHubServer(fixtures, latency=args.latency, error_rate=args.error_rate,
+                                      retry_after=args.retry_after).start().url
+    app = configure_app(github_url, args)
+
+    results = [run_scenario(name, app, args, github_url) for name in scenarios]
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    columns = ('scenario', 'requests', 'errors', 'throughput_rps', 'p50_ms', 'p99_ms', 'github_calls_per_request',
+               'github_rate_limited', 'peak_rss_mb')
+    print('  '.join(f'{column:>24s}' if i else f'{column:16s}' for i, column in enumerate(columns)))
+    for result in results:
+        print('  '.join(f'{result[column]!s:>24s}' if i else f'{result[column]!s:16s}'
+                        for i, column in enumerate(columns)))
+        if result['first_error']:
+            print(f'    first error: {result["first_error"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Phát lại các payload webhook đã ghi lại vào một server đang chạy (ký bằng GITHUB_WEBHOOK_SECRET).
+
+Mỗi file JSON có dạng {"event": "<X-GitHub-Event>", "payload": {...}}, được gửi theo thứ tự tên file.
+
+Chạy: GITHUB_WEBHOOK_SECRET=... python benchmarks/replay_webhooks.py [thư mục payload] [URL webhook]
+"""
+import glob
+import hashlib
+import hmac
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webhook_payloads')
+DEFAULT_URL = 'http://localhost:5000/webhooks/github'
+
+
+def load_payloads(directory):
+    """Đọc các payload đã ghi lại: [(tên file, event, body bytes)]"""
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            recorded = json.load(f)
+        payloads.append((os.path.basename(path), recorded['event'],
+                         json.dumps(recorded['payload']).encode('utf-8')))
+    return payloads
+
+
+def sign(secret, body):
+    return 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+def webhook_headers(secret, event, body):
+    return {
+        'Content-Type': 'application/json',
+        'X-GitHub-Event': event,
+        'X-Hub-Signature-256': sign(secret, body)
+    }
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DIR
+    url = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_URL
+    secret = os.getenv('GITHUB_WEBHOOK_SECRET', '')
+    if not secret:
+        sys.exit('GITHUB_WEBHOOK_SECRET is not set')
+
+    for name, event, body in load_payloads(directory):
+        request = urllib.request.Request(url, data=body, headers=webhook_headers(secret, event, body), method='POST')
+        try:
+            with urllib.request.urlopen(request) as response:
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        print(f'{name:40s} {event:15s} {status}')
+
+
+if __name__ == '__main__':
+    main()
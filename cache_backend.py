@@ -0,0 +1,342 @@
+"""Cache backend cho kết quả PR - dùng chung giữa các gunicorn worker"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from pr_record import json_default, json_object_hook
+
+
+def _encode(value):
+    """Serialize giá trị cache thành bytes (JSON nén zlib, PRRecord ghi thành mảng)"""
+    return zlib.compress(json.dumps(value, separators=(',', ':'), default=json_default).encode('utf-8'), 1)
+
+
+def _decode(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'), object_hook=json_object_hook)
+
+
+class MemoryCacheBackend:
+    """Cache trong bộ nhớ của từng process (không chia sẻ giữa các worker)"""
+
+    def __init__(self, ttl, max_bytes):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size, expires_at, stored_at)
+        self._total_bytes = 0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self._locks = {}  # name -> (owner, expires_at)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= time.time():
+                if entry is not None:
+                    self._remove(key)
+                self._counters['misses'] += 1
+                return None
+            # Đánh dấu vừa được dùng (LRU)
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None, stored_at=None):
+        """stored_at: thời điểm ghi gốc khi khôi phục entry từ snapshot (mặc định là bây giờ)"""
+        size = len(_encode(value))
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at, stored_at or now)
+            self._total_bytes += size
+            self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def stored_at(self, key):
+        """Thời điểm entry được ghi (None nếu không có) - không tính vào hit/miss và LRU"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[3] if entry is not None and entry[2] > time.time() else None
+
+    def peek(self, key):
+        """(giá trị, số byte đã lưu) của entry (None nếu không có) - không tính vào hit/miss và LRU"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return (entry[0], entry[1]) if entry is not None and entry[2] > time.time() else None
+
+    def dump(self, since=None):
+        """Các entry còn hạn dạng (key, bytes đã serialize, stored_at, expires_at) để ghi snapshot
+        (chỉ các entry được ghi sau since nếu có)"""
+        now = time.time()
+        since = since or 0
+        with self._lock:
+            entries = [(key, entry[0], entry[3], entry[2]) for key, entry in self._entries.items()
+                       if entry[2] > now and entry[3] > since]
+        for key, value, stored_at, expires_at in entries:
+            yield key, _encode(value), stored_at, expires_at
+
+    def try_lock(self, name, owner, ttl):
+        """Giành khóa có thời hạn; trả về True nếu thành công"""
+        now = time.time()
+        with self._lock:
+            current = self._locks.get(name)
+            if current is not None and current[1] > now and current[0] != owner:
+                return False
+            self._locks[name] = (owner, now + ttl)
+            return True
+
+    def unlock(self, name, owner):
+        with self._lock:
+            if self._locks.get(name, (None,))[0] == owner:
+                del self._locks[name]
+
+    def is_locked(self, name):
+        with self._lock:
+            current = self._locks.get(name)
+            return current is not None and current[1] > time.time()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                **self._counters
+            }
+
+    def _remove(self, key):
+        size = self._entries.pop(key)[1]
+        self._total_bytes -= size
+
+    def _evict(self):
+        # Xóa các entry ít được dùng nhất cho tới khi tổng dung lượng nằm trong giới hạn
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self._counters['evictions'] += 1
+
+
+class SQLiteStore:
+    """Lớp cơ sở cho các store dùng file SQLite chung giữa các process"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connect(self):
+        # Mỗi thread dùng một connection riêng
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return _Transaction(conn)
+
+
+class SQLiteCacheBackend(SQLiteStore):
+    """Cache lưu trong file SQLite - mọi worker dùng chung một file nên hit/miss,
+    eviction và việc xóa cache có hiệu lực với tất cả worker"""
+
+    def __init__(self, path, ttl, max_bytes):
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)')
+            conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.executemany('INSERT OR IGNORE INTO counters(name, value) VALUES (?, 0)',
+                             [('hits',), ('misses',), ('evictions',)])
+            conn.execute('CREATE TABLE IF NOT EXISTS locks (name TEXT PRIMARY KEY, owner TEXT NOT NULL, '
+                         'expires_at REAL NOT NULL)')
+
+    def _incr(self, conn, name, amount=1):
+        conn.execute('UPDATE counters SET value = value + ? WHERE name = ?', (amount, name))
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute('SELECT value, expires_at FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._incr(conn, 'misses')
+                return None
+            conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            self._incr(conn, 'hits')
+        return _decode(row[0])
+
+    def set(self, key, value, ttl=None, stored_at=None):
+        """stored_at: thời điểm ghi gốc khi khôi phục entry từ snapshot (mặc định là bây giờ)"""
+        blob = _encode(value)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO entries(key, value, size, stored_at, expires_at, last_access) '
+                         'VALUES (?, ?, ?, ?, ?, ?)', (key, blob, len(blob), stored_at or now, expires_at, now))
+            self._evict(conn, now)
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM entries')
+
+    def keys(self):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute('SELECT key FROM entries')]
+
+    def stored_at(self, key):
+        """Thời điểm entry được ghi (None nếu không có) - không tính vào hit/miss và LRU"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT stored_at FROM entries WHERE key = ? AND expires_at > ?',
+                               (key, time.time())).fetchone()
+        return row[0] if row is not None else None
+
+    def peek(self, key):
+        """(giá trị, số byte đã lưu) của entry (None nếu không có) - không tính vào hit/miss và LRU"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT value, size FROM entries WHERE key = ? AND expires_at > ?',
+                               (key, time.time())).fetchone()
+        return (_decode(row[0]), row[1]) if row is not None else None
+
+    def dump(self, since=None):
+        """Các entry còn hạn dạng (key, bytes đã serialize, stored_at, expires_at) để ghi snapshot
+        (chỉ các entry được ghi sau since nếu có).
+
+        Blob được đọc từng entry một để không giữ khóa ghi của file SQLite trong lúc ghi snapshot."""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT key, stored_at, expires_at FROM entries WHERE expires_at > ? AND stored_at > ?',
+                                (time.time(), since or 0)).fetchall()
+        for key, stored_at, expires_at in rows:
+            with self._connect() as conn:
+                row = conn.execute('SELECT value FROM entries WHERE key = ? AND expires_at > ?',
+                                   (key, time.time())).fetchone()
+            if row is not None:
+                yield key, row[0], stored_at, expires_at
+
+    def load(self, entries):
+        """Thêm các entry (key, bytes đã serialize, stored_at, expires_at) từ snapshot mà cache chưa có,
+        giữ nguyên blob (không giải mã). Trả về số entry đã thêm"""
+        now = time.time()
+        rows = ((key, blob, len(blob), stored_at, expires_at, now)
+                for key, blob, stored_at, expires_at in entries if expires_at > now)
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany('INSERT OR IGNORE INTO entries(key, value, size, stored_at, expires_at, last_access) '
+                             'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            added = conn.total_changes - before
+            self._evict(conn, now)
+        return added
+
+    def try_lock(self, name, owner, ttl):
+        """Giành khóa có thời hạn dùng chung giữa các worker; trả về True nếu thành công"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('DELETE FROM locks WHERE name = ? AND expires_at <= ?', (name, now))
+            cursor = conn.execute('INSERT OR IGNORE INTO locks(name, owner, expires_at) VALUES (?, ?, ?)',
+                                  (name, owner, now + ttl))
+            if cursor.rowcount == 1:
+                return True
+            # Cho phép chính owner gia hạn khóa
+            cursor = conn.execute('UPDATE locks SET expires_at = ? WHERE name = ? AND owner = ?',
+                                  (now + ttl, name, owner))
+            return cursor.rowcount == 1
+
+    def unlock(self, name, owner):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM locks WHERE name = ? AND owner = ?', (name, owner))
+
+    def is_locked(self, name):
+        with self._connect() as conn:
+            row = conn.execute('SELECT 1 FROM locks WHERE name = ? AND expires_at > ?',
+                               (name, time.time())).fetchone()
+        return row is not None
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, total_bytes = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+            counters = dict(conn.execute('SELECT name, value FROM counters').fetchall())
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'entries': entries,
+            'total_bytes': total_bytes,
+            'max_bytes': self.max_bytes,
+            **counters
+        }
+
+    def _evict(self, conn, now):
+        # Xóa entry hết hạn trước, sau đó xóa theo LRU cho tới khi nằm trong giới hạn dung lượng
+        conn.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+        total_bytes = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        evicted = 0
+        rows = conn.execute('SELECT key, size FROM entries ORDER BY last_access ASC').fetchall()
+        # Luôn giữ lại entry mới nhất dù nó vượt giới hạn
+        for key, size in rows[:-1]:
+            if total_bytes <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total_bytes -= size
+            evicted += 1
+        if evicted:
+            self._incr(conn, 'evictions', evicted)
+
+
+class _Transaction:
+    """Context manager bọc một transaction SQLite (BEGIN IMMEDIATE ... COMMIT/ROLLBACK)"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+def create_cache_backend(kind, cache_dir, ttl, max_bytes):
+    """Tạo cache backend theo cấu hình (sqlite hoặc memory)"""
+    if kind == 'memory':
+        return MemoryCacheBackend(ttl, max_bytes)
+    if kind == 'sqlite':
+        return SQLiteCacheBackend(os.path.join(cache_dir, 'pr_cache.sqlite3'), ttl, max_bytes)
+    raise ValueError(f"CACHE_BACKEND không hợp lệ: {kind}")
@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+import pytest
+
+# Cấu hình cho test - phải được đặt trước khi import app
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp())
+# Test gọi search rất nhiều lần - không để token bucket làm chậm test
+os.environ.setdefault('SEARCH_RATE_LIMIT', '6000')
+# Không chạy thread nền (prewarm, ghi snapshot định kỳ) khi import app - test gọi trực tiếp nếu cần
+os.environ.setdefault('PREWARM_ENABLED', '0')
+os.environ.setdefault('SNAPSHOT_INTERVAL', '0')
+
+
+@pytest.fixture
+def fake_app(monkeypatch):
+    """app gọi GitHub giả (FakeGithub) với cache kết quả trong bộ nhớ riêng cho từng test, không dùng index PR"""
+    # Import khi fixture được dùng để conftest không import app lúc thu thập test
+    import app
+    from cache_backend import MemoryCacheBackend
+    from test_delta_refresh import FakeGithub
+
+    monkeypatch.setattr(app, 'get_github', FakeGithub.client)
+    monkeypatch.setattr(app, '_pr_cache', MemoryCacheBackend(ttl=3600, max_bytes=10 * 1024 * 1024))
+    monkeypatch.setattr(app, 'PR_INDEX_ENABLED', False)
+    FakeGithub.queries = []
+    return app
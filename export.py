@@ -0,0 +1,118 @@
+"""Xuất báo cáo PR dạng CSV / NDJSON theo kiểu streaming - mỗi lô bản ghi được ghi ra ngay"""
+import csv
+import io
+import json
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson'
+}
+
+# Cột của file CSV; dòng tổng hợp (developer/project/total) dùng chung header với dòng PR
+CSV_COLUMNS = ('record_type', 'key', 'issue_number', 'project_id', 'repo', 'title', 'creator', 'created_at',
+               'labels', 'estimate_hours', 'actual_hours', 'total_prs', 'efficiency', 'url')
+
+
+def _efficiency(estimate, actual):
+    return round(estimate / actual * 100, 1) if actual > 0 else 100
+
+
+def pr_export_row(record):
+    return {
+        'record_type': 'pr',
+        'key': record['id'],
+        'issue_number': record['issue_number'],
+        'project_id': record['project_id'],
+        'repo': record.get('repo'),
+        'title': record['title'],
+        'creator': record['creator'],
+        'created_at': record['created_at'],
+        # Bản ghi cache (PRRecord) lưu labels dạng tuple
+        'labels': list(record.get('labels', [])),
+        'estimate_hours': record['estimate_hours'],
+        'actual_hours': record['actual_hours'],
+        'total_prs': 1,
+        'efficiency': _efficiency(record['estimate_hours'], record['actual_hours']),
+        'url': record['url']
+    }
+
+
+def aggregate_export_rows(stats):
+    """Các dòng tổng hợp theo developer, project và tổng toàn bộ"""
+    rows = []
+    for record_type, groups in (('developer', stats['developers']), ('project', stats['projects'])):
+        for key in sorted(groups):
+            group = groups[key]
+            rows.append({
+                'record_type': record_type,
+                'key': key,
+                'creator': ' '.join(group['developers']) if record_type == 'project' else key,
+                'project_id': key if record_type == 'project' else None,
+                'estimate_hours': round(group['total_estimate'], 2),
+                'actual_hours': round(group['total_actual'], 2),
+                'total_prs': group['total_prs'],
+                'efficiency': _efficiency(group['total_estimate'], group['total_actual'])
+            })
+    total_prs = sum(group['total_prs'] for group in stats['developers'].values())
+    rows.append({
+        'record_type': 'total',
+        'key': 'all',
+        'estimate_hours': round(stats['total_estimate'], 2),
+        'actual_hours': round(stats['total_actual'], 2),
+        'total_prs': total_prs,
+        'efficiency': _efficiency(stats['total_estimate'], stats['total_actual'])
+    })
+    return rows
+
+
+class _CSVEncoder:
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.DictWriter(self.buffer, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+
+    def header(self):
+        self.writer.writeheader()
+        return self._flush()
+
+    def encode(self, rows):
+        for row in rows:
+            if isinstance(row.get('labels'), list):
+                row = {**row, 'labels': ';'.join(row['labels'])}
+            self.writer.writerow(row)
+        return self._flush()
+
+    def _flush(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data.encode('utf-8')
+
+
+class _NDJSONEncoder:
+    @staticmethod
+    def header():
+        return b''
+
+    @staticmethod
+    def encode(rows):
+        return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows).encode('utf-8')
+
+
+def stream_export(batches, fmt, stats, add_record_to_stats):
+    """Generator trả về từng đoạn bytes: header, các lô dòng PR, cuối cùng là dòng tổng hợp.
+
+    `batches` là iterable các danh sách bản ghi PR; chỉ thống kê tổng hợp (`stats`, cộng dồn bằng
+    add_record_to_stats) được giữ lại trong bộ nhớ nên bộ nhớ không tăng theo số PR."""
+    encoder = _CSVEncoder() if fmt == 'csv' else _NDJSONEncoder()
+    yield encoder.header()
+    try:
+        for batch in batches:
+            for record in batch:
+                add_record_to_stats(stats, record)
+            if batch:
+                yield encoder.encode([pr_export_row(record) for record in batch])
+    except Exception as e:
+        # Status code đã được gửi - ghi lỗi thành một dòng để client biết file không đầy đủ
+        yield encoder.encode([{'record_type': 'error', 'key': type(e).__name__, 'title': str(e)}])
+        return
+    yield encoder.encode(aggregate_export_rows(stats))
@@ -0,0 +1,307 @@
+"""GitHub client dùng chung cho cả process: connection pool keep-alive và theo dõi rate limit"""
+import hashlib
+import json
+import threading
+import time
+
+import requests
+from github import Github
+from github.Requester import Requester, RequestsResponse
+from urllib3.util.retry import Retry
+
+from cache_backend import SQLiteStore
+
+
+class RateLimitTracker:
+    """Ghi nhận header rate limit của mọi response theo từng resource (core, search, graphql...)"""
+
+    def __init__(self):
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def update(self, headers):
+        headers = {k.lower(): v for k, v in headers.items()}
+        if 'x-ratelimit-remaining' not in headers:
+            return
+        resource = headers.get('x-ratelimit-resource', 'core')
+        try:
+            info = {
+                'limit': int(headers.get('x-ratelimit-limit', -1)),
+                'remaining': int(headers['x-ratelimit-remaining']),
+                'used': int(headers.get('x-ratelimit-used', -1)),
+                'reset': int(headers.get('x-ratelimit-reset', 0)),
+                'updated_at': time.time()
+            }
+        except ValueError:
+            return
+        with self._lock:
+            self._limits[resource] = info
+
+    def get(self, resource):
+        """Trả về thông tin rate limit gần nhất của resource (None nếu chưa có response nào)"""
+        with self._lock:
+            info = self._limits.get(resource)
+            return dict(info) if info else None
+
+    def snapshot(self):
+        with self._lock:
+            return {resource: dict(info) for resource, info in self._limits.items()}
+
+    def remaining_fraction(self, resource):
+        """Tỷ lệ budget còn lại (1.0 nếu chưa biết hoặc đã qua thời điểm reset)"""
+        info = self.get(resource)
+        if not info or info['limit'] <= 0 or info['reset'] <= time.time():
+            return 1.0
+        return info['remaining'] / info['limit']
+
+    def delay_for(self, resource, reserve):
+        """Thời gian nên chờ trước request tiếp theo để không dùng hết budget.
+
+        Khi số request còn lại xuống dưới `reserve`, các request còn lại được trải đều tới
+        thời điểm reset; khi đã hết thì chờ tới lúc reset."""
+        info = self.get(resource)
+        if not info:
+            return 0.0
+        until_reset = info['reset'] - time.time()
+        if until_reset <= 0 or info['remaining'] >= reserve:
+            return 0.0
+        if info['remaining'] <= 0:
+            return until_reset
+        return until_reset / info['remaining']
+
+    def throttle(self, resource, reserve, max_delay=60.0):
+        delay = min(self.delay_for(resource, reserve), max_delay)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class HttpResponseCache(SQLiteStore):
+    """Cache HTTP cho các request GET tới GitHub, lưu ETag/Last-Modified và body trên đĩa.
+
+    Request lặp lại được gửi kèm If-None-Match/If-Modified-Since; GitHub trả 304 (không tính vào
+    rate limit) và body được lấy từ bản lưu cục bộ."""
+
+    def __init__(self, path, max_bytes):
+        super().__init__(path)
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)')
+            conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.executemany('INSERT OR IGNORE INTO counters(name, value) VALUES (?, 0)',
+                             [('requests',), ('conditional',), ('not_modified',), ('stored',), ('evictions',)])
+
+    @staticmethod
+    def make_key(url, headers):
+        # Phân biệt theo token và Accept vì cùng URL có thể trả nội dung khác nhau
+        parts = [url, headers.get('Authorization', ''), headers.get('Accept', '')]
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def lookup(self, key):
+        """Trả về (etag, last_modified) của bản lưu nếu có"""
+        with self._connect() as conn:
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'requests'")
+            row = conn.execute('SELECT etag, last_modified FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'conditional'")
+        return row
+
+    def load(self, key):
+        """Lấy bản lưu khi GitHub trả 304"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT url, headers, body FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'not_modified'")
+        return row
+
+    def store(self, key, response):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        body = response.content
+        headers = json.dumps(dict(response.headers))
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO responses(key, url, etag, last_modified, headers, body, size, '
+                         'last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         (key, response.url, etag, last_modified, headers, body, len(body) + len(headers),
+                          time.time()))
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'stored'")
+            self._evict(conn)
+
+    def _evict(self, conn):
+        # Xóa theo LRU cho tới khi tổng dung lượng nằm trong giới hạn
+        total_bytes = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute('SELECT key, size FROM responses ORDER BY last_access ASC').fetchall()[:-1]:
+            if total_bytes <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total_bytes -= size
+            evicted += 1
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = 'evictions'", (evicted,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM responses')
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, total_bytes = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+            counters = dict(conn.execute('SELECT name, value FROM counters').fetchall())
+        return {
+            'path': self.path,
+            'entries': entries,
+            'total_bytes': total_bytes,
+            'max_bytes': self.max_bytes,
+            'hit_rate': round(counters['not_modified'] / counters['requests'], 4) if counters['requests'] else 0,
+            **counters
+        }
+
+
+def _cached_response(url, cached_headers, body, not_modified):
+    """Dựng lại response 200 từ bản lưu, giữ header rate limit mới nhất của response 304"""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = body
+    response.encoding = 'utf-8'
+    response.headers.update(json.loads(cached_headers))
+    for name, value in not_modified.headers.items():
+        if name.lower().startswith('x-ratelimit-') or name.lower() in ('etag', 'last-modified', 'date'):
+            response.headers[name] = value
+    return response
+
+
+def create_session(pool_size, max_retries=3):
+    """Tạo requests.Session với connection pool keep-alive và retry cho lỗi kết nối/5xx"""
+    session = requests.Session()
+    retry = Retry(total=max_retries, connect=max_retries, read=max_retries, backoff_factor=0.5,
+                  status_forcelist=(502, 503, 504), allowed_methods=frozenset(['GET', 'HEAD']),
+                  raise_on_status=False, respect_retry_after_header=True)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class GitHubClientManager:
+    """Quản lý Github client dùng chung giữa các thread của process.
+
+    Mọi request của PyGithub đi qua một requests.Session duy nhất (connection pool keep-alive,
+    không phải bắt tay TLS lại cho mỗi client) và header rate limit được ghi vào `rate_limits`."""
+
+    def __init__(self, token, base_url=None, pool_size=10, http_cache=None, on_response=None):
+        self.token = token
+        self.base_url = base_url
+        self.session = create_session(pool_size)
+        # Cache HTTP với conditional request (None để tắt)
+        self.http_cache = http_cache
+        # Gọi sau mỗi request với (method, url, status, thời gian, headers) - dùng cho số đo
+        self.on_response = on_response
+        self.rate_limits = RateLimitTracker()
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._install()
+
+    def _install(self):
+        manager = self
+
+        class PooledConnection:
+            """Thay thế connection class của PyGithub: gửi request qua session dùng chung.
+
+            PyGithub tạo một object mới cho mỗi request nên lưu trạng thái request ở đây là an toàn
+            khi nhiều thread dùng chung một Github client."""
+            protocol = 'https'
+
+            def __init__(self, host, port=None, strict=False, timeout=None, retry=None, pool_size=None, **kwargs):
+                self.host = host
+                self.port = port if port else (443 if self.protocol == 'https' else 80)
+                self.timeout = timeout
+                self.verify = kwargs.get('verify', True)
+
+            def request(self, verb, url, input, headers):
+                self.verb = verb
+                self.url = url
+                self.input = input
+                self.headers = headers
+
+            def getresponse(self):
+                url = f'{self.protocol}://{self.host}:{self.port}{self.url}'
+                response = manager.send(self.verb, url, headers=self.headers, data=self.input,
+                                        timeout=self.timeout, verify=self.verify, allow_redirects=False)
+                return RequestsResponse(response)
+
+            def close(self):
+                return
+
+        class PooledHTTPConnection(PooledConnection):
+            protocol = 'http'
+
+        Requester.injectConnectionClasses(PooledHTTPConnection, PooledConnection)
+
+    def send(self, method, url, **kwargs):
+        """Gửi một request qua session dùng chung và ghi nhận header rate limit.
+
+        Request GET được gửi kèm ETag/Last-Modified của bản lưu; response 304 được thay bằng bản lưu."""
+        cache_key = None
+        if self.http_cache is not None and method.upper() == 'GET':
+            headers = dict(kwargs.get('headers') or {})
+            cache_key = self.http_cache.make_key(url, headers)
+            validators = self.http_cache.lookup(cache_key)
+            if validators is not None:
+                etag, last_modified = validators
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+                kwargs['headers'] = headers
+
+        started_at = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception:
+            if self.on_response is not None:
+                self.on_response(method, url, 'error', time.perf_counter() - started_at, {})
+            raise
+        if self.on_response is not None:
+            self.on_response(method, url, response.status_code, time.perf_counter() - started_at, response.headers)
+        self.rate_limits.update(response.headers)
+
+        if cache_key is not None:
+            if response.status_code == 304:
+                cached = self.http_cache.load(cache_key)
+                if cached is not None:
+                    return _cached_response(cached[0], cached[1], cached[2], response)
+            elif response.status_code == 200:
+                self.http_cache.store(cache_key, response)
+        return response
+
+    def post(self, url, **kwargs):
+        """Cho phép dùng manager như một session (GraphQL backend)"""
+        return self.send('POST', url, **kwargs)
+
+    def get(self, timeout, per_page=30):
+        """Trả về Github client dùng chung cho cặp (timeout, per_page)"""
+        key = (timeout, per_page)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                kwargs = {'timeout': timeout, 'per_page': per_page}
+                if self.base_url:
+                    kwargs['base_url'] = self.base_url
+                client = self._clients[key] = Github(self.token, **kwargs)
+            return client
@@ -0,0 +1,323 @@
+"""Crawl kết quả GitHub search theo cửa sổ thời gian song song, vượt giới hạn 1000 kết quả"""
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+import requests
+from github.GithubException import GithubException, RateLimitExceededException
+
+from cache_backend import SQLiteStore
+
+# GitHub search API chỉ trả về tối đa 1000 kết quả cho một query
+SEARCH_RESULT_CAP = 1000
+# Mốc thời gian sớm nhất khi query không có ngày bắt đầu
+EARLIEST_CREATED = datetime(2008, 1, 1, tzinfo=timezone.utc)
+# Cửa sổ nhỏ nhất khi chia đôi (không chia nhỏ hơn 1 giây)
+MIN_WINDOW = timedelta(seconds=1)
+
+
+class RateLimiter:
+    """Token bucket giới hạn số request search mỗi phút (dùng chung giữa các thread)"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = max(1, rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class SharedRateLimiter(SQLiteStore):
+    """Token bucket như RateLimiter nhưng lưu trong file SQLite: mọi worker dùng chung một giới hạn
+    (rate limit search của GitHub tính theo token, không theo process)"""
+
+    def __init__(self, path, rate_per_minute, name='search'):
+        super().__init__(path)
+        self.name = name
+        self.capacity = max(1, rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                )''')
+
+    def acquire(self):
+        while True:
+            with self._connect() as conn:
+                now = time.time()
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE name = ?', (self.name,)).fetchone()
+                tokens = self.capacity if row is None else min(self.capacity,
+                                                               row[0] + max(0.0, now - row[1]) * self.rate)
+                acquired = tokens >= 1
+                if acquired:
+                    tokens -= 1
+                conn.execute('INSERT OR REPLACE INTO buckets(name, tokens, updated) VALUES (?, ?, ?)',
+                             (self.name, tokens, now))
+            if acquired:
+                return
+            time.sleep((1 - tokens) / self.rate)
+
+
+class RestSearchBackend:
+    """Lấy kết quả search qua REST API của PyGithub, mỗi trang là một request độc lập"""
+
+    def __init__(self, github, page_size):
+        # github phải được tạo với per_page=page_size
+        self.github = github
+        self.page_size = page_size
+
+    def count(self, query):
+        return self.github.search_issues(query=query).totalCount
+
+    def window_tasks(self, query, total, call):
+        """Trả về danh sách hàm lấy từng trang của một cửa sổ - có thể chạy song song"""
+        pages = math.ceil(total / self.page_size)
+        return [lambda page=page: call(self.github.search_issues(query=query).get_page, page)
+                for page in range(pages)]
+
+
+# Chỉ lấy các trường mà parse_pr_info và template cần
+GRAPHQL_SEARCH_QUERY = """
+query($q: String!, $first: Int!, $after: String) {
+  search(query: $q, type: ISSUE, first: $first, after: $after) {
+    issueCount
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      ... on PullRequest {
+        databaseId
+        title
+        body
+        createdAt
+        url
+        author { login }
+        labels(first: 50) { nodes { name } }
+      }
+    }
+  }
+}
+"""
+
+GRAPHQL_COUNT_QUERY = """
+query($q: String!) {
+  search(query: $q, type: ISSUE, first: 0) { issueCount }
+}
+"""
+
+
+class _Named:
+    __slots__ = ('name', 'login')
+
+    def __init__(self, name=None, login=None):
+        self.name = name
+        self.login = login
+
+
+class GraphQLPullRequest:
+    """PR lấy từ GraphQL - có cùng các thuộc tính như Issue của PyGithub mà app sử dụng"""
+    __slots__ = ('id', 'title', 'body', 'created_at', 'html_url', 'user', 'labels')
+
+    def __init__(self, node):
+        self.id = node['databaseId']
+        self.title = node['title']
+        self.body = node.get('body') or ''
+        self.created_at = datetime.strptime(node['createdAt'], '%Y-%m-%dT%H:%M:%SZ')
+        self.html_url = node['url']
+        # Tài khoản đã bị xóa trả về author = null
+        self.user = _Named(login=(node.get('author') or {}).get('login', 'ghost'))
+        self.labels = [_Named(name=label['name']) for label in node['labels']['nodes']]
+
+
+class GraphQLSearchBackend:
+    """Lấy kết quả search qua GitHub GraphQL (100 PR mỗi trang, chỉ các trường cần thiết).
+
+    Phân trang bằng cursor nên các trang của một cửa sổ được lấy tuần tự;
+    các cửa sổ khác nhau vẫn chạy song song."""
+    page_size = 100
+
+    def __init__(self, token, url, timeout, session=None):
+        self.url = url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.headers = {'Authorization': f'bearer {token}'} if token else {}
+
+    def _execute(self, query, variables):
+        response = self.session.post(self.url, json={'query': query, 'variables': variables},
+                                     headers=self.headers, timeout=self.timeout)
+        try:
+            data = response.json()
+        except ValueError:
+            data = {'message': response.text}
+        headers = {k.lower(): v for k, v in response.headers.items()}
+        message = str(data.get('message', '')).lower()
+        errors = data.get('errors') or []
+        if (response.status_code in (403, 429) and ('rate limit' in message or 'try again' in message)) \
+                or any(error.get('type') == 'RATE_LIMITED' for error in errors):
+            raise RateLimitExceededException(response.status_code, data, headers)
+        if response.status_code >= 400 or errors:
+            raise GithubException(response.status_code, data, headers)
+        return data['data']
+
+    def count(self, query):
+        return self._execute(GRAPHQL_COUNT_QUERY, {'q': query})['search']['issueCount']
+
+    def _fetch_window(self, query, total, call):
+        items = []
+        after = None
+        while len(items) < total:
+            search = call(self._execute, GRAPHQL_SEARCH_QUERY,
+                          {'q': query, 'first': min(self.page_size, total - len(items)), 'after': after})['search']
+            # Kết quả search kiểu ISSUE có thể chứa issue (node rỗng) - bỏ qua
+            items.extend(GraphQLPullRequest(node) for node in search['nodes'] if node)
+            if not search['pageInfo']['hasNextPage']:
+                break
+            after = search['pageInfo']['endCursor']
+        return items
+
+    def window_tasks(self, query, total, call):
+        return [lambda: self._fetch_window(query, total, call)]
+
+
+def _parse_bound(value, end_of_day):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    parsed = datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    return parsed + timedelta(days=1) - MIN_WINDOW if end_of_day else parsed
+
+
+def window_qualifier(start, end):
+    fmt = '%Y-%m-%dT%H:%M:%SZ'
+    return f'created:{start.strftime(fmt)}..{end.strftime(fmt)}'
+
+
+class PartitionedCrawler:
+    """Chia khoảng created: thành các cửa sổ có totalCount dưới giới hạn search bằng cách chia đôi,
+    sau đó lấy các trang của mọi cửa sổ song song trên thread pool có giới hạn"""
+
+    def __init__(self, backend, rate_limiter, max_workers=4, max_retries=3, cap=SEARCH_RESULT_CAP, throttle=None):
+        self.backend = backend
+        self.rate_limiter = rate_limiter
+        # Hàm chờ khi budget rate limit sắp hết (giảm tốc trước khi bị chặn)
+        self.throttle = throttle
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.cap = cap
+        # Tổng số PR GitHub báo về cho toàn bộ query (có thể lớn hơn số lấy được)
+        self.total_found = 0
+        self.windows = []
+
+    def call(self, fn, *args):
+        """Gọi GitHub qua rate limiter, thử lại khi gặp rate limit (kể cả secondary rate limit)"""
+        for attempt in range(self.max_retries + 1):
+            if self.throttle is not None:
+                self.throttle()
+            self.rate_limiter.acquire()
+            try:
+                return fn(*args)
+            except RateLimitExceededException as e:
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(e, attempt))
+
+    def _retry_delay(self, exc, attempt):
+        headers = getattr(exc, 'headers', None) or {}
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+        if 'x-ratelimit-reset' in headers:
+            return min(60.0, max(1.0, float(headers['x-ratelimit-reset']) - time.time()))
+        return 5.0 * (2 ** attempt)
+
+    def _count(self, query, start, end):
+        return self.call(self.backend.count, f'{query} {window_qualifier(start, end)}')
+
+    def _plan(self, executor, query, start, end, limit):
+        """Chia đôi khoảng thời gian cho tới khi mỗi cửa sổ có ít hơn `cap` kết quả"""
+        self.total_found = total = self._count(query, start, end)
+        if total == 0:
+            return []
+        # Chỉ cần `limit` kết quả đầu tiên và nằm trong giới hạn: không cần chia nhỏ
+        if total <= self.cap or (limit and limit <= self.cap):
+            return [(start, end, min(total, limit or total, self.cap))]
+
+        windows = []
+        pending = {}
+
+        def split(window_start, window_end):
+            middle = window_start + (window_end - window_start) / 2
+            middle = middle.replace(microsecond=0)
+            for part in ((window_start, middle), (middle + MIN_WINDOW, window_end)):
+                pending[executor.submit(self._count, query, *part)] = part
+
+        split(start, end)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                window_start, window_end = pending.pop(future)
+                count = future.result()
+                if count == 0:
+                    continue
+                if count <= self.cap or window_end - window_start <= MIN_WINDOW:
+                    windows.append((window_start, window_end, min(count, self.cap)))
+                else:
+                    split(window_start, window_end)
+        # Cửa sổ mới nhất trước
+        windows.sort(reverse=True)
+        return windows
+
+    def iter_pages(self, query, since_date=None, until_date=None, limit=0, on_plan=None):
+        """Generator trả về từng trang kết quả (đã loại trùng theo id) ngay khi trang được lấy xong.
+
+        on_plan (nếu có) được gọi với số kết quả dự kiến sau khi chia cửa sổ xong."""
+        start = _parse_bound(since_date, end_of_day=False) or EARLIEST_CREATED
+        end = _parse_bound(until_date, end_of_day=True) or datetime.now(timezone.utc).replace(microsecond=0)
+        seen = set()
+        returned = 0
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pr-crawl')
+        try:
+            self.windows = self._plan(executor, query, start, end, limit)
+            if on_plan is not None:
+                on_plan(sum(total for _, _, total in self.windows))
+            futures = []
+            for window_start, window_end, total in self.windows:
+                window_query = f'{query} {window_qualifier(window_start, window_end)}'
+                for task in self.backend.window_tasks(window_query, total, self.call):
+                    futures.append(executor.submit(task))
+
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = []
+                    for item in future.result():
+                        if item.id in seen:
+                            continue
+                        seen.add(item.id)
+                        page.append(item)
+                    if limit:
+                        page = page[:max(0, limit - returned)]
+                    returned += len(page)
+                    if page:
+                        yield page
+                    if limit and returned >= limit:
+                        return
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
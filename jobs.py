@@ -0,0 +1,116 @@
+"""Job tạo báo cáo chạy nền - trạng thái lưu trong SQLite để mọi worker đều trả lời được khi poll"""
+import json
+import time
+import uuid
+
+from cache_backend import SQLiteStore
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_ERROR = 'error'
+
+JOB_FIELDS = ('id', 'cache_key', 'params', 'status', 'pages_fetched', 'prs_parsed', 'total_expected',
+              'created_at', 'started_at', 'updated_at', 'finished_at', 'error')
+
+
+class FetchProgress:
+    """Tiến độ của một lần fetch, ghi xuống JobStore sau mỗi trang"""
+
+    def __init__(self, store, job_id):
+        self.store = store
+        self.job_id = job_id
+        self.pages_fetched = 0
+        self.prs_parsed = 0
+        self.total_expected = 0
+
+    def expect(self, total):
+        """Cộng thêm số PR dự kiến (mỗi query/khoảng ngày gọi một lần)"""
+        self.total_expected += total
+        self._save()
+
+    def page_done(self, prs):
+        self.pages_fetched += 1
+        self.prs_parsed += prs
+        self._save()
+
+    def _save(self):
+        self.store.update_progress(self.job_id, self.pages_fetched, self.prs_parsed, self.total_expected)
+
+
+class JobStore(SQLiteStore):
+    """Lưu trạng thái job; job giống nhau (cùng cache key) đang chạy được dùng lại"""
+
+    def __init__(self, path, stale_timeout):
+        super().__init__(path)
+        # Job đang chạy không cập nhật quá khoảng này được coi là đã chết (worker bị restart)
+        self.stale_timeout = stale_timeout
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    cache_key TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    pages_fetched INTEGER NOT NULL DEFAULT 0,
+                    prs_parsed INTEGER NOT NULL DEFAULT 0,
+                    total_expected INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    updated_at REAL NOT NULL,
+                    finished_at REAL,
+                    error TEXT
+                )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_cache_key ON jobs(cache_key, status)')
+
+    def submit(self, cache_key, params):
+        """Tạo job mới hoặc trả về job đang chạy với cùng cache key. Trả về (job_id, created)"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute('SELECT id FROM jobs WHERE cache_key = ? AND status IN (?, ?) AND updated_at > ? '
+                               'ORDER BY created_at DESC LIMIT 1',
+                               (cache_key, JOB_QUEUED, JOB_RUNNING, now - self.stale_timeout)).fetchone()
+            if row is not None:
+                return row[0], False
+            job_id = uuid.uuid4().hex
+            conn.execute('INSERT INTO jobs(id, cache_key, params, status, created_at, updated_at) '
+                         'VALUES (?, ?, ?, ?, ?, ?)', (job_id, cache_key, json.dumps(params), JOB_QUEUED, now, now))
+            # Dọn các job cũ hơn 1 ngày
+            conn.execute('DELETE FROM jobs WHERE updated_at < ?', (now - 86400,))
+        return job_id, True
+
+    def start(self, job_id):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET status = ?, started_at = ?, updated_at = ? WHERE id = ?',
+                         (JOB_RUNNING, now, now, job_id))
+
+    def update_progress(self, job_id, pages_fetched, prs_parsed, total_expected):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET pages_fetched = ?, prs_parsed = ?, total_expected = ?, updated_at = ? '
+                         'WHERE id = ?', (pages_fetched, prs_parsed, total_expected, time.time(), job_id))
+
+    def finish(self, job_id, error=None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET status = ?, error = ?, updated_at = ?, finished_at = ? WHERE id = ?',
+                         (JOB_ERROR if error else JOB_DONE, error, now, now, job_id))
+
+    def get(self, job_id):
+        """Lấy trạng thái job kèm ước tính thời gian còn lại (None nếu không tồn tại)"""
+        with self._connect() as conn:
+            row = conn.execute(f'SELECT {", ".join(JOB_FIELDS)} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(JOB_FIELDS, row))
+        job['params'] = json.loads(job['params'])
+        now = time.time()
+        if job['status'] in (JOB_QUEUED, JOB_RUNNING) and job['updated_at'] < now - self.stale_timeout:
+            job['status'] = JOB_ERROR
+            job['error'] = 'Job không còn được cập nhật (worker có thể đã bị khởi động lại)'
+
+        job['estimated_remaining'] = None
+        if job['status'] == JOB_RUNNING and job['started_at'] and job['prs_parsed'] and job['total_expected']:
+            rate = job['prs_parsed'] / max(now - job['started_at'], 0.001)
+            job['estimated_remaining'] = round(max(job['total_expected'] - job['prs_parsed'], 0) / rate, 1)
+        return job
@@ -0,0 +1,170 @@
+"""Index label theo org - lấy từ các PR đã parse và từ label của mọi repo trong org (làm mới nền theo TTL)"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_backend import SQLiteStore
+
+
+class LabelIndex(SQLiteStore):
+    """Danh sách label của từng org, dùng chung giữa các worker.
+
+    Đọc không bao giờ gọi GitHub: get() trả về dữ liệu đang có và cho biết có cần làm mới hay không."""
+
+    def __init__(self, path, ttl, max_orgs):
+        super().__init__(path)
+        self.ttl = ttl
+        # Số org tối đa được giữ; org ít được xem nhất bị xóa trước
+        self.max_orgs = max_orgs
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS labels (
+                    org TEXT NOT NULL COLLATE NOCASE,
+                    label TEXT NOT NULL COLLATE NOCASE,
+                    from_repo INTEGER NOT NULL DEFAULT 0,
+                    pr_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (org, label)
+                )''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS label_orgs (
+                    org TEXT PRIMARY KEY COLLATE NOCASE,
+                    refreshed_at REAL NOT NULL DEFAULT 0,
+                    last_access REAL NOT NULL
+                )''')
+            # Label hiện tại của từng PR đã ghi nhận (theo url) để pr_count không tăng khi cùng PR được ghi nhận lại
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS label_prs (
+                    org TEXT NOT NULL COLLATE NOCASE,
+                    url TEXT NOT NULL,
+                    labels TEXT NOT NULL,
+                    PRIMARY KEY (org, url)
+                )''')
+
+    def _touch(self, conn, org_name):
+        conn.execute('INSERT INTO label_orgs(org, last_access) VALUES (?, ?) '
+                     'ON CONFLICT(org) DO UPDATE SET last_access = excluded.last_access', (org_name, time.time()))
+        self._evict(conn)
+
+    def _evict(self, conn):
+        orgs = conn.execute('SELECT org FROM label_orgs ORDER BY last_access DESC').fetchall()
+        for (org_name,) in orgs[self.max_orgs:]:
+            conn.execute('DELETE FROM labels WHERE org = ?', (org_name,))
+            conn.execute('DELETE FROM label_prs WHERE org = ?', (org_name,))
+            conn.execute('DELETE FROM label_orgs WHERE org = ?', (org_name,))
+
+    def observe(self, org_name, records):
+        """Ghi nhận label của các PR vừa được parse.
+
+        pr_count chỉ thay đổi theo phần label khác với lần ghi nhận trước của cùng PR; label không còn trên PR nào
+        và không có trong repo nào bị xóa."""
+        if not any(record.get('labels') for record in records):
+            return
+        deltas = {}
+        with self._connect() as conn:
+            for record in records:
+                labels = sorted(set(record.get('labels', ())))
+                row = conn.execute('SELECT labels FROM label_prs WHERE org = ? AND url = ?',
+                                   (org_name, record['url'])).fetchone()
+                previous = json.loads(row[0]) if row is not None else []
+                if row is not None and previous == labels:
+                    continue
+                for label in set(labels) - set(previous):
+                    deltas[label] = deltas.get(label, 0) + 1
+                for label in set(previous) - set(labels):
+                    deltas[label] = deltas.get(label, 0) - 1
+                conn.execute('INSERT OR REPLACE INTO label_prs(org, url, labels) VALUES (?, ?, ?)',
+                             (org_name, record['url'], json.dumps(labels)))
+            conn.executemany('INSERT INTO labels(org, label, pr_count) VALUES (?, ?, MAX(0, ?)) '
+                             'ON CONFLICT(org, label) DO UPDATE SET pr_count = MAX(0, pr_count + ?)',
+                             [(org_name, label, delta, delta) for label, delta in deltas.items() if delta])
+            if any(delta < 0 for delta in deltas.values()):
+                conn.execute('DELETE FROM labels WHERE org = ? AND from_repo = 0 AND pr_count = 0', (org_name,))
+            self._touch(conn, org_name)
+
+    def get(self, org_name):
+        """Trả về (danh sách label đã sắp xếp, cần làm mới hay không)"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT refreshed_at FROM label_orgs WHERE org = ?', (org_name,)).fetchone()
+            labels = [label for (label,) in conn.execute('SELECT label FROM labels WHERE org = ?', (org_name,))]
+            # Chỉ org đã có trong index mới được tính là vừa dùng: org bất kỳ trong ?org= không đẩy org thật ra ngoài
+            if row is not None:
+                self._touch(conn, org_name)
+        stale = row is None or row[0] <= time.time() - self.ttl
+        return sorted(labels, key=str.lower), stale
+
+    def replace_repo_labels(self, org_name, labels):
+        """Thay tập label lấy từ các repo của org (label chỉ thấy trên PR được giữ lại)"""
+        with self._connect() as conn:
+            conn.execute('UPDATE labels SET from_repo = 0 WHERE org = ?', (org_name,))
+            conn.executemany('INSERT INTO labels(org, label, from_repo) VALUES (?, ?, 1) '
+                             'ON CONFLICT(org, label) DO UPDATE SET from_repo = 1',
+                             [(org_name, label) for label in labels])
+            # Label đã bị xóa khỏi mọi repo và không còn trên PR nào đã thấy
+            conn.execute('DELETE FROM labels WHERE org = ? AND from_repo = 0 AND pr_count = 0', (org_name,))
+            self._touch(conn, org_name)
+            conn.execute('UPDATE label_orgs SET refreshed_at = ? WHERE org = ?', (time.time(), org_name))
+
+    def add_repo_label(self, org_name, label):
+        """Thêm label vừa được tạo trong một repo (từ webhook)"""
+        with self._connect() as conn:
+            conn.execute('INSERT INTO labels(org, label, from_repo) VALUES (?, ?, 1) '
+                         'ON CONFLICT(org, label) DO UPDATE SET from_repo = 1', (org_name, label))
+
+    def remove_label(self, org_name, label):
+        """Xóa label đã bị xóa hoặc đổi tên (từ webhook)"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM labels WHERE org = ? AND label = ?', (org_name, label))
+
+    def dump(self):
+        """{org: {'refreshed_at', 'labels': [[label, from_repo, pr_count]], 'prs': [[url, labels]]}} để ghi snapshot"""
+        with self._connect() as conn:
+            orgs = conn.execute('SELECT org, refreshed_at FROM label_orgs').fetchall()
+            rows = conn.execute('SELECT org, label, from_repo, pr_count FROM labels').fetchall()
+            prs = conn.execute('SELECT org, url, labels FROM label_prs').fetchall()
+        data = {org_name.lower(): {'org': org_name, 'refreshed_at': refreshed_at, 'labels': [], 'prs': []}
+                for org_name, refreshed_at in orgs}
+        for org_name, label, from_repo, pr_count in rows:
+            if org_name.lower() in data:
+                data[org_name.lower()]['labels'].append([label, from_repo, pr_count])
+        for org_name, url, labels in prs:
+            if org_name.lower() in data:
+                data[org_name.lower()]['prs'].append([url, json.loads(labels)])
+        return {entry.pop('org'): entry for entry in data.values()}
+
+    def load(self, data):
+        """Khôi phục label của các org chưa có trong index từ snapshot (org đã có được giữ nguyên)"""
+        now = time.time()
+        with self._connect() as conn:
+            for org_name, entry in data.items():
+                cursor = conn.execute('INSERT OR IGNORE INTO label_orgs(org, refreshed_at, last_access) '
+                                      'VALUES (?, ?, ?)', (org_name, entry['refreshed_at'], now))
+                if cursor.rowcount == 1:
+                    conn.executemany('INSERT OR IGNORE INTO labels(org, label, from_repo, pr_count) '
+                                     'VALUES (?, ?, ?, ?)', [(org_name, *row) for row in entry['labels']])
+                    conn.executemany('INSERT OR IGNORE INTO label_prs(org, url, labels) VALUES (?, ?, ?)',
+                                     [(org_name, url, json.dumps(labels)) for url, labels in entry.get('prs', [])])
+            self._evict(conn)
+
+    def stats(self):
+        with self._connect() as conn:
+            orgs = conn.execute('SELECT COUNT(*) FROM label_orgs').fetchone()[0]
+            labels = conn.execute('SELECT COUNT(*) FROM labels').fetchone()[0]
+        return {'path': self.path, 'orgs': orgs, 'labels': labels, 'ttl': self.ttl, 'max_orgs': self.max_orgs}
+
+
+def fetch_org_labels(github, org_name, max_workers):
+    """Lấy label của tất cả repo trong org, các repo được lấy song song"""
+    repos = list(github.get_organization(org_name).get_repos())
+
+    def repo_labels(repo):
+        try:
+            return [label.name for label in repo.get_labels()]
+        except Exception as e:
+            print(f"Error fetching labels from repo {repo.name}: {e}")
+            return []
+
+    labels = set()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='label-fetch') as executor:
+        for names in executor.map(repo_labels, repos):
+            labels.update(names)
+    return labels
@@ -0,0 +1,187 @@
+"""Số đo hiệu năng của process: histogram và số đo đọc lúc scrape, xuất theo định dạng text của Prometheus
+và thời gian từng bước (GitHub, parse, tổng hợp, render) của request đang xử lý.
+
+Mỗi gunicorn worker giữ số đo riêng; các số đo lấy từ store dùng chung (cache) được đọc lúc scrape."""
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets)) + (float('inf'),)
+        self._series = {}  # labels -> [số đếm theo bucket..., tổng, số lần]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return series[-1] if series else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", _format_value(bound))])} '
+                             f'{cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(series[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {series[-1]}')
+        return lines
+
+
+class Collector:
+    """Số đo được đọc lúc scrape: collect() trả về [(dict label, giá trị)]"""
+
+    def __init__(self, name, metric_type, help_text, collect):
+        self.name = name
+        self.type = metric_type
+        self.help = help_text
+        self.collect = collect
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for labels, value in self.collect():
+            lines.append(f'{self.name}{_format_labels(sorted(labels.items()))} {_format_value(value)}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def collector(self, name, metric_type, help_text, collect):
+        return self._register(Collector(name, metric_type, help_text, collect))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Toàn bộ số đo theo định dạng text exposition của Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # Một collector lỗi (VD: store tạm thời bị khóa) không làm hỏng cả lần scrape
+                lines.append(f'# {metric.name} unavailable: {type(e).__name__}')
+        return '\n'.join(lines) + '\n'
+
+
+# Thời gian từng bước của request hiện tại (theo thread xử lý request)
+_request_local = threading.local()
+
+
+def start_request():
+    _request_local.timings = {}
+    _request_local.started_at = time.perf_counter()
+
+
+def finish_request():
+    """Trả về (tổng thời gian, {bước: thời gian}) của request và dừng ghi nhận"""
+    timings = getattr(_request_local, 'timings', None)
+    started_at = getattr(_request_local, 'started_at', None)
+    _request_local.timings = None
+    if timings is None or started_at is None:
+        return None, {}
+    return time.perf_counter() - started_at, timings
+
+
+def _record(stage, elapsed, histogram):
+    if histogram is not None:
+        histogram.observe(elapsed, stage=stage)
+    timings = getattr(_request_local, 'timings', None)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def span(stage, histogram=None):
+    """Đo một bước: ghi vào histogram (label stage) và vào bảng thời gian của request hiện tại"""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(stage, time.perf_counter() - started_at, histogram)
+
+
+def timed_iter(iterable, stage, histogram=None):
+    """Như span nhưng chỉ tính thời gian chờ phần tử tiếp theo (VD: chờ trang kết quả từ GitHub)"""
+    iterator = iter(iterable)
+    while True:
+        started_at = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            _record(stage, time.perf_counter() - started_at, histogram)
+            return
+        _record(stage, time.perf_counter() - started_at, histogram)
+        yield item
+
+
+def server_timing_header(total, timings):
+    """Giá trị header Server-Timing (mili giây)"""
+    entries = [f'{stage};dur={elapsed * 1000:.1f}' for stage, elapsed in timings.items()]
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+def github_endpoint(url):
+    """Rút gọn URL GitHub API thành nhãn endpoint ít giá trị (/repos/:owner/:repo/labels, /search/issues...)"""
+    parts = [part for part in urlsplit(url).path.split('/') if part]
+    # GitHub Enterprise: /api/v3/...
+    if parts[:2] == ['api', 'v3']:
+        parts = parts[2:]
+    if not parts:
+        return '/'
+    if parts[0] == 'repos':
+        parts = ['repos', ':owner', ':repo'] + parts[3:4]
+    elif parts[0] in ('orgs', 'users'):
+        parts = [parts[0], ':name'] + parts[2:3]
+    else:
+        parts = parts[:2]
+    return '/' + '/'.join(':id' if part.isdigit() else part for part in parts)
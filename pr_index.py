@@ -0,0 +1,316 @@
+"""Index PR cục bộ (SQLite) - trả lời truy vấn theo khoảng ngày / tập label bất kỳ
+mà không cần crawl lại GitHub cho những khoảng đã đồng bộ"""
+import time
+from datetime import date, datetime, timedelta
+
+from cache_backend import SQLiteStore
+
+# Các trường của bản ghi PR được lưu thành cột
+RECORD_COLUMNS = ('id', 'org', 'repo', 'title', 'issue_number', 'project_id', 'estimate_time', 'actual_time',
+                  'estimate_hours', 'actual_hours', 'creator', 'created_at', 'url')
+
+
+def normalize_labels(label):
+    """Chuẩn hóa tham số label (chuỗi hoặc danh sách) thành danh sách đã sắp xếp"""
+    if isinstance(label, (list, tuple)):
+        labels = [l.strip() for l in label if l and l.strip()]
+    elif label and isinstance(label, str):
+        labels = [label.strip()]
+    else:
+        labels = []
+    return sorted(set(labels), key=str.lower)
+
+
+def _parse_day(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def subtract_spans(since, until, covered):
+    """Trả về các khoảng ngày trong [since, until] chưa nằm trong các khoảng covered"""
+    spans = []
+    cursor = since
+    for start, end in sorted(covered):
+        if end < cursor:
+            continue
+        if start > until:
+            break
+        if start > cursor:
+            spans.append((cursor, start - timedelta(days=1)))
+        cursor = max(cursor, end + timedelta(days=1))
+        if cursor > until:
+            break
+    if cursor <= until:
+        spans.append((cursor, until))
+    return spans
+
+
+class PRIndex(SQLiteStore):
+    """Lưu các bản ghi PR đã parse và các khoảng (org, label, ngày) đã được đồng bộ đầy đủ"""
+
+    def __init__(self, path, sync_ttl, open_day_ttl=0):
+        super().__init__(path)
+        # Sau sync_ttl giây, khoảng đã đồng bộ được coi là cũ và sẽ đồng bộ lại
+        self.sync_ttl = sync_ttl
+        # Ngày hôm nay chưa kết thúc: chỉ được coi là đã đồng bộ trong open_day_ttl giây sau lần crawl
+        self.open_day_ttl = open_day_ttl
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS prs (
+                    id INTEGER PRIMARY KEY,
+                    org TEXT NOT NULL COLLATE NOCASE,
+                    repo TEXT,
+                    title TEXT,
+                    issue_number TEXT,
+                    project_id TEXT,
+                    estimate_time TEXT,
+                    actual_time TEXT,
+                    estimate_hours REAL,
+                    actual_hours REAL,
+                    creator TEXT,
+                    created_at TEXT,
+                    url TEXT
+                )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_prs_org_created ON prs(org, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_prs_creator ON prs(creator)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_prs_project ON prs(project_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_prs_url ON prs(url)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pr_labels (
+                    pr_id INTEGER NOT NULL,
+                    label TEXT NOT NULL COLLATE NOCASE,
+                    PRIMARY KEY (pr_id, label)
+                )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pr_labels_label ON pr_labels(label)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS synced_ranges (
+                    org TEXT NOT NULL COLLATE NOCASE,
+                    labels TEXT NOT NULL,
+                    since TEXT NOT NULL,
+                    until TEXT NOT NULL,
+                    synced_at REAL NOT NULL
+                )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_synced_ranges_org ON synced_ranges(org)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS open_days (
+                    org TEXT NOT NULL COLLATE NOCASE,
+                    labels TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    synced_at REAL NOT NULL
+                )''')
+            # Tổng theo ngày cho từng (org, label, developer, project); label '' là tất cả PR.
+            # Được cập nhật cùng lúc với prs nên thống kê một khoảng ngày chỉ cần cộng các bucket.
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS daily_rollups (
+                    org TEXT NOT NULL COLLATE NOCASE,
+                    label TEXT NOT NULL COLLATE NOCASE,
+                    day TEXT NOT NULL,
+                    creator TEXT NOT NULL,
+                    project_id TEXT NOT NULL,
+                    prs INTEGER NOT NULL,
+                    estimate REAL NOT NULL,
+                    actual REAL NOT NULL,
+                    PRIMARY KEY (org, label, day, creator, project_id)
+                )''')
+            if (conn.execute('SELECT COUNT(*) FROM daily_rollups').fetchone()[0] == 0
+                    and conn.execute('SELECT COUNT(*) FROM prs').fetchone()[0] > 0):
+                self._rebuild_rollups(conn)
+
+    def upsert(self, org_name, records):
+        """Thêm mới hoặc cập nhật các bản ghi PR"""
+        with self._connect() as conn:
+            for record in records:
+                self._upsert(conn, org_name, record)
+
+    def _upsert(self, conn, org_name, record):
+        # Cùng PR nhưng được lưu với id khác (id issue của search REST / id pull request của webhook)
+        if record.get('url'):
+            for (pr_id,) in conn.execute('SELECT id FROM prs WHERE url = ? AND id != ?',
+                                         (record['url'], record['id'])).fetchall():
+                self._delete(conn, pr_id)
+        # Bỏ đóng góp của phiên bản cũ khỏi rollup trước khi ghi đè
+        self._update_rollups(conn, record['id'], -1)
+        values = [org_name if column == 'org' else record.get(column) for column in RECORD_COLUMNS]
+        conn.execute(f'INSERT OR REPLACE INTO prs({", ".join(RECORD_COLUMNS)}) '
+                     f'VALUES ({", ".join("?" * len(RECORD_COLUMNS))})', values)
+        conn.execute('DELETE FROM pr_labels WHERE pr_id = ?', (record['id'],))
+        conn.executemany('INSERT OR IGNORE INTO pr_labels(pr_id, label) VALUES (?, ?)',
+                         [(record['id'], label) for label in record.get('labels', [])])
+        self._update_rollups(conn, record['id'], 1)
+
+    def _update_rollups(self, conn, pr_id, sign):
+        """Cộng (sign=1) hoặc trừ (sign=-1) PR đã lưu vào các bucket theo ngày"""
+        row = conn.execute('SELECT org, created_at, creator, project_id, estimate_hours, actual_hours '
+                           'FROM prs WHERE id = ?', (pr_id,)).fetchone()
+        if row is None:
+            return
+        org_name, day, creator, project_id, estimate, actual = row
+        labels = [''] + [label for (label,) in conn.execute('SELECT label FROM pr_labels WHERE pr_id = ?',
+                                                             (pr_id,))]
+        keys = [(org_name, label, day, creator or '', project_id or '') for label in labels]
+        conn.executemany('INSERT INTO daily_rollups(org, label, day, creator, project_id, prs, estimate, actual) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(org, label, day, creator, project_id) '
+                         'DO UPDATE SET prs = prs + excluded.prs, estimate = estimate + excluded.estimate, '
+                         'actual = actual + excluded.actual',
+                         [key + (sign, sign * (estimate or 0), sign * (actual or 0)) for key in keys])
+        if sign < 0:
+            conn.executemany('DELETE FROM daily_rollups WHERE org = ? AND label = ? AND day = ? AND creator = ? '
+                             'AND project_id = ? AND prs <= 0', keys)
+
+    def _rebuild_rollups(self, conn):
+        """Tính lại toàn bộ rollup từ bảng prs (index được tạo trước khi có rollup)"""
+        conn.execute('DELETE FROM daily_rollups')
+        conn.execute("INSERT INTO daily_rollups(org, label, day, creator, project_id, prs, estimate, actual) "
+                     "SELECT org, '', created_at, COALESCE(creator, ''), COALESCE(project_id, ''), COUNT(*), "
+                     "SUM(COALESCE(estimate_hours, 0)), SUM(COALESCE(actual_hours, 0)) FROM prs "
+                     "GROUP BY org, created_at, creator, project_id")
+        conn.execute('INSERT INTO daily_rollups(org, label, day, creator, project_id, prs, estimate, actual) '
+                     "SELECT p.org, l.label, p.created_at, COALESCE(p.creator, ''), COALESCE(p.project_id, ''), "
+                     'COUNT(*), SUM(COALESCE(p.estimate_hours, 0)), SUM(COALESCE(p.actual_hours, 0)) '
+                     'FROM prs p JOIN pr_labels l ON l.pr_id = p.id '
+                     'GROUP BY p.org, l.label, p.created_at, p.creator, p.project_id')
+
+    def delete(self, pr_id):
+        with self._connect() as conn:
+            self._delete(conn, pr_id)
+
+    def _delete(self, conn, pr_id):
+        self._update_rollups(conn, pr_id, -1)
+        conn.execute('DELETE FROM prs WHERE id = ?', (pr_id,))
+        conn.execute('DELETE FROM pr_labels WHERE pr_id = ?', (pr_id,))
+
+    def find_id(self, url):
+        """id đã lưu của PR theo url (None nếu PR chưa có trong index)"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT id FROM prs WHERE url = ?', (url,)).fetchone()
+        return row[0] if row is not None else None
+
+    def query(self, org_name, label, since_date, until_date=None):
+        """Lấy các bản ghi PR của org có đủ tất cả label trong khoảng ngày (mới nhất trước)"""
+        labels = normalize_labels(label)
+        sql = f'SELECT {", ".join(RECORD_COLUMNS)} FROM prs WHERE org = ?'
+        params = [org_name]
+        if since_date:
+            sql += ' AND created_at >= ?'
+            params.append(since_date)
+        if until_date:
+            sql += ' AND created_at <= ?'
+            params.append(until_date)
+        if labels:
+            # PR phải có tất cả label (phép AND giống query search của GitHub)
+            sql += (f' AND id IN (SELECT pr_id FROM pr_labels WHERE label IN ({", ".join("?" * len(labels))})'
+                    ' GROUP BY pr_id HAVING COUNT(DISTINCT label) = ?)')
+            params.extend(labels)
+            params.append(len(labels))
+        sql += ' ORDER BY created_at DESC, id DESC'
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+            records = [dict(zip(RECORD_COLUMNS, row)) for row in rows]
+            labels_by_pr = {}
+            if records:
+                conn.execute('CREATE TEMP TABLE IF NOT EXISTS query_ids (id INTEGER PRIMARY KEY)')
+                conn.execute('DELETE FROM query_ids')
+                conn.executemany('INSERT OR IGNORE INTO query_ids(id) VALUES (?)', [(r['id'],) for r in records])
+                for pr_id, pr_label in conn.execute(
+                        'SELECT pr_id, label FROM pr_labels WHERE pr_id IN (SELECT id FROM query_ids)'):
+                    labels_by_pr.setdefault(pr_id, []).append(pr_label)
+        for record in records:
+            del record['org']
+            record['labels'] = labels_by_pr.get(record['id'], [])
+        return records
+
+    def rollup_stats(self, org_name, label, since_date, until_date=None):
+        """Thống kê developers/projects của khoảng ngày bằng cách cộng các bucket theo ngày.
+
+        Chỉ trả lời được truy vấn có tối đa một label (None nếu nhiều label - phép AND cần từng PR)."""
+        labels = normalize_labels(label)
+        if len(labels) > 1:
+            return None
+        sql = ('SELECT creator, project_id, SUM(prs), SUM(estimate), SUM(actual) FROM daily_rollups '
+               'WHERE org = ? AND label = ?')
+        params = [org_name, labels[0] if labels else '']
+        if since_date:
+            sql += ' AND day >= ?'
+            params.append(since_date)
+        if until_date:
+            sql += ' AND day <= ?'
+            params.append(until_date)
+        sql += ' GROUP BY creator, project_id ORDER BY creator, project_id'
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        stats = {'total_prs': 0, 'total_estimate': 0, 'total_actual': 0, 'developers': {}, 'projects': {}}
+        for creator, project_id, prs, estimate, actual in rows:
+            if prs <= 0:
+                continue
+            # Làm tròn để loại bỏ sai số dấu phẩy động sau nhiều lần cộng/trừ
+            estimate, actual = round(estimate, 6), round(actual, 6)
+            for group, key in ((stats['developers'], creator), (stats['projects'], project_id)):
+                if key not in group:
+                    group[key] = {'total_prs': 0, 'total_estimate': 0, 'total_actual': 0}
+                group[key]['total_prs'] += prs
+                group[key]['total_estimate'] += estimate
+                group[key]['total_actual'] += actual
+            stats['projects'][project_id].setdefault('developers', []).append(creator)
+            stats['total_prs'] += prs
+            stats['total_estimate'] += estimate
+            stats['total_actual'] += actual
+        return stats
+
+    def uncovered_spans(self, org_name, label, since_date, until_date=None):
+        """Trả về các khoảng ngày (since, until) chưa được đồng bộ cho truy vấn.
+
+        Một khoảng đã đồng bộ với tập label S dùng được cho truy vấn có tập label Q
+        nếu S là tập con của Q (PR có đủ Q thì chắc chắn có đủ S)."""
+        labels = {l.lower() for l in normalize_labels(label)}
+        since = _parse_day(since_date)
+        # Ngày sau hôm nay chưa có PR nào nên không cần đồng bộ
+        until = min(_parse_day(until_date), date.today()) if until_date else date.today()
+        if since > until:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute('SELECT labels, since, until FROM synced_ranges WHERE org = ? AND synced_at > ?',
+                                (org_name, time.time() - self.sync_ttl)).fetchall()
+            rows += conn.execute('SELECT labels, day, day FROM open_days WHERE org = ? AND day = ? AND synced_at > ?',
+                                 (org_name, date.today().isoformat(), time.time() - self.open_day_ttl)).fetchall()
+        covered = []
+        for synced_labels, synced_since, synced_until in rows:
+            synced_set = {l.lower() for l in synced_labels.split('\n') if l}
+            if synced_set <= labels:
+                covered.append((_parse_day(synced_since), _parse_day(synced_until)))
+        return [(start.isoformat(), end.isoformat()) for start, end in subtract_spans(since, until, covered)]
+
+    def mark_synced(self, org_name, label, since_date, until_date):
+        """Ghi nhận khoảng ngày đã được đồng bộ đầy đủ.
+
+        Ngày hôm nay chưa kết thúc nên không bao giờ được đánh dấu là đã đồng bộ lâu dài - chỉ được coi là
+        đã đồng bộ trong open_day_ttl giây."""
+        today = date.today()
+        since = _parse_day(since_date)
+        until = min(_parse_day(until_date), today - timedelta(days=1))
+        labels = '\n'.join(normalize_labels(label))
+        with self._connect() as conn:
+            if until >= since:
+                conn.execute('INSERT INTO synced_ranges(org, labels, since, until, synced_at) VALUES (?, ?, ?, ?, ?)',
+                             (org_name, labels, since_date, until.isoformat(), time.time()))
+            if self.open_day_ttl > 0 and since <= today <= _parse_day(until_date):
+                conn.execute('INSERT INTO open_days(org, labels, day, synced_at) VALUES (?, ?, ?, ?)',
+                             (org_name, labels, today.isoformat(), time.time()))
+            # Dọn các khoảng đã quá hạn
+            conn.execute('DELETE FROM synced_ranges WHERE synced_at <= ?', (time.time() - self.sync_ttl,))
+            conn.execute('DELETE FROM open_days WHERE synced_at <= ?', (time.time() - self.open_day_ttl,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM prs')
+            conn.execute('DELETE FROM pr_labels')
+            conn.execute('DELETE FROM synced_ranges')
+            conn.execute('DELETE FROM open_days')
+            conn.execute('DELETE FROM daily_rollups')
+
+    def stats(self):
+        with self._connect() as conn:
+            prs = conn.execute('SELECT COUNT(*) FROM prs').fetchone()[0]
+            ranges = conn.execute('SELECT COUNT(*) FROM synced_ranges').fetchone()[0]
+            rollups = conn.execute('SELECT COUNT(*) FROM daily_rollups').fetchone()[0]
+        return {'path': self.path, 'prs': prs, 'synced_ranges': ranges, 'daily_rollups': rollups}
@@ -0,0 +1,207 @@
+"""Parse thông tin PR (issue key, estimate/actual time) từ title và body"""
+import re
+
+
+def convert_to_hours(time_str):
+    if not time_str or time_str.strip().lower() == 'n/a':
+        return 0
+
+    time_str = time_str.strip().lower()
+
+    # Nếu là phút (30p, 45m)
+    minute_match = re.fullmatch(r'(\d+)[mp]', time_str)
+    if minute_match:
+        return round(float(minute_match.group(1)) / 60, 2)
+
+    # Nếu là giờ với định dạng số thực có đơn vị (1.5h, 1,5h)
+    hour_match = re.fullmatch(r'([0-9]+([.,][0-9]+)?)h', time_str)
+    if hour_match:
+        return float(hour_match.group(1).replace(',', '.'))
+
+    # Nếu là số thực không đơn vị (1.5, 1,5) hoặc số nguyên
+    number_match = re.fullmatch(r'([0-9]+([.,][0-9]+)?)', time_str)
+    if number_match:
+        return float(number_match.group(1).replace(',', '.'))
+        
+    # Kiểm tra thêm định dạng 'Xh Ym' hoặc 'X,Yh'
+    complex_time_match = re.fullmatch(r'([0-9]+)h\s+([0-9]+)[mp]', time_str)
+    if complex_time_match:
+        hours = float(complex_time_match.group(1))
+        minutes = float(complex_time_match.group(2))
+        return hours + round(minutes / 60, 2)
+        
+    # Kiểm tra định dạng '1,5' hoặc '1.5' không có đơn vị
+    decimal_match = re.search(r'([0-9]+[.,][0-9]+)', time_str)
+    if decimal_match:
+        return float(decimal_match.group(1).replace(',', '.'))
+
+    return 0
+
+
+def get_project_id(issue_number):
+    """Trích xuất ID project từ issue number (VD: AIP123-456 -> AIP123)"""
+    if issue_number and issue_number != 'N/A':
+        match = re.match(r'(AIP\d+)', issue_number, re.IGNORECASE)
+        if match:
+            return match.group(1).upper()  # Chuẩn hóa về dạng viết hoa
+    return 'Unknown'
+
+
+def parse_pr_info_legacy(pr):
+    """Bản parse cũ (nhiều lần quét regex) - giữ làm chuẩn đối chiếu cho test và benchmark"""
+    # Parse issue number - tìm trong cả title và body
+    issue_match = re.search(r'AIP\d+-\d+', pr.title, re.IGNORECASE) or re.search(r'AIP\d+-\d+', pr.body or '',
+                                                                                 re.IGNORECASE)
+    issue_number = issue_match.group(0).upper() if issue_match else "N/A"  # Chuẩn hóa về dạng viết hoa
+
+    # Parse estimate time từ body
+    time_pattern = r'(?:Est(?:imate)?|Actual)\s*Time:?\s*([0-9]+([.,][0-9]+)?)[hpm]'
+    times = re.finditer(time_pattern, pr.body or '', re.IGNORECASE)
+
+    estimate_time = "N/A"
+    actual_time = "N/A"
+
+    for match in times:
+        # Extract the full time value including the unit (h, m, p)
+        full_match = match.group(0)
+        time_value = match.group(1)  # This is just the number part (e.g., "1,5")
+        
+        # Add the unit back to make it compatible with convert_to_hours
+        if 'h' in full_match.lower():
+            time_value = time_value + 'h'
+        elif 'm' in full_match.lower() or 'p' in full_match.lower():
+            time_value = time_value + 'm'
+            
+        # Check if it's an estimate time (both full 'estimate' and abbreviated 'est' forms)
+        if 'est' in full_match.lower() and not full_match.lower().startswith('actual'):
+            estimate_time = time_value
+        elif 'actual' in full_match.lower():
+            actual_time = time_value
+
+    # Chuyển đổi thời gian sang giờ
+    estimate_hours = convert_to_hours(estimate_time)
+    actual_hours = convert_to_hours(actual_time)
+
+    # Lấy project ID
+    project_id = get_project_id(issue_number)
+
+    parsed_result = {
+        'issue_number': issue_number,
+        'project_id': project_id,
+        'estimate_time': f"{estimate_hours}h",
+        'actual_time': f"{actual_hours}h",
+        'estimate_hours': estimate_hours,
+        'actual_hours': actual_hours
+    }
+    return parsed_result
+
+
+# Issue key (VD: AIP201-106); group 1 là project ID
+ISSUE_PATTERN = re.compile(r'(AIP\d+)-\d+', re.IGNORECASE)
+# Quét body một lần lấy cả issue key và các dòng thời gian (dùng khi không thể lowercase body).
+# Hai nhánh không thể chồng lên nhau (dòng thời gian không chứa "AIP" và issue key không chứa
+# "Est"/"Actual") nên kết quả giống hệt việc chạy từng regex riêng.
+BODY_PATTERN = re.compile(
+    r'(?P<project>AIP\d+)-\d+'
+    r'|(?P<kind>Est(?:imate)?|Actual)\s*Time:?\s*(?P<value>[0-9]+(?:[.,][0-9]+)?)(?P<unit>[hpm])',
+    re.IGNORECASE)
+# Phần sau "aip" / "time" trong body đã lowercase (đường nhanh)
+ISSUE_TAIL = re.compile(r'(\d+)-\d+')
+TIME_TAIL = re.compile(r':?\s*([0-9]+(?:[.,][0-9]+)?)([hpm])')
+
+
+def _value_to_hours(value, unit):
+    """Tương đương convert_to_hours(value + 'h' hoặc value + 'm').
+
+    Số nguyên kèm m/p là phút; số thập phân luôn được hiểu là giờ (kể cả '1,5m' - giữ hành vi cũ)."""
+    if unit in 'hH' or ',' in value or '.' in value:
+        return float(value.replace(',', '.'))
+    return round(float(value) / 60, 2)
+
+
+def _scan_lowered(text, need_issue):
+    """Quét body đã lowercase: tìm chuỗi con "time" rồi chỉ match regex tại các vị trí đó.
+
+    Trả về (issue_number, project_id, estimate, actual) với estimate/actual là (value, unit)."""
+    issue_number = project_id = None
+    if need_issue:
+        pos = text.find('aip')
+        while pos != -1:
+            match = ISSUE_TAIL.match(text, pos + 3)
+            if match:
+                issue_number = text[pos:match.end()].upper()
+                project_id = text[pos:match.end(1)].upper()
+                break
+            pos = text.find('aip', pos + 1)
+
+    estimate = actual = None
+    pos = text.find('time')
+    while pos != -1:
+        match = TIME_TAIL.match(text, pos + 4)
+        if match:
+            # Keyword đứng ngay trước "time" (có thể cách bởi khoảng trắng)
+            keyword_end = pos
+            while keyword_end and text[keyword_end - 1].isspace():
+                keyword_end -= 1
+            if text.endswith('actual', 0, keyword_end):
+                actual = match.groups()
+            elif text.endswith('est', 0, keyword_end) or text.endswith('estimate', 0, keyword_end):
+                estimate = match.groups()
+            else:
+                match = None
+        pos = text.find('time', match.end() if match else pos + 1)
+    return issue_number, project_id, estimate, actual
+
+
+def _scan_unicode(body, need_issue):
+    issue_number = project_id = None
+    estimate = actual = None
+    for match in BODY_PATTERN.finditer(body):
+        kind = match.group('kind')
+        if kind is None:
+            # Chỉ dùng issue key đầu tiên
+            if need_issue and issue_number is None:
+                issue_number = match.group(0).upper()
+                project_id = match.group('project').upper()
+        elif kind[0] in 'aA':
+            actual = match.group('value', 'unit')
+        elif 'est' in kind.lower():
+            estimate = match.group('value', 'unit')
+    return issue_number, project_id, estimate, actual
+
+
+def parse_pr_fields(title, body):
+    """Parse issue key (title trước, sau đó body) và thời gian (dòng cuối cùng được dùng).
+
+    Kết quả giống hệt parse_pr_info_legacy; body chỉ được quét một lần."""
+    issue_match = ISSUE_PATTERN.search(title)
+    text = body.lower()
+    # IGNORECASE của regex coi 'ı', 'ſ' là 'i', 's' và 'İ'.lower() dài 2 ký tự - các body này
+    # dùng regex trên body gốc
+    if len(text) == len(body) and 'ı' not in text and 'ſ' not in text:
+        issue_number, project_id, estimate, actual = _scan_lowered(text, issue_match is None)
+    else:
+        issue_number, project_id, estimate, actual = _scan_unicode(body, issue_match is None)
+    if issue_match:
+        issue_number = issue_match.group(0).upper()
+        project_id = issue_match.group(1).upper()
+
+    estimate_hours = _value_to_hours(*estimate) if estimate else 0
+    actual_hours = _value_to_hours(*actual) if actual else 0
+    return {
+        'issue_number': issue_number or 'N/A',
+        'project_id': project_id or 'Unknown',
+        'estimate_time': f"{estimate_hours}h",
+        'actual_time': f"{actual_hours}h",
+        'estimate_hours': estimate_hours,
+        'actual_hours': actual_hours
+    }
+
+
+def parse_pr_info(pr):
+    return parse_pr_fields(pr.title, pr.body or '')
+
+
+def parse_pr_batch(prs):
+    """Parse một lô PR (VD: một trang kết quả search)"""
+    return [parse_pr_fields(pr.title, pr.body or '') for pr in prs]
@@ -0,0 +1,127 @@
+"""Bản ghi PR gọn cho kết quả cache: __slots__, chuỗi lặp lại được intern, giờ dạng số và ngày dạng epoch.
+
+estimate_time/actual_time và created_at không được lưu mà được định dạng khi đọc."""
+import sys
+from collections.abc import Mapping
+from datetime import date
+from functools import lru_cache
+from operator import attrgetter
+
+# Thứ tự khóa giống bản ghi dict do build_pr_record tạo
+RECORD_KEYS = ('id', 'title', 'issue_number', 'project_id', 'estimate_time', 'actual_time', 'estimate_hours',
+               'actual_hours', 'creator', 'created_at', 'repo', 'labels', 'url')
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Khóa đánh dấu bản ghi khi serialize sang JSON
+JSON_TAG = '__pr__'
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+@lru_cache(maxsize=4096)
+def _label_set(labels):
+    # Các PR có cùng tập label dùng chung một tuple
+    return labels
+
+
+def to_epoch_day(value):
+    """'YYYY-MM-DD' -> số ngày kể từ 1970-01-01"""
+    return date.fromisoformat(value).toordinal() - EPOCH_ORDINAL
+
+
+def format_epoch_day(day):
+    return date.fromordinal(day + EPOCH_ORDINAL).isoformat()
+
+
+class PRRecord(Mapping):
+    """Bản ghi PR chỉ đọc, truy cập như dict (record['created_at']) nên code đang dùng dict không phải đổi"""
+    __slots__ = ('id', 'title', 'issue_number', 'project_id', 'estimate_hours', 'actual_hours', 'creator',
+                 'created', 'repo', 'labels', 'url')
+
+    def __init__(self, id, title, issue_number, project_id, estimate_hours, actual_hours, creator, created,
+                 repo, labels, url):
+        self.id = id
+        self.title = title
+        self.issue_number = _intern(issue_number)
+        self.project_id = _intern(project_id)
+        self.estimate_hours = estimate_hours
+        self.actual_hours = actual_hours
+        self.creator = _intern(creator)
+        self.created = created  # số ngày kể từ epoch
+        self.repo = _intern(repo)
+        self.labels = _label_set(tuple(_intern(label) for label in labels))
+        self.url = url
+
+    @classmethod
+    def from_dict(cls, record):
+        return cls(record.get('id'), record['title'], record['issue_number'], record['project_id'],
+                   record['estimate_hours'], record['actual_hours'], record['creator'],
+                   to_epoch_day(record['created_at']), record.get('repo', ''), record.get('labels', ()),
+                   record['url'])
+
+    def __getitem__(self, key):
+        return _GETTERS[key](self)
+
+    def __iter__(self):
+        return iter(RECORD_KEYS)
+
+    def __len__(self):
+        return len(RECORD_KEYS)
+
+    def __contains__(self, key):
+        return key in _GETTERS
+
+    def __repr__(self):
+        return f'PRRecord({dict(self)!r})'
+
+    def to_row(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+
+_GETTERS = {name: attrgetter(name) for name in PRRecord.__slots__ if name != 'created'}
+_GETTERS['estimate_time'] = lambda r: f'{r.estimate_hours}h'
+_GETTERS['actual_time'] = lambda r: f'{r.actual_hours}h'
+_GETTERS['created_at'] = lambda r: format_epoch_day(r.created)
+
+
+def compact_record(record):
+    """Chuyển bản ghi dict sang PRRecord (bản ghi đã gọn được trả về nguyên)"""
+    return record if isinstance(record, PRRecord) else PRRecord.from_dict(record)
+
+
+def json_default(obj):
+    """Hook `default` của json.dumps: PRRecord được ghi thành một mảng giá trị"""
+    if isinstance(obj, PRRecord):
+        return {JSON_TAG: obj.to_row()}
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def json_object_hook(obj):
+    """Hook `object_hook` của json.loads: đọc lại PRRecord đã ghi bởi json_default"""
+    if JSON_TAG in obj and len(obj) == 1:
+        return PRRecord(*obj[JSON_TAG])
+    return obj
+
+
+def deep_sizeof(value):
+    """Số byte bộ nhớ của value và mọi object nó tham chiếu (mỗi object chỉ tính một lần)"""
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(type(obj), '__slots__') and not isinstance(obj, (str, bytes, int, float)):
+            stack.extend(getattr(obj, name) for name in type(obj).__slots__ if hasattr(obj, name))
+        elif hasattr(obj, '__dict__'):
+            stack.append(obj.__dict__)
+    return total
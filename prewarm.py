@@ -0,0 +1,156 @@
+"""Làm nóng cache nền: ghi nhận tần suất truy vấn và làm mới các truy vấn phổ biến trước khi hết hạn"""
+import json
+import os
+import random
+import threading
+import time
+
+from cache_backend import SQLiteStore
+
+LEADER_LOCK = 'prewarm:leader'
+# Số lần chạy gần nhất được giữ lại để xem qua endpoint
+RECENT_RUNS = 50
+
+
+class QueryStats(SQLiteStore):
+    """Số lần truy vấn theo cache key và bộ đếm của scheduler (dùng chung giữa các worker)"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS query_hits (
+                    cache_key TEXT PRIMARY KEY,
+                    params TEXT NOT NULL,
+                    hits INTEGER NOT NULL,
+                    last_hit REAL NOT NULL
+                )''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS prewarm_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cache_key TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    duration REAL NOT NULL,
+                    error TEXT
+                )''')
+            conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.executemany('INSERT OR IGNORE INTO counters(name, value) VALUES (?, 0)',
+                             [('ticks',), ('refreshed',), ('errors',), ('skipped_budget',)])
+
+    def record(self, cache_key, params):
+        with self._connect() as conn:
+            conn.execute('INSERT INTO query_hits(cache_key, params, hits, last_hit) VALUES (?, ?, 1, ?) '
+                         'ON CONFLICT(cache_key) DO UPDATE SET hits = hits + 1, params = excluded.params, '
+                         'last_hit = excluded.last_hit', (cache_key, json.dumps(params), time.time()))
+
+    def top(self, limit, window):
+        """Các truy vấn được dùng nhiều nhất trong `window` giây gần đây: [(cache_key, params, hits)]"""
+        with self._connect() as conn:
+            # Dọn truy vấn không còn được dùng
+            conn.execute('DELETE FROM query_hits WHERE last_hit < ?', (time.time() - window,))
+            rows = conn.execute('SELECT cache_key, params, hits FROM query_hits ORDER BY hits DESC, last_hit DESC '
+                                'LIMIT ?', (limit,)).fetchall()
+        return [(cache_key, json.loads(params), hits) for cache_key, params, hits in rows]
+
+    def incr(self, name, amount=1):
+        with self._connect() as conn:
+            conn.execute('UPDATE counters SET value = value + ? WHERE name = ?', (amount, name))
+
+    def log_run(self, cache_key, started_at, error=None):
+        with self._connect() as conn:
+            conn.execute('INSERT INTO prewarm_runs(cache_key, started_at, duration, error) VALUES (?, ?, ?, ?)',
+                         (cache_key, started_at, time.time() - started_at, error))
+            conn.execute('DELETE FROM prewarm_runs WHERE id <= (SELECT MAX(id) FROM prewarm_runs) - ?',
+                         (RECENT_RUNS,))
+            conn.execute('UPDATE counters SET value = value + 1 WHERE name = ?',
+                         ('errors' if error else 'refreshed',))
+
+    def stats(self):
+        with self._connect() as conn:
+            counters = dict(conn.execute('SELECT name, value FROM counters').fetchall())
+            runs = conn.execute('SELECT cache_key, started_at, duration, error FROM prewarm_runs '
+                                'ORDER BY id DESC LIMIT 10').fetchall()
+        return {
+            **counters,
+            'recent_runs': [{'cache_key': cache_key, 'started_at': started_at, 'duration': round(duration, 2),
+                             'error': error} for cache_key, started_at, duration, error in runs]
+        }
+
+
+class PrewarmScheduler:
+    """Mỗi `interval` giây, worker đang giữ khóa leader làm mới top-N truy vấn sắp hết hạn.
+
+    refresh(cache_key, params) thực hiện việc fetch; age(cache_key) trả về tuổi của entry trong cache
+    (None nếu không có); budget_available() trả về False khi phần rate limit dành cho prewarm đã hết."""
+
+    def __init__(self, query_stats, locks, refresh, age, budget_available, interval, top_n, window,
+                 soft_ttl, default_queries=None):
+        self.query_stats = query_stats
+        self.locks = locks
+        self.refresh = refresh
+        self.age = age
+        self.budget_available = budget_available
+        self.interval = interval
+        self.top_n = top_n
+        self.window = window
+        self.soft_ttl = soft_ttl
+        # Hàm trả về các truy vấn luôn được làm nóng (trang mặc định): [(cache_key, params)]
+        self.default_queries = default_queries or (lambda: [])
+        self.owner = f'{os.getpid()}:{id(self)}'
+        self._thread = None
+
+    def is_leader(self):
+        # Giữ khóa qua 2 chu kỳ để leader còn sống không bị worker khác chiếm
+        return self.locks.try_lock(LEADER_LOCK, self.owner, self.interval * 2)
+
+    def candidates(self):
+        queries = [(cache_key, params) for cache_key, params in self.default_queries()]
+        seen = {cache_key for cache_key, _ in queries}
+        for cache_key, params, _ in self.query_stats.top(self.top_n, self.window):
+            if cache_key not in seen:
+                seen.add(cache_key)
+                queries.append((cache_key, params))
+        return queries
+
+    def due(self, cache_key):
+        """Entry không có hoặc sẽ hết độ tươi trước lần chạy tiếp theo"""
+        age = self.age(cache_key)
+        return age is None or age >= self.soft_ttl - self.interval
+
+    def run_once(self):
+        """Chạy một lượt; trả về số truy vấn đã làm mới (None nếu worker này không phải leader)"""
+        if not self.is_leader():
+            return None
+        self.query_stats.incr('ticks')
+        refreshed = 0
+        for cache_key, params in self.candidates():
+            if not self.due(cache_key):
+                continue
+            if not self.budget_available():
+                self.query_stats.incr('skipped_budget')
+                break
+            started_at = time.time()
+            try:
+                self.refresh(cache_key, params)
+                self.query_stats.log_run(cache_key, started_at)
+                refreshed += 1
+            except Exception as e:
+                self.query_stats.log_run(cache_key, started_at, f'{type(e).__name__}: {e}')
+        return refreshed
+
+    def _loop(self):
+        # Lượt đầu chạy sớm để trang mặc định được làm nóng ngay sau khi deploy
+        delay = random.uniform(5, 15)
+        while True:
+            time.sleep(delay)
+            # Lệch thời gian giữa các worker để tránh tranh khóa cùng lúc
+            delay = self.interval * random.uniform(0.9, 1.1)
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error in prewarm scheduler: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='cache-prewarm', daemon=True)
+            self._thread.start()
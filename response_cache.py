@@ -0,0 +1,135 @@
+"""Cache response đã render (HTML/JSON) theo tham số truy vấn và phiên bản dữ liệu, nén sẵn gzip/brotli, kèm ETag"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli là tùy chọn, không có thì chỉ dùng gzip
+    brotli = None
+
+# Body nhỏ hơn ngưỡng này không được nén
+MIN_COMPRESS_BYTES = 1024
+
+
+def compress_body(body):
+    """{encoding: body} - luôn có 'identity', thêm 'gzip'/'br' nếu nén có lợi"""
+    bodies = {'identity': body}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        bodies['gzip'] = gzip.compress(body, compresslevel=6, mtime=0)
+        if brotli is not None:
+            bodies['br'] = brotli.compress(body, quality=5)
+    return bodies
+
+
+def choose_encoding(accept_encoding, available):
+    """Chọn encoding nhỏ nhất mà client chấp nhận (bỏ qua các encoding có q=0)"""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        name, *params = [item.strip() for item in part.split(';')]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.lower())
+    candidates = [encoding for encoding in available
+                  if encoding != 'identity' and (encoding in accepted or '*' in accepted)]
+    return min(candidates, key=lambda encoding: len(available[encoding]), default='identity')
+
+
+class CachedResponse:
+    __slots__ = ('version', 'data_timestamp', 'mimetype', 'digest', 'bodies', 'size')
+
+    def __init__(self, version, data_timestamp, mimetype, body):
+        self.version = version
+        # Thời điểm của dữ liệu đã render (để biết khi nào cần làm mới)
+        self.data_timestamp = data_timestamp
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies = compress_body(body)
+        self.size = sum(len(data) for data in self.bodies.values())
+
+    def etag(self, encoding):
+        # ETag mạnh khác nhau cho từng encoding vì các body khác nhau từng byte
+        return self.digest if encoding == 'identity' else f'{self.digest}-{encoding}'
+
+    def etags(self):
+        return [self.etag(encoding) for encoding in self.bodies]
+
+
+class ResponseCache:
+    """LRU trong process: key (endpoint, tham số truy vấn) -> response đã render của một phiên bản dữ liệu.
+
+    Mỗi key chỉ giữ phiên bản mới nhất; tra cứu với phiên bản khác được coi là miss."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._counters = {'hits': 0, 'misses': 0, 'not_modified': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry
+
+    def put(self, key, version, data_timestamp, body, mimetype):
+        entry = CachedResponse(version, data_timestamp, mimetype, body)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old.size
+            if entry.size <= self.max_bytes:
+                self._entries[key] = entry
+                self._total_bytes += entry.size
+            while self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted.size
+                self._counters['evictions'] += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'brotli': brotli is not None,
+                **self._counters
+            }
+
+    def respond(self, entry, request):
+        """Response cho request: 304 nếu If-None-Match khớp, nếu không thì body đã nén theo Accept-Encoding"""
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''), entry.bodies)
+        if any(request.if_none_match.contains_weak(tag) for tag in entry.etags()) or request.if_none_match.star_tag:
+            with self._lock:
+                self._counters['not_modified'] += 1
+            response = Response(status=304)
+        else:
+            response = Response(entry.bodies[encoding], mimetype=entry.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(entry.etag(encoding))
+        response.headers['Vary'] = 'Accept-Encoding'
+        # Trình duyệt luôn hỏi lại server, server trả 304 khi dữ liệu chưa đổi
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
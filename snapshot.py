@@ -0,0 +1,290 @@
+"""Snapshot cache kết quả và index label ra file để worker mới (deploy, gunicorn recycle) phục vụ ngay dữ liệu đã có.
+
+Định dạng file (SNAPSHOT_VERSION):
+  MAGIC | blob của từng entry | index JSON nén zlib | footer (offset index, độ dài index, phiên bản, MAGIC)
+Blob là giá trị cache đã serialize giống trong cache backend. Khi mở chỉ đọc footer và index qua mmap;
+blob chỉ được đọc và giải mã khi entry được dùng lần đầu."""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # không có trên Windows: bỏ qua khóa file giữa các process
+    fcntl = None
+
+from cache_backend import _decode
+from pr_record import PRRecord
+
+MAGIC = b'RVAISNAP'
+SNAPSHOT_VERSION = 1
+# offset index, độ dài index, phiên bản, MAGIC
+_FOOTER = struct.Struct('<QII8s')
+
+
+def _record_schema():
+    # PRRecord được serialize thành mảng theo thứ tự __slots__ - đổi cấu trúc thì snapshot cũ không đọc được
+    return list(PRRecord.__slots__)
+
+
+class SnapshotReader:
+    """Snapshot trên đĩa: index được đọc lúc mở, blob của entry được đọc qua mmap khi cần"""
+
+    def __init__(self, path, mm, index):
+        self.path = path
+        self._mm = mm
+        self.created_at = index['created_at']
+        # key -> (offset, size, crc32, stored_at, expires_at)
+        self.entries = {entry[0]: tuple(entry[1:]) for entry in index['entries']}
+        self.labels = index.get('labels', {})
+
+    @classmethod
+    def open(cls, path):
+        """Mở snapshot; trả về None nếu không có file hoặc file hỏng/khác phiên bản"""
+        try:
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        except ValueError:  # file rỗng không mmap được
+            print(f"Ignoring cache snapshot {path}: empty file")
+            return None
+        try:
+            index = cls._read_index(mm)
+        except ValueError as e:
+            mm.close()
+            print(f"Ignoring cache snapshot {path}: {e}")
+            return None
+        return cls(path, mm, index)
+
+    @staticmethod
+    def _read_index(mm):
+        if len(mm) < len(MAGIC) + _FOOTER.size or mm[:len(MAGIC)] != MAGIC:
+            raise ValueError('not a snapshot file')
+        index_offset, index_size, version, magic = _FOOTER.unpack(mm[-_FOOTER.size:])
+        if magic != MAGIC:
+            raise ValueError('truncated snapshot')
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f'unsupported snapshot version {version}')
+        try:
+            index = json.loads(zlib.decompress(mm[index_offset:index_offset + index_size]).decode('utf-8'))
+        except (zlib.error, UnicodeDecodeError) as e:
+            raise ValueError(f'corrupt index: {e}')
+        if index.get('record_schema') != _record_schema():
+            raise ValueError('PR record format has changed')
+        return index
+
+    def live_keys(self):
+        now = time.time()
+        return [key for key, entry in self.entries.items() if entry[4] > now]
+
+    def blob(self, key):
+        """Bytes đã serialize của entry (None nếu dữ liệu hỏng)"""
+        offset, size, crc = self.entries[key][:3]
+        data = self._mm[offset:offset + size]
+        return data if zlib.crc32(data) == crc else None
+
+    def iter_entries(self, keys=None):
+        """(key, blob, stored_at, expires_at) của các entry còn hạn (bỏ qua entry hỏng)"""
+        for key in self.live_keys() if keys is None else keys:
+            blob = self.blob(key)
+            if blob is not None:
+                _, _, _, stored_at, expires_at = self.entries[key]
+                yield key, blob, stored_at, expires_at
+
+    def close(self):
+        self._mm.close()
+
+
+class _FileLock:
+    """Khóa file giữa các process (fcntl.flock); blocking=False trả về False nếu process khác đang giữ"""
+
+    def __init__(self, path, blocking=True):
+        self.path = path
+        self.blocking = blocking
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def __exit__(self, exc_type, exc, tb):
+        # Đóng file cũng nhả khóa
+        self._file.close()
+        return False
+
+
+def write_snapshot(path, entries, labels=None, merge=False):
+    """Ghi snapshot mới: ghi file tạm rồi đổi tên nên không bao giờ để lại file ghi dở.
+
+    entries: [(key, blob, stored_at, expires_at)]. merge=True giữ lại các entry và label của snapshot hiện có
+    mà entries không chứa (cache trong bộ nhớ của mỗi worker chỉ có một phần dữ liệu); khi đó chờ process khác
+    ghi xong, nếu không thì bỏ qua lần ghi khi process khác đang ghi. Trả về số entry đã ghi (None nếu bỏ qua)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with _FileLock(path + '.lock', blocking=merge) as locked:
+        if not locked:
+            return None
+        previous = SnapshotReader.open(path) if merge else None
+        try:
+            return _write(path, entries, labels or {}, previous)
+        finally:
+            if previous is not None:
+                previous.close()
+
+
+def _write(path, entries, labels, previous):
+    now = time.time()
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    index = []
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+
+            def add(key, blob, stored_at, expires_at):
+                index.append([key, f.tell(), len(blob), zlib.crc32(blob), stored_at, expires_at])
+                f.write(blob)
+
+            written = set()
+            for key, blob, stored_at, expires_at in entries:
+                if expires_at > now and key not in written:
+                    add(key, blob, stored_at, expires_at)
+                    written.add(key)
+            if previous is not None:
+                for entry in previous.iter_entries([key for key in previous.live_keys() if key not in written]):
+                    add(*entry)
+                labels = {**previous.labels, **labels}
+
+            index_offset = f.tell()
+            data = zlib.compress(json.dumps({
+                'created_at': now,
+                'record_schema': _record_schema(),
+                'entries': index,
+                'labels': labels
+            }, separators=(',', ':')).encode('utf-8'), 6)
+            f.write(data)
+            f.write(_FOOTER.pack(index_offset, len(data), SNAPSHOT_VERSION, MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(index)
+
+
+def remove_snapshot(path):
+    """Xóa snapshot (sau khi xóa cache) để lần khởi động sau không khôi phục lại dữ liệu cũ"""
+    with _FileLock(path + '.lock'):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class SnapshotRestoringCache:
+    """Bọc cache backend trong bộ nhớ: key chưa có trong backend được nạp từ snapshot khi được dùng lần đầu.
+
+    Entry khôi phục giữ nguyên stored_at, thời hạn và timestamp của dữ liệu nên quy tắc TTL/làm mới
+    (stale-while-revalidate, prewarm, webhook) áp dụng như với entry chưa từng qua restart."""
+
+    def __init__(self, backend, snapshot):
+        self._backend = backend
+        self._snapshot = snapshot
+        # Các key trong snapshot chưa được nạp vào backend
+        self._pending = set(snapshot.live_keys()) if snapshot is not None else set()
+        self._restored = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # ttl, max_bytes, try_lock, unlock, is_locked... của backend
+        return getattr(self._backend, name)
+
+    def _restore(self, key):
+        """Nạp key từ snapshot vào backend; trả về True nếu backend có key sau khi gọi"""
+        with self._lock:
+            if key not in self._pending:
+                # Thread khác vừa nạp (hoặc key đã bị ghi đè/xóa)
+                return self._backend.stored_at(key) is not None
+            self._pending.discard(key)
+            _, _, _, stored_at, expires_at = self._snapshot.entries[key]
+            remaining = expires_at - time.time()
+            blob = self._snapshot.blob(key)
+            if remaining <= 0 or blob is None:
+                return False
+            self._backend.set(key, _decode(blob), ttl=remaining, stored_at=stored_at)
+            self._restored += 1
+            return True
+
+    def get(self, key):
+        value = self._backend.get(key)
+        if value is None and key in self._pending and self._restore(key):
+            entry = self._backend.peek(key)
+            value = entry[0] if entry is not None else None
+        return value
+
+    def peek(self, key):
+        entry = self._backend.peek(key)
+        if entry is None and key in self._pending and self._restore(key):
+            entry = self._backend.peek(key)
+        return entry
+
+    def stored_at(self, key):
+        stored_at = self._backend.stored_at(key)
+        if stored_at is None and key in self._pending:
+            entry = self._snapshot.entries[key]
+            if entry[4] > time.time():
+                return entry[3]
+        return stored_at
+
+    def keys(self):
+        keys = self._backend.keys()
+        present = set(keys)
+        with self._lock:
+            pending = [key for key in self._pending if key not in present]
+        now = time.time()
+        return keys + [key for key in pending if self._snapshot.entries[key][4] > now]
+
+    def set(self, key, value, ttl=None, stored_at=None):
+        with self._lock:
+            self._pending.discard(key)
+        self._backend.set(key, value, ttl=ttl, stored_at=stored_at)
+
+    def delete(self, key):
+        with self._lock:
+            self._pending.discard(key)
+        self._backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+        self._backend.clear()
+
+    def dump(self):
+        """Entry của backend và các entry snapshot chưa được nạp (để chúng không bị mất ở lần ghi sau)"""
+        yield from self._backend.dump()
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            yield from self._snapshot.iter_entries(pending)
+
+    def snapshot_stats(self):
+        with self._lock:
+            return {
+                'loaded_entries': len(self._snapshot.entries) if self._snapshot is not None else 0,
+                'created_at': self._snapshot.created_at if self._snapshot is not None else None,
+                'pending': len(self._pending),
+                'restored': self._restored
+            }
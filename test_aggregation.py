@@ -0,0 +1,51 @@
+import app
+from aggregation import ColumnarPRs
+from test_delta_refresh import FakeGithub, make_pr
+
+
+def record(pr_id, creator, project, created_at, labels, estimate, actual):
+    return {'id': pr_id, 'creator': creator, 'project_id': project, 'repo': 'AperoVN/app',
+            'created_at': created_at, 'labels': labels, 'estimate_hours': estimate, 'actual_hours': actual}
+
+
+RECORDS = [
+    record(1, 'alice', 'AIP1', '2024-05-06', ['AI Generate', 'bug'], 2, 4),
+    record(2, 'alice', 'AIP1', '2024-05-07', ['AI Generate'], 1, 1),
+    record(3, 'bob', 'AIP2', '2024-05-13', ['AI Generate', 'bug'], 3, 3),
+    record(4, 'alice', 'AIP2', '2024-05-14', [], 0.5, 0),
+]
+
+
+def test_group_by_developer_and_week():
+    groups = ColumnarPRs(RECORDS).group_by(['developer', 'week'])
+    assert [(g['key']['developer'], g['key']['week'], g['total_prs'], g['total_estimate'], g['total_actual'])
+            for g in groups] == [('alice', '2024-W19', 2, 3, 5), ('alice', '2024-W20', 1, 0.5, 0),
+                                 ('bob', '2024-W20', 1, 3, 3)]
+    assert groups[0]['efficiency'] == 60.0
+    # Chưa có actual time thì hiệu suất mặc định 100%
+    assert groups[1]['efficiency'] == 100
+
+
+def test_group_by_label_counts_pr_once_per_label():
+    groups = ColumnarPRs(RECORDS).group_by(['project', 'label'])
+    assert {(g['key']['project'], g['key']['label']): g['total_prs'] for g in groups} == {
+        ('AIP1', 'AI Generate'): 2, ('AIP1', 'bug'): 1, ('AIP2', 'AI Generate'): 1, ('AIP2', 'bug'): 1}
+
+
+def test_api_aggregate_regroups_cached_result(fake_app):
+    FakeGithub.prs = [make_pr(1, 'alice', 'AIP1-1 Estimate Time: 2h Actual Time: 2h', created='2024-05-02'),
+                      make_pr(2, 'bob', 'AIP2-1 Estimate Time: 1h Actual Time: 2h', created='2024-05-20')]
+    params = {'org': 'AperoVN', 'label': 'AI Generate', 'since': '2024-05-01', 'until': '2024-05-31'}
+    client = app.app.test_client()
+
+    data = client.get('/api/aggregate', query_string={**params, 'group_by': 'month'}).json
+    assert data['groups'] == [{'key': {'month': '2024-05'}, 'total_prs': 2, 'total_estimate': 3,
+                               'total_actual': 4, 'efficiency': 75.0}]
+
+    # Nhóm lại theo chiều khác không gọi GitHub
+    FakeGithub.queries = []
+    data = client.get('/api/aggregate', query_string={**params, 'group_by': 'project,developer'}).json
+    assert [g['key'] for g in data['groups']] == [{'project': 'AIP1', 'developer': 'alice'},
+                                                   {'project': 'AIP2', 'developer': 'bob'}]
+    assert FakeGithub.queries == []
+    assert client.get('/api/aggregate', query_string={**params, 'group_by': 'color'}).status_code == 400
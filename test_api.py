@@ -0,0 +1,43 @@
+import app
+from test_delta_refresh import FakeGithub, make_pr
+
+
+def setup_fake():
+    FakeGithub.prs = [
+        make_pr(1, 'alice', 'AIP1-1\nEstimate Time: 2h\nActual Time: 4h', title='Login', created='2024-05-01'),
+        make_pr(2, 'bob', 'AIP1-2\nEstimate Time: 1h\nActual Time: 1h', title='Payment', created='2024-05-03'),
+        make_pr(3, 'carol', 'AIP2-1\nEstimate Time: 3h\nActual Time: 3h', title='Logout', created='2024-05-02'),
+    ]
+    return {'org': 'AperoVN', 'label': 'AI Generate', 'since': '2024-05-01', 'until': '2024-05-31'}
+
+
+def test_api_prs_pages_sorts_and_searches(fake_app):
+    params = setup_fake()
+    client = app.app.test_client()
+
+    response = client.get('/api/prs', query_string={**params, 'draw': 3, 'start': 0, 'length': 2,
+                                                    'order[0][column]': 6, 'order[0][dir]': 'desc'})
+    data = response.json
+    assert data['draw'] == 3
+    assert data['recordsTotal'] == data['recordsFiltered'] == 3
+    assert [row['created_at'] for row in data['data']] == ['2024-05-03', '2024-05-02']
+
+    # Hiệu suất được tính phía server và sắp xếp được
+    data = client.get('/api/prs', query_string={**params, 'start': 0, 'length': 10,
+                                                'order[0][column]': 5, 'order[0][dir]': 'asc'}).json
+    assert data['data'][0]['issue_number'] == 'AIP1-1'
+    assert data['data'][0]['efficiency'] == 50.0
+    assert data['data'][0]['efficiency_class'] == 'efficiency-low'
+
+    data = client.get('/api/prs', query_string={**params, 'start': 0, 'length': 10, 'search[value]': 'log'}).json
+    assert data['recordsTotal'] == 3
+    assert data['recordsFiltered'] == 2
+    assert {row['title'] for row in data['data']} == {'Login', 'Logout'}
+
+
+def test_api_charts(fake_app):
+    params = setup_fake()
+    data = app.app.test_client().get('/api/charts', query_string=params).json
+    assert data['status'] == 'success'
+    assert sorted(data['developers']['labels']) == ['alice', 'bob', 'carol']
+    assert data['totals'] == {'estimate': 6, 'actual': 8}
@@ -0,0 +1,42 @@
+import time
+
+from cache_backend import MemoryCacheBackend, SQLiteCacheBackend
+
+
+def _sample(n):
+    return {'prs_data': [{'title': f'PR {i}', 'creator': 'dev'} for i in range(n)], 'timestamp': time.time()}
+
+
+def test_sqlite_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    worker_a = SQLiteCacheBackend(path, ttl=60, max_bytes=10 * 1024 * 1024)
+    worker_b = SQLiteCacheBackend(path, ttl=60, max_bytes=10 * 1024 * 1024)
+
+    worker_a.set('key', _sample(3))
+    assert worker_b.get('key')['prs_data'][2]['title'] == 'PR 2'
+
+    # Xóa cache ở một worker phải có hiệu lực với worker còn lại
+    worker_b.clear()
+    assert worker_a.get('key') is None
+
+    stats = worker_a.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_sqlite_ttl_expiry(tmp_path):
+    cache = SQLiteCacheBackend(str(tmp_path / 'cache.sqlite3'), ttl=60, max_bytes=1024 * 1024)
+    cache.set('key', _sample(1), ttl=-1)
+    assert cache.get('key') is None
+
+
+def test_lru_eviction_by_bytes(tmp_path):
+    for cache in (MemoryCacheBackend(ttl=60, max_bytes=400),
+                  SQLiteCacheBackend(str(tmp_path / 'cache.sqlite3'), ttl=60, max_bytes=400)):
+        cache.set('a', _sample(40))
+        cache.set('b', _sample(40))
+        cache.get('a')  # 'a' vừa được dùng nên 'b' bị xóa trước
+        cache.set('c', _sample(40))
+        assert cache.get('b') is None
+        assert cache.stats()['evictions'] >= 1
+        assert cache.stats()['total_bytes'] <= 400 or cache.stats()['entries'] == 1
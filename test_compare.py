@@ -0,0 +1,100 @@
+import time
+from types import SimpleNamespace
+
+import app
+from jobs import JOB_DONE, JobStore
+from test_delta_refresh import FakeGithub, make_pr
+
+
+def labelled(pr, *labels):
+    pr.labels = [SimpleNamespace(name=label) for label in labels]
+    return pr
+
+
+def test_plan_shares_fetch_per_org():
+    specs = [app.normalize_compare_spec(spec) for spec in (
+        {'org': 'AperoVN', 'labels': ['AI Generate'], 'since': '2024-05-01', 'until': '2024-05-15'},
+        {'org': 'AperoVN', 'labels': ['AI Generate', 'Reviewed'], 'since': '2024-04-01', 'until': '2024-05-31'},
+        {'org': 'Other', 'labels': ['bug'], 'since': '2024-05-01'},
+        {'org': 'Other', 'labels': ['feature'], 'since': '2024-05-01'},
+    )]
+    assert [fetch[:4] for fetch in app.plan_compare_fetches(specs)] == [
+        ('AperoVN', ['AI Generate'], '2024-04-01', '2024-05-31'),
+        # Không có label chung: mỗi tập label fetch riêng thay vì lấy toàn bộ PR của org
+        ('Other', ['bug'], '2024-05-01', ''),
+        ('Other', ['feature'], '2024-05-01', ''),
+    ]
+
+
+def test_plan_groups_specs_under_label_subsets():
+    specs = [app.normalize_compare_spec({'org': 'AperoVN', 'labels': labels, 'since': '2024-05-01'})
+             for labels in (['X'], ['X', 'Y'], ['Y'], ['Y', 'Z'])]
+    plan = app.plan_compare_fetches(specs)
+    # {X, Y} được phục vụ bởi lần fetch {X}, {Y, Z} bởi lần fetch {Y}
+    assert [(fetch[1], fetch[4]) for fetch in plan] == [(['X'], [0, 1]), (['Y'], [2, 3])]
+
+    # Truy vấn không label phục vụ mọi truy vấn có label của cùng org
+    all_labels = app.normalize_compare_spec({'org': 'AperoVN', 'labels': [], 'since': '2024-04-01'})
+    assert [(fetch[1], fetch[2], fetch[4]) for fetch in app.plan_compare_fetches(specs + [all_labels])] == [
+        ([], '2024-04-01', [0, 1, 2, 3, 4])]
+
+
+def test_compare_filters_shared_fetch_per_query(fake_app, monkeypatch):
+    monkeypatch.setattr(app, 'ASYNC_REPORTS', False)
+    FakeGithub.prs = [
+        labelled(make_pr(1, 'alice', 'AIP1-1 Estimate Time: 2h Actual Time: 2h', created='2024-05-02'),
+                 'AI Generate', 'Reviewed'),
+        labelled(make_pr(2, 'bob', 'AIP1-2 Estimate Time: 1h Actual Time: 2h', created='2024-05-20'), 'AI Generate'),
+    ]
+    response = app.app.test_client().post('/api/compare', json={'queries': [
+        {'org': 'AperoVN', 'labels': ['AI Generate'], 'since': '2024-05-01', 'until': '2024-05-31'},
+        {'org': 'AperoVN', 'labels': ['AI Generate', 'reviewed'], 'since': '2024-05-01', 'until': '2024-05-31'},
+        {'org': 'AperoVN', 'labels': ['AI Generate'], 'since': '2024-05-10', 'until': '2024-05-31'},
+    ]})
+    results = response.json['results']
+    assert [r['stats']['total_prs'] for r in results] == [2, 1, 1]
+    assert list(results[1]['stats']['developers']) == ['alice']
+    assert results[2]['stats']['efficiency'] == 50.0
+    assert len(response.json['fetches']) == 1
+    # Một lần fetch: 1 request đếm + 1 trang
+    assert len(FakeGithub.queries) == 2
+
+
+def test_compare_rejects_bad_payload():
+    assert app.app.test_client().post('/api/compare', json={'queries': []}).status_code == 400
+
+
+def test_cold_compare_runs_as_background_jobs(fake_app, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, '_job_store', JobStore(str(tmp_path / 'jobs.sqlite3'), 600))
+    monkeypatch.setattr(app, 'ASYNC_REPORTS', True)
+    FakeGithub.prs = [make_pr(1, 'alice', 'AIP1-1 Estimate Time: 2h Actual Time: 2h', created='2024-05-02')]
+    payload = {'queries': [{'org': 'AperoVN', 'labels': ['AI Generate'], 'since': '2024-05-01',
+                            'until': '2024-05-31'}]}
+    client = app.app.test_client()
+
+    # Chưa có dữ liệu: request trả về ngay với job thay vì crawl trong request
+    pending = client.post('/api/compare', json=payload)
+    assert pending.status_code == 202
+    job_id, = [job['job_id'] for job in pending.json['jobs']]
+    deadline = time.time() + 5
+    while app._job_store.get(job_id)['status'] != JOB_DONE and time.time() < deadline:
+        time.sleep(0.05)
+
+    response = client.post('/api/compare', json=payload)
+    assert response.status_code == 200
+    assert response.json['results'][0]['stats']['total_prs'] == 1
+
+
+def test_truncated_shared_fetch_falls_back_per_query(fake_app, monkeypatch):
+    monkeypatch.setattr(app, 'ASYNC_REPORTS', False)
+    monkeypatch.setattr(app, 'MAX_PRS', 2)
+    FakeGithub.prs = [make_pr(i, 'alice', 'AIP1-1 Estimate Time: 1h Actual Time: 1h', created=created)
+                      for i, created in enumerate(['2024-05-02', '2024-05-11', '2024-05-12'])]
+    response = app.app.test_client().post('/api/compare', json={'queries': [
+        {'org': 'AperoVN', 'labels': ['AI Generate'], 'since': '2024-05-01', 'until': '2024-05-31'},
+        {'org': 'AperoVN', 'labels': ['AI Generate'], 'since': '2024-05-10', 'until': '2024-05-31'},
+    ]})
+    results = response.json['results']
+    # Lần fetch chung chỉ lấy được 2/3 PR: truy vấn hẹp được fetch riêng và không bị thiếu
+    assert [(r['stats']['total_prs'], r['truncated']) for r in results] == [(2, True), (2, False)]
+    assert len(response.json['fetches']) == 1
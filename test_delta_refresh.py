@@ -0,0 +1,138 @@
+import re
+from datetime import datetime
+from types import SimpleNamespace
+
+import app
+
+
+def make_pr(pr_id, login, body, title='PR', created='2024-05-02'):
+    return SimpleNamespace(
+        id=pr_id,
+        number=pr_id,
+        title=title,
+        body=body,
+        user=SimpleNamespace(login=login),
+        created_at=datetime.strptime(created, '%Y-%m-%d'),
+        html_url=f'https://github.com/AperoVN/repo/pull/{pr_id}',
+        labels=[SimpleNamespace(name='AI Generate')]
+    )
+
+
+class FakeResults(list):
+    def __init__(self, items, per_page):
+        super().__init__(items)
+        self.per_page = per_page
+
+    @property
+    def totalCount(self):
+        # Giống GitHub: total_count là số thật nhưng chỉ trả về tối đa 1000 kết quả
+        return len(self)
+
+    def get_page(self, page):
+        return self[:1000][page * self.per_page:(page + 1) * self.per_page]
+
+
+class FakeGithub:
+    prs = []
+    queries = []
+
+    def __init__(self, *args, per_page=30, **kwargs):
+        self.per_page = per_page
+
+    @classmethod
+    def client(cls, timeout=None, per_page=30):
+        """Thay thế app.get_github trong test"""
+        return cls(per_page=per_page)
+
+    def get_organization(self, org_name):
+        # Org không có repo: làm mới label thành công với danh sách rỗng
+        return SimpleNamespace(get_repos=lambda: [])
+
+    def search_issues(self, query):
+        FakeGithub.queries.append(query)
+        prs = FakeGithub.prs
+        # Lọc theo created:A..B / created:>= / created:<= giống GitHub search
+        window = re.search(r'created:(\S+)\.\.(\S+)', query)
+        since = re.search(r'created:>=(\S+)', query)
+        until = re.search(r'created:<=(\S+)', query)
+        if window:
+            start, end = (datetime.strptime(v, '%Y-%m-%dT%H:%M:%SZ') for v in window.groups())
+            prs = [pr for pr in prs if start <= pr.created_at <= end]
+        if since:
+            prs = [pr for pr in prs if pr.created_at.strftime('%Y-%m-%d') >= since.group(1)]
+        if until:
+            prs = [pr for pr in prs if pr.created_at.strftime('%Y-%m-%d') <= until.group(1)]
+        return FakeResults(prs, self.per_page)
+
+
+def test_delta_refresh_upserts_and_adjusts_stats(monkeypatch):
+    monkeypatch.setattr(app, 'get_github', FakeGithub.client)
+    FakeGithub.prs = [
+        make_pr(1, 'alice', 'AIP1-1\nEstimate Time: 2h\nActual Time: 3h'),
+        make_pr(2, 'bob', 'AIP2-1\nEstimate Time: 1h\nActual Time: 1h'),
+    ]
+    cached = app.fetch_and_parse_prs_internal('AperoVN', ['AI Generate'], '2024-05-01')
+    assert cached['stats']['total_actual'] == 4
+
+    # PR 2 chuyển sang project khác và có thời gian mới, PR 3 mới được tạo
+    FakeGithub.prs = [
+        make_pr(2, 'bob', 'AIP1-7\nEstimate Time: 4h\nActual Time: 5h'),
+        make_pr(3, 'carol', 'AIP2-9\nEst Time: 30m\nActual Time: 30m'),
+    ]
+    result = app.refresh_prs_delta(cached, 'AperoVN', ['AI Generate'], '2024-05-01')
+
+    assert 'updated:>=' in FakeGithub.queries[-1]
+    assert sorted(r['id'] for r in result['prs_data']) == [1, 2, 3]
+    stats = result['stats']
+    assert stats['total_prs'] == 3
+    assert stats['total_estimate'] == 6.5
+    assert stats['total_actual'] == 8.5
+    assert stats['developers']['bob'] == {'total_prs': 1, 'total_estimate': 4, 'total_actual': 5}
+    assert stats['projects']['AIP1']['developers'] == ['alice', 'bob']
+    assert stats['projects']['AIP2']['developers'] == ['carol']
+    # Kết quả cache ban đầu không bị sửa
+    assert cached['stats']['total_actual'] == 4
+
+    # Nếu crawl lại toàn bộ phải ra cùng thống kê
+    FakeGithub.prs = [
+        make_pr(1, 'alice', 'AIP1-1\nEstimate Time: 2h\nActual Time: 3h'),
+        make_pr(2, 'bob', 'AIP1-7\nEstimate Time: 4h\nActual Time: 5h'),
+        make_pr(3, 'carol', 'AIP2-9\nEst Time: 30m\nActual Time: 30m'),
+    ]
+    full = app.fetch_and_parse_prs_internal('AperoVN', ['AI Generate'], '2024-05-01')
+    assert full['stats']['developers'] == stats['developers']
+    assert full['stats']['projects'] == stats['projects']
+
+
+def test_delta_refresh_keeps_order_cap_and_drops_unlabelled(monkeypatch):
+    monkeypatch.setattr(app, 'get_github', FakeGithub.client)
+    monkeypatch.setattr(app, 'MAX_PRS', 3)
+    FakeGithub.prs = [make_pr(i, 'alice', 'AIP1-1\nEstimate Time: 1h\nActual Time: 1h', created=f'2024-05-0{i}')
+                      for i in (1, 2, 3)]
+    cached = app.fetch_and_parse_prs_internal('AperoVN', ['AI Generate'], '2024-05-01')
+
+    # PR 4 mới nhất được tạo, PR 2 bị gỡ label của truy vấn
+    unlabelled = make_pr(2, 'alice', 'AIP1-1\nEstimate Time: 1h\nActual Time: 1h', created='2024-05-02')
+    unlabelled.labels = []
+    FakeGithub.prs = [make_pr(4, 'bob', 'AIP1-2\nEstimate Time: 2h\nActual Time: 2h', created='2024-05-04'),
+                      unlabelled]
+    result = app.refresh_prs_delta(cached, 'AperoVN', ['AI Generate'], '2024-05-01')
+    # Query làm mới không lọc theo label để thấy PR bị gỡ label
+    assert 'label:' not in FakeGithub.queries[-1]
+    assert [r['id'] for r in result['prs_data']] == [4, 3, 1]
+    assert result['stats']['total_prs'] == 3 and result['stats']['total_actual'] == 4
+
+    # Vượt MAX_PRS: PR cũ nhất bị bỏ giống khi crawl đầy đủ
+    FakeGithub.prs = [make_pr(5, 'bob', 'AIP1-2\nEstimate Time: 2h\nActual Time: 2h', created='2024-05-05')]
+    capped = app.refresh_prs_delta(result, 'AperoVN', ['AI Generate'], '2024-05-01')
+    assert [r['id'] for r in capped['prs_data']] == [5, 4, 3]
+    assert capped['stats']['total_actual'] == 5
+    assert capped['stats']['developers']['alice'] == {'total_prs': 1, 'total_estimate': 1, 'total_actual': 1}
+    assert (capped['stats']['total_prs_found'], capped['stats']['total_prs_processed']) == (4, 3)
+
+    # Số PR thay đổi chạm giới hạn hoặc lần crawl đầy đủ đã quá cũ: phải crawl lại toàn bộ
+    FakeGithub.prs = [make_pr(i, 'bob', 'AIP1-2', created='2024-05-06') for i in range(6, 10)]
+    assert app.refresh_prs_delta(capped, 'AperoVN', ['AI Generate'], '2024-05-01') is None
+    FakeGithub.prs = []
+    stale = dict(capped, full_fetch_at=capped['full_fetch_at'] - app.DELTA_REFRESH_MAX_AGE)
+    assert app.refresh_prs_delta(stale, 'AperoVN', ['AI Generate'], '2024-05-01') is None
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+
+import app
+from test_delta_refresh import FakeGithub, make_pr
+
+
+def setup_fake(monkeypatch):
+    monkeypatch.setattr(app, 'SEARCH_PAGE_SIZE', 2)
+    FakeGithub.prs = [
+        make_pr(1, 'alice', 'AIP1-1\nEstimate Time: 2h\nActual Time: 4h', title='Login, "v2"'),
+        make_pr(2, 'bob', 'AIP1-2\nEstimate Time: 1h\nActual Time: 1h'),
+        make_pr(3, 'alice', 'AIP2-1\nEstimate Time: 3h\nActual Time: 3h'),
+    ]
+    return {'org': 'AperoVN', 'label': 'AI Generate', 'since': '2024-05-01', 'until': '2024-05-31'}
+
+
+def test_export_csv_streams_rows_then_aggregates(fake_app, monkeypatch):
+    params = setup_fake(monkeypatch)
+    response = app.app.test_client().get('/export', query_string={**params, 'format': 'csv'})
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['record_type'] for row in rows] == ['pr'] * 3 + ['developer'] * 2 + ['project'] * 2 + ['total']
+    assert {row['title'] for row in rows[:3]} >= {'Login, "v2"'}
+    alice = next(row for row in rows if row['record_type'] == 'developer' and row['key'] == 'alice')
+    assert (alice['total_prs'], alice['estimate_hours'], alice['actual_hours']) == ('2', '5.0', '7.0')
+    assert rows[-1]['total_prs'] == '3'
+    assert rows[-1]['efficiency'] == '75.0'
+
+
+def test_export_ndjson_from_cache(fake_app, monkeypatch):
+    params = setup_fake(monkeypatch)
+    app.fetch_and_parse_prs(params['org'], [params['label']], params['since'], params['until'])
+    FakeGithub.queries = []
+
+    response = app.app.test_client().get('/export', query_string={**params, 'format': 'ndjson'})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    # Kết quả trong cache được dùng lại, không gọi GitHub
+    assert FakeGithub.queries == []
+    assert [line['record_type'] for line in lines].count('pr') == 3
+    assert lines[-1] == {'record_type': 'total', 'key': 'all', 'estimate_hours': 6, 'actual_hours': 8,
+                         'total_prs': 3, 'efficiency': 75.0}
+
+
+def test_export_csv_from_cache_joins_labels(fake_app, monkeypatch):
+    params = setup_fake(monkeypatch)
+    app.fetch_and_parse_prs(params['org'], [params['label']], params['since'], params['until'])
+    FakeGithub.queries = []
+
+    response = app.app.test_client().get('/export', query_string={**params, 'format': 'csv'})
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert FakeGithub.queries == []
+    assert {row['labels'] for row in rows if row['record_type'] == 'pr'} == {'AI Generate'}
+
+
+def test_export_rejects_unknown_format():
+    assert app.app.test_client().get('/export?format=xml').status_code == 400
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import app
+from github_client import GitHubClientManager
+from github_search import PartitionedCrawler, RateLimiter, RestSearchBackend
+from label_index import fetch_org_labels
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from fake_github import FakeGitHubServer, Fixtures  # noqa: E402
+
+
+def test_crawler_against_fake_github_with_rate_limit_errors():
+    fixtures = Fixtures(prs=300, repos=4, days=30)
+    server = FakeGitHubServer(fixtures, error_rate=0.2, retry_after=0.01).start()
+    try:
+        manager = GitHubClientManager('token', base_url=server.url)
+        github = manager.get(timeout=10, per_page=50)
+        crawler = PartitionedCrawler(RestSearchBackend(github, 50), RateLimiter(100000), max_workers=4,
+                                     max_retries=10, cap=120)
+        ids = {pr.id for page in crawler.iter_pages('org:AperoVN is:pr', '2000-01-01') for pr in page}
+        assert ids == {pr['id'] for pr in fixtures.prs}
+        # Kết quả vượt cap nên crawler phải chia nhiều cửa sổ
+        assert len(crawler.windows) > 1
+        stats = server.stats()
+        assert stats['rate_limited'] > 0 and stats['search'] == stats['total']
+
+        server.error_rate = 0
+        labels = fetch_org_labels(manager.get(timeout=10, per_page=100), 'AperoVN', 2)
+        assert labels == set().union(*fixtures.repo_labels.values())
+    finally:
+        # Connection class của PyGithub là toàn cục: trả lại cho manager của app
+        app._github_clients._install()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+
+import requests
+
+import app
+from github_client import HttpResponseCache, RateLimitTracker
+
+
+def _response(body, headers):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(body).encode('utf-8')
+    response.headers.update(headers)
+    return response
+
+
+def test_pygithub_requests_share_one_session_and_track_rate_limits(monkeypatch):
+    manager = app._github_clients
+    calls = []
+
+    def fake_request(method, url, **kwargs):
+        calls.append((method, url, threading.get_ident()))
+        resource = 'search' if '/search/' in url else 'core'
+        return _response({'login': 'AperoVN', 'total_count': 0, 'items': []}, {
+            'x-ratelimit-resource': resource, 'x-ratelimit-limit': '30' if resource == 'search' else '5000',
+            'x-ratelimit-remaining': '2' if resource == 'search' else '4999',
+            'x-ratelimit-reset': str(int(time.time()) + 30)})
+
+    monkeypatch.setattr(manager.session, 'request', fake_request)
+    monkeypatch.setattr(manager, 'rate_limits', RateLimitTracker())
+
+    g = app.get_github()
+    assert app.get_github() is g
+    assert g.get_organization('AperoVN').login == 'AperoVN'
+    assert g.search_issues('org:AperoVN is:pr').totalCount == 0
+
+    assert len(calls) == 2
+    limits = manager.rate_limits.snapshot()
+    assert limits['core']['remaining'] == 4999
+    assert limits['search']['remaining'] == 2
+    # Còn 2 request search dưới ngưỡng 3 - cần giãn request tới lúc reset
+    assert 0 < manager.rate_limits.delay_for('search', reserve=3) <= 15
+    assert manager.rate_limits.delay_for('core', reserve=3) == 0
+
+
+def test_tracker_ignores_responses_without_headers():
+    tracker = RateLimitTracker()
+    tracker.update({'content-type': 'application/json'})
+    assert tracker.snapshot() == {}
+    assert tracker.remaining_fraction('search') == 1.0
+
+
+def test_conditional_requests_served_from_disk_on_304(monkeypatch, tmp_path):
+    manager = app._github_clients
+    monkeypatch.setattr(manager, 'http_cache', HttpResponseCache(str(tmp_path / 'http.sqlite3'), 1024 * 1024))
+    monkeypatch.setattr(manager, 'rate_limits', RateLimitTracker())
+    sent_headers = []
+
+    def fake_request(method, url, headers=None, **kwargs):
+        sent_headers.append(dict(headers or {}))
+        rate_headers = {'x-ratelimit-resource': 'core', 'x-ratelimit-limit': '5000',
+                        'x-ratelimit-remaining': str(5000 - len(sent_headers)), 'x-ratelimit-reset': '0'}
+        if (headers or {}).get('If-None-Match') == '"v1"':
+            response = _response({}, rate_headers)
+            response.status_code = 304
+            response._content = b''
+            return response
+        response = _response([{'name': 'AI Generate'}], {'ETag': '"v1"', **rate_headers})
+        response.url = url
+        return response
+
+    monkeypatch.setattr(manager.session, 'request', fake_request)
+
+    first = manager.send('GET', 'https://api.github.com/repos/AperoVN/repo/labels', headers={'Authorization': 't'})
+    second = manager.send('GET', 'https://api.github.com/repos/AperoVN/repo/labels', headers={'Authorization': 't'})
+
+    assert 'If-None-Match' not in sent_headers[0]
+    assert sent_headers[1]['If-None-Match'] == '"v1"'
+    assert second.status_code == 200
+    assert second.json() == first.json() == [{'name': 'AI Generate'}]
+    assert second.headers['x-ratelimit-remaining'] == '4998'
+    stats = manager.http_cache.stats()
+    assert stats['requests'] == 2
+    assert stats['not_modified'] == 1
+    assert stats['stored'] == 1
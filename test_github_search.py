@@ -0,0 +1,90 @@
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from github_search import GraphQLSearchBackend, PartitionedCrawler, RateLimiter, RestSearchBackend, SharedRateLimiter
+from test_delta_refresh import FakeGithub, make_pr
+
+
+def _crawler(per_page=100):
+    return PartitionedCrawler(RestSearchBackend(FakeGithub(per_page=per_page), per_page),
+                              RateLimiter(100000), max_workers=4)
+
+
+def test_partitioned_crawl_breaks_search_cap():
+    start = datetime(2024, 3, 1)
+    FakeGithub.prs = [make_pr(i, 'dev', '') for i in range(2500)]
+    for i, pr in enumerate(FakeGithub.prs):
+        pr.created_at = start + timedelta(minutes=7 * i)
+
+    crawler = _crawler()
+    ids = [pr.id for page in crawler.iter_pages('org:AperoVN is:pr', '2024-03-01', '2024-03-31') for pr in page]
+
+    assert crawler.total_found == 2500
+    assert len(crawler.windows) >= 3
+    assert all(total <= 1000 for _, _, total in crawler.windows)
+    assert sorted(ids) == list(range(2500))
+
+
+def test_limit_is_respected_without_partitioning():
+    FakeGithub.prs = [make_pr(i, 'dev', '', created='2024-03-02') for i in range(250)]
+    crawler = _crawler(per_page=30)
+    ids = [pr.id for page in crawler.iter_pages('org:AperoVN is:pr', '2024-03-01', '2024-03-31', limit=100)
+           for pr in page]
+
+    assert len(ids) == len(set(ids)) == 100
+    assert len(crawler.windows) == 1
+
+
+class FakeGraphQLSession:
+    """Giả lập endpoint GraphQL: phân trang bằng cursor trên danh sách node"""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.requests = []
+
+    def post(self, url, json, headers, timeout):
+        self.requests.append(json)
+        variables = json['variables']
+        if 'first' not in variables:
+            data = {'search': {'issueCount': len(self.nodes)}}
+        else:
+            start = int(variables['after'] or 0)
+            end = start + variables['first']
+            data = {'search': {
+                'issueCount': len(self.nodes),
+                'pageInfo': {'hasNextPage': end < len(self.nodes), 'endCursor': str(end)},
+                'nodes': self.nodes[start:end]
+            }}
+        return SimpleNamespace(status_code=200, headers={}, json=lambda: {'data': data}, text='')
+
+
+def test_graphql_backend_paginates_with_cursor():
+    nodes = [{'databaseId': i, 'title': f'AIP1-{i}', 'body': 'Estimate Time: 1h', 'createdAt': '2024-03-02T10:00:00Z',
+              'url': f'https://github.com/AperoVN/repo/pull/{i}', 'author': {'login': 'dev'} if i else None,
+              'labels': {'nodes': [{'name': 'AI Generate'}]}} for i in range(250)]
+    nodes.append({})  # issue không phải PR
+    session = FakeGraphQLSession(nodes)
+    crawler = PartitionedCrawler(GraphQLSearchBackend('token', 'http://graphql', 10, session=session),
+                                 RateLimiter(100000))
+
+    prs = [pr for page in crawler.iter_pages('org:AperoVN is:pr', '2024-03-01', '2024-03-31') for pr in page]
+
+    assert sorted(pr.id for pr in prs) == list(range(250))
+    assert prs[0].labels[0].name == 'AI Generate'
+    assert {pr.user.login for pr in prs} == {'dev', 'ghost'}
+    # 1 request đếm + 3 trang 100 PR
+    assert len(session.requests) == 4
+
+
+def test_shared_rate_limiter_budget_spans_workers(tmp_path):
+    path = str(tmp_path / 'rate_limit.sqlite3')
+    # Hai worker cùng cấu hình 60 request/phút: tổng budget vẫn là 60 chứ không phải 120
+    workers = [SharedRateLimiter(path, 60), SharedRateLimiter(path, 60)]
+    for i in range(60):
+        workers[i % 2].acquire()
+
+    start = time.time()
+    workers[1].acquire()
+    # Bucket đã hết: phải chờ khoảng 1 giây để có token mới
+    assert time.time() - start >= 0.5
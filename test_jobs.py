@@ -0,0 +1,45 @@
+import time
+
+import app
+from jobs import JobStore
+from test_delta_refresh import FakeGithub, make_pr
+from test_single_flight import GatedFakeGithub
+
+
+def test_report_job_progress_and_view(fake_app, monkeypatch, tmp_path):
+    GatedFakeGithub.reset()
+    monkeypatch.setattr(app, 'get_github', GatedFakeGithub.client)
+    monkeypatch.setattr(app, '_job_store', JobStore(str(tmp_path / 'jobs.sqlite3'), stale_timeout=600))
+    monkeypatch.setattr(app, 'GITHUB_TOKEN', 'token')
+    monkeypatch.setattr(app, 'ASYNC_REPORTS', True)
+    FakeGithub.prs = [make_pr(i, 'alice', 'AIP1-1 Estimate Time: 1h', created='2024-05-02') for i in range(5)]
+    client = app.app.test_client()
+    params = {'org': 'AperoVN', 'label': 'AI Generate', 'since': '2024-05-01', 'until': '2024-05-31'}
+
+    # Trang chính chuyển hướng sang trang tiến độ của job khi cache trống
+    response = client.get('/', query_string=params)
+    assert response.status_code == 302
+    job_id = response.headers['Location'].split('/')[-2]
+
+    # Truy vấn giống hệt dùng lại job đang chạy
+    assert client.post('/jobs', data=params).json['job_id'] == job_id
+    # Job chỉ crawl (request đếm + 1 trang) sau khi đã kiểm tra việc dùng lại job
+    GatedFakeGithub.allowed.release(2)
+
+    deadline = time.time() + 5
+    while client.get(f'/jobs/{job_id}').json['status'] != 'done' and time.time() < deadline:
+        time.sleep(0.05)
+    job = client.get(f'/jobs/{job_id}').json
+    assert job['status'] == 'done'
+    assert job['prs_parsed'] == job['total_expected'] == 5
+    assert job['pages_fetched'] == 1
+
+    page = client.get(f'/jobs/{job_id}/view')
+    assert page.status_code == 200
+    assert b'Pull Request Analysis Results' in page.data
+    # Cache đã có dữ liệu nên trang chính render trực tiếp
+    assert client.get('/', query_string=params).status_code == 200
+
+
+def test_unknown_job_returns_404():
+    assert app.app.test_client().get('/jobs/missing').status_code == 404
@@ -0,0 +1,105 @@
+import time
+from types import SimpleNamespace
+
+import app
+from label_index import LabelIndex, fetch_org_labels
+
+
+class FakeRepo:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def get_labels(self):
+        time.sleep(0.05)
+        return [SimpleNamespace(name=label) for label in self.labels]
+
+
+class FakeOrgGithub:
+    repos = [FakeRepo(f'repo{i}', ['bug', f'team-{i}']) for i in range(8)]
+
+    def get_organization(self, org_name):
+        return SimpleNamespace(get_repos=lambda: self.repos)
+
+
+def test_label_index_ttl_and_eviction(tmp_path):
+    index = LabelIndex(str(tmp_path / 'labels.sqlite3'), ttl=3600, max_orgs=2)
+    index.observe('AperoVN', [{'url': 'pr/1', 'labels': ['AI Generate', 'bug']},
+                              {'url': 'pr/2', 'labels': ['AI Generate']}])
+    # Đã có label từ PR nhưng chưa lấy label của repo nên vẫn cần làm mới
+    assert index.get('AperoVN') == (['AI Generate', 'bug'], True)
+
+    index.replace_repo_labels('AperoVN', {'Bug', 'Reviewed'})
+    assert index.get('aperovn') == (['AI Generate', 'bug', 'Reviewed'], False)
+
+    index.observe('OrgB', [{'url': 'pr/3', 'labels': ['x']}])
+    index.observe('OrgC', [{'url': 'pr/4', 'labels': ['y']}])
+    # Chỉ giữ 2 org được dùng gần nhất
+    assert index.get('AperoVN')[0] == []
+    assert index.stats()['orgs'] == 2
+
+
+def test_unknown_orgs_do_not_evict_and_counts_follow_prs(tmp_path):
+    index = LabelIndex(str(tmp_path / 'labels.sqlite3'), ttl=3600, max_orgs=2)
+    index.observe('AperoVN', [{'url': 'pr/1', 'labels': ['AI Generate', 'bug']}])
+    index.observe('OrgB', [{'url': 'pr/2', 'labels': ['x']}])
+    # Xem org không tồn tại (tham số ?org= tùy ý) không thêm org vào index
+    for i in range(5):
+        assert index.get(f'random-{i}') == ([], True)
+    assert index.stats()['orgs'] == 2 and index.get('AperoVN')[0] == ['AI Generate', 'bug']
+
+    # Ghi nhận lại cùng PR không làm tăng số đếm; PR bị gỡ label thì label không còn PR nào bị xóa
+    for _ in range(3):
+        index.observe('AperoVN', [{'url': 'pr/1', 'labels': ['AI Generate', 'bug']}])
+    index.observe('AperoVN', [{'url': 'pr/5', 'labels': ['AI Generate']}])
+    counts = {label: pr_count for label, _, pr_count in index.dump()['AperoVN']['labels']}
+    assert counts == {'AI Generate': 2, 'bug': 1}
+    index.observe('AperoVN', [{'url': 'pr/1', 'labels': ['AI Generate']}])
+    assert index.get('AperoVN')[0] == ['AI Generate']
+
+
+def test_fetch_org_labels_reads_repos_concurrently():
+    start = time.time()
+    labels = fetch_org_labels(FakeOrgGithub(), 'AperoVN', max_workers=8)
+    assert labels == {'bug'} | {f'team-{i}' for i in range(8)}
+    assert time.time() - start < 0.3
+
+
+def test_labels_endpoint_never_waits_for_github(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, '_label_index', LabelIndex(str(tmp_path / 'labels.sqlite3'), 3600, 10))
+    monkeypatch.setattr(app, 'get_github', lambda **kwargs: FakeOrgGithub())
+    monkeypatch.setattr(app, 'GITHUB_TOKEN', 'token')
+    client = app.app.test_client()
+
+    assert client.get('/labels?org=AperoVN').json['labels'] == []
+    deadline = time.time() + 5
+    while not client.get('/labels?org=AperoVN').json['labels'] and time.time() < deadline:
+        time.sleep(0.05)
+    assert 'team-3' in client.get('/labels?org=AperoVN').json['labels']
+
+
+def test_failed_label_refresh_is_not_retried_until_retry_after(monkeypatch, tmp_path):
+    calls = []
+
+    class MissingOrgGithub:
+        def get_organization(self, org_name):
+            calls.append(org_name)
+            raise ValueError(f'Not Found: {org_name}')
+
+    monkeypatch.setattr(app, '_label_index', LabelIndex(str(tmp_path / 'labels.sqlite3'), 3600, 10))
+    monkeypatch.setattr(app, 'get_github', lambda **kwargs: MissingOrgGithub())
+    monkeypatch.setattr(app, 'LABEL_RETRY_AFTER', 1)
+
+    for _ in range(3):
+        try:
+            app.refresh_org_labels('NoSuchOrg')
+        except ValueError:
+            pass
+    # Lỗi được ghi nhận như kết quả âm: chỉ gọi GitHub lại sau LABEL_RETRY_AFTER
+    assert calls == ['NoSuchOrg']
+    time.sleep(1.1)
+    try:
+        app.refresh_org_labels('NoSuchOrg')
+    except ValueError:
+        pass
+    assert calls == ['NoSuchOrg', 'NoSuchOrg']
@@ -0,0 +1,56 @@
+import time
+
+import app
+from github_client import RateLimitTracker
+from metrics import MetricsRegistry, github_endpoint
+from test_delta_refresh import FakeGithub, make_pr
+from test_github_client import _response
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('latency_seconds', 'Latency', ('stage',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, stage='parse')
+    text = registry.render()
+    assert 'latency_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="parse",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{stage="parse",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{stage="parse"} 3' in text
+
+
+def test_github_endpoint_labels_have_low_cardinality():
+    assert github_endpoint('https://api.github.com:443/search/issues?q=org%3AAperoVN') == '/search/issues'
+    assert github_endpoint('https://api.github.com/repos/AperoVN/app/labels?page=2') == '/repos/:owner/:repo/labels'
+    assert github_endpoint('https://ghe.local/api/v3/orgs/AperoVN/repos') == '/orgs/:name/repos'
+    assert github_endpoint('https://api.github.com/graphql') == '/graphql'
+
+
+def test_github_calls_are_timed(monkeypatch):
+    manager = app._github_clients
+    monkeypatch.setattr(manager.session, 'request', lambda method, url, **kwargs: _response(
+        {'login': 'AperoVN'}, {'x-ratelimit-resource': 'core', 'x-ratelimit-limit': '5000',
+                               'x-ratelimit-remaining': '4321', 'x-ratelimit-reset': str(int(time.time()) + 60)}))
+    monkeypatch.setattr(manager, 'rate_limits', RateLimitTracker())
+    before = app._github_request_seconds.count(endpoint='/orgs/:name', method='GET', status='200')
+    app.get_github().get_organization('AperoVN')
+    assert app._github_request_seconds.count(endpoint='/orgs/:name', method='GET', status='200') == before + 1
+    assert 'reviewai_github_rate_limit_remaining{resource="core"} 4321' in app._metrics.render()
+
+
+def test_server_timing_header_and_metrics_endpoint(fake_app, monkeypatch):
+    monkeypatch.setattr(app, 'ASYNC_REPORTS', False)
+    monkeypatch.setattr(app, 'GITHUB_TOKEN', 'token')
+    monkeypatch.setattr(app, 'SERVER_TIMING_ENABLED', True)
+    FakeGithub.prs = [make_pr(i, 'alice', 'AIP1-1 Estimate Time: 1h') for i in range(3)]
+    client = app.app.test_client()
+
+    response = client.get('/', query_string={'org': 'AperoVN', 'since': '2024-05-01', 'until': '2024-05-31'})
+    assert response.status_code == 200
+    stages = {entry.split(';')[0].strip() for entry in response.headers['Server-Timing'].split(',')}
+    assert {'github', 'parse', 'aggregate', 'render', 'total'} <= stages
+
+    text = client.get('/metrics').data.decode('utf-8')
+    assert 'reviewai_stage_seconds_count{stage="parse"}' in text
+    assert 'reviewai_http_request_seconds_count{endpoint="index",status="200"}' in text
+    assert 'reviewai_cache_misses_total{backend=' in text
@@ -0,0 +1,132 @@
+import time
+from datetime import date, timedelta
+
+import app
+from pr_index import PRIndex, subtract_spans
+from test_delta_refresh import FakeGithub, make_pr
+
+
+def _record(pr_id, created_at, labels, creator='dev'):
+    return {'id': pr_id, 'title': f'PR {pr_id}', 'issue_number': 'N/A', 'project_id': 'Unknown',
+            'estimate_time': '0h', 'actual_time': '0h', 'estimate_hours': 0, 'actual_hours': 0,
+            'creator': creator, 'created_at': created_at, 'repo': 'repo', 'labels': labels, 'url': ''}
+
+
+def test_subtract_spans():
+    d = date.fromisoformat
+    covered = [(d('2024-01-05'), d('2024-01-10')), (d('2024-01-15'), d('2024-01-20'))]
+    assert subtract_spans(d('2024-01-01'), d('2024-01-31'), covered) == [
+        (d('2024-01-01'), d('2024-01-04')), (d('2024-01-11'), d('2024-01-14')), (d('2024-01-21'), d('2024-01-31'))]
+    assert subtract_spans(d('2024-01-06'), d('2024-01-09'), covered) == []
+
+
+def test_label_subset_coverage_and_query(tmp_path):
+    index = PRIndex(str(tmp_path / 'index.sqlite3'), sync_ttl=3600)
+    index.upsert('AperoVN', [_record(1, '2024-01-02', ['AI Generate']),
+                             _record(2, '2024-01-03', ['AI Generate', 'Reviewed']),
+                             _record(3, '2024-01-04', ['Other'])])
+    index.mark_synced('AperoVN', ['AI Generate'], '2024-01-01', '2024-01-31')
+
+    # Truy vấn thêm label hoặc thu hẹp khoảng ngày vẫn nằm trong vùng đã đồng bộ
+    assert index.uncovered_spans('AperoVN', ['AI Generate', 'Reviewed'], '2024-01-02', '2024-01-20') == []
+    # Truy vấn bỏ label thì không được coi là đã đồng bộ
+    assert index.uncovered_spans('AperoVN', [], '2024-01-02', '2024-01-20') == [('2024-01-02', '2024-01-20')]
+    assert index.uncovered_spans('AperoVN', ['AI Generate'], '2023-12-30', '2024-02-02') == [
+        ('2023-12-30', '2023-12-31'), ('2024-02-01', '2024-02-02')]
+
+    assert [r['id'] for r in index.query('AperoVN', ['ai generate', 'Reviewed'], '2024-01-01', '2024-01-31')] == [2]
+    assert [r['id'] for r in index.query('AperoVN', 'AI Generate', '2024-01-03')] == [2]
+
+
+def test_indexed_fetch_only_crawls_uncovered_days(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'get_github', FakeGithub.client)
+    monkeypatch.setattr(app, '_pr_index', PRIndex(str(tmp_path / 'index.sqlite3'), sync_ttl=3600))
+    FakeGithub.prs = [make_pr(1, 'alice', 'Estimate Time: 2h', created='2024-05-02'),
+                      make_pr(2, 'bob', 'Estimate Time: 1h', created='2024-05-06')]
+    FakeGithub.queries = []
+
+    first = app.fetch_and_parse_prs_indexed('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-05')
+    assert [r['id'] for r in first['prs_data']] == [1]
+
+    second = app.fetch_and_parse_prs_indexed('AperoVN', ['AI Generate'], '2024-05-02', '2024-05-07')
+    assert [r['id'] for r in second['prs_data']] == [2, 1]
+    assert second['stats']['total_estimate'] == 3
+    assert FakeGithub.queries[-1].endswith('created:2024-05-06T00:00:00Z..2024-05-07T23:59:59Z')
+
+
+def test_daily_rollups_follow_upserts_and_deletes(tmp_path):
+    path = str(tmp_path / 'index.sqlite3')
+    index = PRIndex(path, sync_ttl=3600)
+    first = {**_record(1, '2024-01-02', ['AI Generate'], 'alice'), 'estimate_hours': 2, 'actual_hours': 4,
+             'project_id': 'AIP1'}
+    second = {**_record(2, '2024-01-03', ['AI Generate', 'bug'], 'bob'), 'estimate_hours': 1, 'actual_hours': 1,
+              'project_id': 'AIP1'}
+    index.upsert('AperoVN', [first, second])
+
+    stats = index.rollup_stats('AperoVN', ['AI Generate'], '2024-01-01', '2024-01-31')
+    assert (stats['total_prs'], stats['total_estimate'], stats['total_actual']) == (2, 3, 5)
+    assert stats['projects']['AIP1']['developers'] == ['alice', 'bob']
+    assert index.rollup_stats('AperoVN', 'bug', '2024-01-01')['developers'] == {
+        'bob': {'total_prs': 1, 'total_estimate': 1, 'total_actual': 1}}
+    assert index.rollup_stats('AperoVN', ['AI Generate', 'bug'], '2024-01-01') is None
+
+    # PR đổi ngày / thời gian / label: bucket cũ bị trừ, bucket mới được cộng
+    index.upsert('AperoVN', [{**second, 'created_at': '2024-02-01', 'actual_hours': 3, 'labels': ['AI Generate']}])
+    stats = index.rollup_stats('AperoVN', [], '2024-01-01', '2024-01-31')
+    assert list(stats['developers']) == ['alice']
+    assert index.rollup_stats('AperoVN', 'bug', '2024-01-01')['total_prs'] == 0
+    assert index.rollup_stats('AperoVN', 'AI Generate', '2024-01-01')['total_actual'] == 7
+
+    index.delete(1)
+    assert index.rollup_stats('AperoVN', 'AI Generate', '2024-01-01')['developers'] == {
+        'bob': {'total_prs': 1, 'total_estimate': 1, 'total_actual': 3}}
+
+    # Index cũ chưa có rollup được tính lại khi mở
+    with index._connect() as conn:
+        conn.execute('DELETE FROM daily_rollups')
+    assert PRIndex(path, sync_ttl=3600).rollup_stats('AperoVN', 'AI Generate', '2024-01-01')['total_actual'] == 3
+
+
+def test_synced_range_renders_from_rollups(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'get_github', FakeGithub.client)
+    monkeypatch.setattr(app, 'GITHUB_TOKEN', 'token')
+    monkeypatch.setattr(app, 'PR_INDEX_ENABLED', True)
+    monkeypatch.setattr(app, '_pr_index', PRIndex(str(tmp_path / 'index.sqlite3'), sync_ttl=3600))
+    monkeypatch.setattr(app, '_pr_cache', app.create_cache_backend('memory', str(tmp_path), 3600, 1 << 20))
+    FakeGithub.prs = [make_pr(1, 'alice', 'AIP1-1 Estimate Time: 2h Actual Time: 2h', created='2024-05-02')]
+    params = {'org': 'AperoVN', 'label': 'AI Generate', 'since': '2024-05-01', 'until': '2024-05-31'}
+    app.fetch_and_parse_prs_indexed('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-31')
+
+    # Cache kết quả trống nhưng index đã đồng bộ: trang được render ngay, không tạo job và không gọi GitHub
+    FakeGithub.queries = []
+    monkeypatch.setattr(app, 'submit_report_job', lambda *args: (_ for _ in ()).throw(AssertionError('job')))
+    response = app.app.test_client().get('/', query_string=params)
+    assert response.status_code == 200
+    assert b'alice' in response.data
+    assert FakeGithub.queries == []
+
+
+def test_range_ending_today_crawls_only_today(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'get_github', FakeGithub.client)
+    monkeypatch.setattr(app, 'GITHUB_TOKEN', 'token')
+    monkeypatch.setattr(app, 'PR_INDEX_ENABLED', True)
+    monkeypatch.setattr(app, '_pr_index', PRIndex(str(tmp_path / 'index.sqlite3'), sync_ttl=3600, open_day_ttl=0.05))
+    monkeypatch.setattr(app, '_pr_cache', app.create_cache_backend('memory', str(tmp_path), 3600, 1 << 20))
+    today = date.today()
+    since = (today - timedelta(days=3)).isoformat()
+    FakeGithub.prs = [make_pr(1, 'alice', 'AIP1-1 Estimate Time: 2h Actual Time: 2h',
+                              created=(today - timedelta(days=2)).isoformat())]
+    app.fetch_and_parse_prs_indexed('AperoVN', ['AI Generate'], since)
+    assert app._pr_index.uncovered_spans('AperoVN', ['AI Generate'], since) == []
+
+    # Hết hạn ngày hôm nay: trang mặc định (không có until) chỉ crawl ngày hôm nay rồi render từ rollup
+    time.sleep(0.1)
+    FakeGithub.prs.append(make_pr(2, 'bob', 'AIP1-2 Estimate Time: 1h Actual Time: 1h', created=today.isoformat()))
+    FakeGithub.queries = []
+    monkeypatch.setattr(app, 'submit_report_job', lambda *args: (_ for _ in ()).throw(AssertionError('job')))
+    monkeypatch.setattr(app.PRIndex, 'query', lambda *args: (_ for _ in ()).throw(AssertionError('query')))
+    response = app.app.test_client().get('/', query_string={'org': 'AperoVN', 'label': 'AI Generate',
+                                                            'since': since})
+    assert response.status_code == 200
+    assert b'alice' in response.data and b'bob' in response.data
+    assert FakeGithub.queries and all(today.strftime('%Y-%m-%d') in query for query in FakeGithub.queries)
@@ -0,0 +1,50 @@
+import random
+from types import SimpleNamespace
+
+from pr_parser import parse_pr_batch, parse_pr_info, parse_pr_info_legacy
+
+
+def make(title, body):
+    return SimpleNamespace(title=title, body=body)
+
+
+def test_parse_matches_issue_example():
+    body = """
+Issued tickets
+AIP201-106
+Estimate Time: 1,5h
+Actual Time: 1h
+
+Feature tickets
+AIP201-89
+Est Time: 3h
+Actual Time: 3h
+"""
+    assert parse_pr_info(make('Update', body)) == {
+        'issue_number': 'AIP201-106',
+        'project_id': 'AIP201',
+        'estimate_time': '3.0h',
+        'actual_time': '3.0h',
+        'estimate_hours': 3.0,
+        'actual_hours': 3.0
+    }
+
+
+def test_parse_keeps_legacy_quirks():
+    # Title được ưu tiên hơn body; số thập phân kèm m vẫn là giờ; không có dòng thời gian -> 0h
+    result = parse_pr_info(make('[aip7-1] Fix', 'AIP9-9\nOverestimate Time: 1,5m\nActual time 30p'))
+    assert result['issue_number'] == 'AIP7-1'
+    assert result['estimate_hours'] == 1.5
+    assert result['actual_hours'] == 0.5
+    assert parse_pr_info(make('Fix', None))['estimate_time'] == '0h'
+
+
+def test_parse_batch_matches_legacy_on_random_bodies():
+    rng = random.Random(7)
+    pieces = ['Estimate', 'Est', 'est', 'ESTIMATE', 'Actual', 'actual', ' ', '\t', '\n', 'Time', 'time', 'TİME',
+              'tıme', 'Eſt', ':', '1', '25', '1,5', '0.5', '.', 'h', 'H', 'm', 'p', 'P', 'AIP', 'aip', 'AİP', '12',
+              '-', '3', 'Đã test', 'x']
+    prs = [make(''.join(rng.choice(pieces) for _ in range(rng.randint(0, 8))),
+                ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 60))))
+           for _ in range(3000)]
+    assert parse_pr_batch(prs) == [parse_pr_info_legacy(pr) for pr in prs]
@@ -0,0 +1,62 @@
+import app
+from cache_backend import MemoryCacheBackend, _decode, _encode
+from pr_record import PRRecord, compact_record, deep_sizeof
+
+
+def make_record(i, creator='alice'):
+    return {
+        'id': i,
+        'title': f'PR {i}',
+        'issue_number': f'AIP1-{i}',
+        'project_id': 'AIP1',
+        'estimate_time': '1.5h',
+        'actual_time': '2.0h',
+        'estimate_hours': 1.5,
+        'actual_hours': 2.0,
+        # Tạo chuỗi mới cho mỗi bản ghi giống như khi parse từ JSON
+        'creator': ''.join(creator),
+        'created_at': '2024-05-02',
+        'repo': 'android-app',
+        'labels': ['AI Generate'],
+        'url': f'https://github.com/AperoVN/android-app/pull/{i}'
+    }
+
+
+def test_compact_record_reads_like_dict():
+    original = make_record(1)
+    record = compact_record(original)
+    assert isinstance(record, PRRecord)
+    assert record['created_at'] == '2024-05-02'
+    assert record['estimate_time'] == '1.5h' and record['actual_time'] == '2.0h'
+    assert record.get('missing', 'x') == 'x' and 'id' in record
+    assert dict(record) == {**original, 'labels': ('AI Generate',)}
+    assert compact_record(record) is record
+
+
+def test_repeated_strings_are_shared():
+    first, second = compact_record(make_record(1)), compact_record(make_record(2))
+    assert first['creator'] is second['creator']
+    assert first['labels'] is second['labels']
+
+
+def test_cache_roundtrip_keeps_compact_records():
+    records = [compact_record(make_record(i)) for i in range(3)]
+    decoded = _decode(_encode({'prs_data': records, 'timestamp': 1}))
+    assert all(isinstance(r, PRRecord) for r in decoded['prs_data'])
+    assert decoded['prs_data'] == records
+
+
+def test_compact_records_use_less_memory():
+    dicts = [make_record(i, creator=f'dev{i % 5}') for i in range(500)]
+    compact = [compact_record(r) for r in dicts]
+    assert deep_sizeof(compact) < deep_sizeof(dicts) * 0.6
+
+
+def test_cache_memory_endpoint(monkeypatch):
+    monkeypatch.setattr(app, '_pr_cache', MemoryCacheBackend(ttl=3600, max_bytes=10 * 1024 * 1024))
+    app._pr_cache.set('key', app.build_result([make_record(i) for i in range(10)], app.new_stats(), 10, 10))
+    stats = app.app.test_client().get('/cache-memory').json
+    entry, = stats['entries']
+    assert entry['records'] == 10 and entry['memory_bytes'] > 0
+    assert entry['bytes_per_record'] == round(entry['memory_bytes'] / 10, 1)
+    assert stats['total_memory_bytes'] == entry['memory_bytes']
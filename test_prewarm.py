@@ -0,0 +1,75 @@
+import time
+
+import app
+from cache_backend import MemoryCacheBackend
+from prewarm import PrewarmScheduler, QueryStats
+from test_delta_refresh import FakeGithub, make_pr
+
+
+def make_scheduler(tmp_path, locks, refreshed, ages, budget=lambda: True):
+    stats = QueryStats(str(tmp_path / 'prewarm.sqlite3'))
+    scheduler = PrewarmScheduler(stats, locks, lambda key, params: refreshed.append(key), ages.get,
+                                 budget, interval=60, top_n=2, window=3600, soft_ttl=600,
+                                 default_queries=lambda: [('default', ['AperoVN', ['AI Generate'], '', ''])])
+    return stats, scheduler
+
+
+def test_refreshes_top_queries_that_are_about_to_expire(tmp_path):
+    refreshed = []
+    # hot: sắp hết hạn; warm: còn tươi; cold: ít dùng, nằm ngoài top-N
+    ages = {'default': 10, 'hot': 590, 'warm': 100, 'cold': None}
+    stats, scheduler = make_scheduler(tmp_path, MemoryCacheBackend(60, 1 << 20), refreshed, ages)
+    for key, hits in (('hot', 5), ('warm', 3), ('cold', 1)):
+        for _ in range(hits):
+            stats.record(key, ['AperoVN', [key], '', ''])
+
+    assert scheduler.run_once() == 1
+    assert refreshed == ['hot']
+    assert stats.stats()['refreshed'] == 1
+
+
+def test_only_leader_runs_and_budget_share_is_respected(tmp_path):
+    locks = MemoryCacheBackend(60, 1 << 20)
+    refreshed = []
+    _, leader = make_scheduler(tmp_path, locks, refreshed, {})
+    _, follower = make_scheduler(tmp_path, locks, refreshed, {})
+    assert leader.run_once() == 1
+    assert follower.run_once() is None
+    assert refreshed == ['default']
+
+    stats, scheduler = make_scheduler(tmp_path / 'other', MemoryCacheBackend(60, 1 << 20), refreshed, {},
+                                      budget=lambda: False)
+    assert scheduler.run_once() == 0
+    assert stats.stats()['skipped_budget'] == 1
+
+
+def test_prewarm_warms_default_view(fake_app, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, '_query_stats', QueryStats(str(tmp_path / 'prewarm.sqlite3')))
+    FakeGithub.prs = [make_pr(1, 'alice', 'AIP1-1 Estimate Time: 1h', created=app.DEFAULT_SINCE_DATE)]
+    scheduler = PrewarmScheduler(app._query_stats, app._pr_cache, app.prewarm_refresh, app.prewarm_cache_age,
+                                 lambda: True, 60, 5, 3600, 600, app.default_prewarm_queries)
+    assert scheduler.run_once() == 1
+
+    (cache_key, params), = app.default_prewarm_queries()
+    assert app.get_usable_cached_result(*params)['stats']['total_prs'] == 1
+    data = app.app.test_client().get('/prewarm-stats').json
+    assert data['scheduler']['refreshed'] == 1
+
+
+def test_prewarm_age_follows_data_timestamp(fake_app, monkeypatch):
+    assert app.prewarm_cache_age('missing') is None
+    # Entry vừa được ghi lại (webhook/snapshot) nhưng dữ liệu đã cũ 900 giây
+    app._pr_cache.set('key', {'prs_data': [], 'timestamp': time.time() - 900})
+    peeks = []
+    peek = app._pr_cache.peek
+    monkeypatch.setattr(app._pr_cache, 'peek', lambda key: peeks.append(key) or peek(key))
+    assert 899 <= app.prewarm_cache_age('key') < 910
+    assert app._pr_cache.stats()['hits'] == 0
+
+    # Entry chưa đổi: không giải mã lại; entry được ghi lại thì đọc timestamp mới
+    assert 899 <= app.prewarm_cache_age('key') < 910
+    assert peeks == ['key']
+    time.sleep(0.01)
+    app._pr_cache.set('key', {'prs_data': [], 'timestamp': time.time() - 60})
+    assert 59 <= app.prewarm_cache_age('key') < 70
+    assert peeks == ['key', 'key']
@@ -0,0 +1,84 @@
+import gzip
+
+import app
+from label_index import LabelIndex
+from response_cache import ResponseCache, choose_encoding
+from test_delta_refresh import FakeGithub, make_pr
+
+PARAMS = {'org': 'AperoVN', 'label': 'AI Generate', 'since': '2024-05-01', 'until': '2024-05-31'}
+
+
+def test_choose_encoding_respects_quality():
+    bodies = {'identity': b'x' * 100, 'gzip': b'x' * 10, 'br': b'x' * 8}
+    assert choose_encoding('gzip, deflate, br', bodies) == 'br'
+    assert choose_encoding('gzip;q=1.0, br;q=0', bodies) == 'gzip'
+    assert choose_encoding('identity', bodies) == 'identity'
+    assert choose_encoding('*', {'identity': b'x', 'gzip': b'y'}) == 'gzip'
+
+
+def test_report_page_is_cached_until_data_changes(fake_app, monkeypatch):
+    monkeypatch.setattr(app, '_response_cache', ResponseCache(max_bytes=10 * 1024 * 1024))
+    monkeypatch.setattr(app, 'ASYNC_REPORTS', False)
+    monkeypatch.setattr(app, 'GITHUB_TOKEN', 'token')
+    FakeGithub.prs = [make_pr(i, 'alice', 'AIP1-1 Estimate Time: 1h', created='2024-05-02') for i in range(3)]
+    renders = []
+    render_result_page = app.render_result_page
+    monkeypatch.setattr(app, 'render_result_page', lambda *args: renders.append(args) or render_result_page(*args))
+    client = app.app.test_client()
+
+    assert client.get('/', query_string=PARAMS).status_code == 200
+    page = client.get('/', query_string=PARAMS, headers={'Accept-Encoding': 'gzip'})
+    assert page.headers['Content-Encoding'] == 'gzip'
+    assert b'Pull Request Analysis Results' in gzip.decompress(page.data)
+    etag = page.headers['ETag']
+
+    # Trang đã render được dùng lại, trình duyệt có ETag nhận 304
+    plain = client.get('/', query_string=PARAMS)
+    assert 'Content-Encoding' not in plain.headers and plain.headers['ETag'] != etag
+    not_modified = client.get('/', query_string=PARAMS, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert not_modified.status_code == 304 and not not_modified.data
+    assert len(renders) == 2
+
+    # Dữ liệu được làm mới (delta refresh, webhook...): trang được render lại với ETag mới
+    cache_key = app.create_cache_key('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-31')
+    new_pr = make_pr(99, 'bob', 'AIP1-2 Estimate Time: 2h', created='2024-05-03')
+    result = app.apply_pr_changes(app._pr_cache.get(cache_key),
+                                  [app.build_pr_record(new_pr, app.parse_pr_info(new_pr))])
+    app._pr_cache.set(cache_key, result)
+    refreshed = client.get('/', query_string=PARAMS, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert refreshed.status_code == 200 and refreshed.headers['ETag'] != etag
+    assert len(renders) == 3
+
+    # Render lại nhưng nội dung không đổi: ETag dựa trên nội dung nên vẫn là 304
+    app._pr_cache.set(cache_key, {**result, 'revision': 1})
+    etag = refreshed.headers['ETag']
+    assert client.get('/', query_string=PARAMS,
+                      headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 304
+    assert len(renders) == 4
+
+    charts = client.get('/api/charts', query_string=PARAMS)
+    assert client.get('/api/charts', query_string=PARAMS,
+                      headers={'If-None-Match': charts.headers['ETag']}).status_code == 304
+    assert app._response_cache.stats()['not_modified'] == 3
+
+
+def test_label_change_invalidates_report_page(fake_app, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, '_response_cache', ResponseCache(max_bytes=10 * 1024 * 1024))
+    monkeypatch.setattr(app, '_label_index', LabelIndex(str(tmp_path / 'labels.sqlite3'), 3600, 10))
+    monkeypatch.setattr(app, 'ASYNC_REPORTS', False)
+    monkeypatch.setattr(app, 'GITHUB_TOKEN', 'token')
+    FakeGithub.prs = [make_pr(1, 'alice', 'AIP1-1 Estimate Time: 1h', created='2024-05-02')]
+    app._label_index.replace_repo_labels('AperoVN', ['AI Generate'])
+    client = app.app.test_client()
+
+    client.get('/', query_string=PARAMS)
+    page = client.get('/', query_string=PARAMS)
+    # Thời gian phản hồi không được render vào trang có thể được cache
+    assert b'id="fetchTime"' in page.data
+    assert client.get('/', query_string=PARAMS,
+                      headers={'If-None-Match': page.headers['ETag']}).status_code == 304
+
+    # Label mới (webhook, làm mới label): trang được render lại với danh sách label mới
+    app._label_index.add_repo_label('AperoVN', 'Needs Review')
+    refreshed = client.get('/', query_string=PARAMS, headers={'If-None-Match': page.headers['ETag']})
+    assert refreshed.status_code == 200 and b'Needs Review' in refreshed.data
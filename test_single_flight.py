@@ -0,0 +1,136 @@
+import threading
+import time
+
+import app
+from test_delta_refresh import FakeGithub, make_pr
+
+
+class GatedFakeGithub(FakeGithub):
+    """Mỗi lần search báo đã bắt đầu (entered) rồi chờ test cho phép (allowed): test điều khiển tiến độ crawl
+    thay vì dựa vào thời gian chờ"""
+    entered = None
+    allowed = None
+
+    @classmethod
+    def reset(cls):
+        cls.entered = threading.Semaphore(0)
+        cls.allowed = threading.Semaphore(0)
+
+    def search_issues(self, query):
+        GatedFakeGithub.entered.release()
+        assert GatedFakeGithub.allowed.acquire(timeout=5), 'search was not allowed to run'
+        return super().search_issues(query)
+
+
+def _setup(monkeypatch):
+    GatedFakeGithub.reset()
+    monkeypatch.setattr(app, 'get_github', GatedFakeGithub.client)
+    FakeGithub.prs = [make_pr(1, 'alice', 'Estimate Time: 2h\nActual Time: 2h', created='2024-05-02')]
+
+
+def test_concurrent_cold_requests_share_one_fetch(fake_app, monkeypatch):
+    _setup(monkeypatch)
+    # 7 request đến sau + test: test chỉ cho fetch chạy tiếp khi mọi request đều đang chờ lần fetch đầu
+    followers = threading.Barrier(8)
+    wait = app._InflightFetch.wait
+
+    def follower_wait(call):
+        followers.wait(5)
+        return wait(call)
+
+    monkeypatch.setattr(app._InflightFetch, 'wait', follower_wait)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        app.fetch_and_parse_prs('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-31'))) for _ in range(8)]
+    threads[0].start()
+    assert GatedFakeGithub.entered.acquire(timeout=5)
+    for thread in threads[1:]:
+        thread.start()
+    followers.wait(5)
+    GatedFakeGithub.allowed.release(2)
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+    # Một lần fetch: 1 request đếm + 1 trang
+    assert len(FakeGithub.queries) == 2
+
+
+def test_stale_entry_served_while_refreshing(fake_app, monkeypatch):
+    _setup(monkeypatch)
+    # Lần fetch đầu và lần làm mới nền: mỗi lần một request đếm + một trang
+    GatedFakeGithub.allowed.release(4)
+    key = app.create_cache_key('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-31')
+    stale = app.fetch_and_parse_prs_internal('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-31')
+    stale['timestamp'] -= app.CACHE_SOFT_TTL + 1
+    app._pr_cache.set(key, stale)
+
+    assert app.fetch_and_parse_prs('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-31') is stale
+
+    deadline = time.time() + 5
+    while app._pr_cache.get(key)['timestamp'] == stale['timestamp'] and time.time() < deadline:
+        time.sleep(0.02)
+    assert app._pr_cache.get(key)['timestamp'] > stale['timestamp']
+
+
+def test_long_fetch_keeps_renewing_its_lease(fake_app, monkeypatch):
+    _setup(monkeypatch)
+    monkeypatch.setattr(app, 'FETCH_WAIT_TIMEOUT', 0.3)
+    monkeypatch.setattr(app, 'SEARCH_PAGE_SIZE', 1)
+    monkeypatch.setattr(app, 'CRAWL_WORKERS', 1)
+    FakeGithub.prs = [make_pr(i, 'alice', 'Estimate Time: 2h', created='2024-05-02') for i in range(12)]
+    key = app.create_cache_key('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-31')
+
+    fetch = threading.Thread(target=app.fetch_and_parse_prs,
+                             args=('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-31'))
+    fetch.start()
+    # Request đếm + 12 trang, mỗi trang mất 0.1s: tổng thời gian crawl dài hơn thời hạn khóa (0.3s)
+    # nhưng khóa vẫn được giữ nhờ gia hạn theo trang
+    for _ in range(13):
+        assert GatedFakeGithub.entered.acquire(timeout=5)
+        time.sleep(0.1)
+        assert app._pr_cache.is_locked(f'fetch:{key}')
+        GatedFakeGithub.allowed.release()
+    fetch.join()
+    assert not app._pr_cache.is_locked(f'fetch:{key}')
+    assert app._pr_cache.get(key)['stats']['total_prs'] == 12
+
+
+def test_cache_checks_and_lease_polls_are_not_counted(fake_app, monkeypatch):
+    _setup(monkeypatch)
+    GatedFakeGithub.allowed.release(2)
+    monkeypatch.setattr(app, 'RESPONSE_CACHE_ENABLED', False)
+    monkeypatch.setattr(app, 'GITHUB_TOKEN', 'token')
+    params = {'org': 'AperoVN', 'label': 'AI Generate', 'since': '2024-05-01', 'until': '2024-05-31'}
+    app.fetch_and_parse_prs('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-31')
+
+    # Kiểm tra trước trong render_index không tính thêm một hit
+    before = app._pr_cache.stats()
+    assert app.app.test_client().get('/', query_string=params).status_code == 200
+    assert app._pr_cache.stats()['hits'] == before['hits'] + 1
+    assert app._pr_cache.stats()['misses'] == before['misses']
+
+    # Request chờ worker khác fetch: các lần poll không tính là miss
+    key = app.create_cache_key('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-30')
+    assert app._pr_cache.try_lock(f'fetch:{key}', 'other-worker', 60)
+    polls = threading.Semaphore(0)
+    peek_cached = app.peek_cached
+
+    def counted_peek(cache_key):
+        if cache_key == key:
+            polls.release()
+        return peek_cached(cache_key)
+
+    monkeypatch.setattr(app, 'peek_cached', counted_peek)
+    before = app._pr_cache.stats()
+    waiter = threading.Thread(target=app.fetch_and_parse_prs,
+                              args=('AperoVN', ['AI Generate'], '2024-05-01', '2024-05-30'))
+    waiter.start()
+    for _ in range(2):
+        assert polls.acquire(timeout=5)
+    app._pr_cache.set(key, {'prs_data': [], 'stats': {}, 'timestamp': time.time()})
+    app._pr_cache.unlock(f'fetch:{key}', 'other-worker')
+    waiter.join(5)
+    assert not waiter.is_alive()
+    assert app._pr_cache.stats()['misses'] == before['misses'] + 1
@@ -0,0 +1,153 @@
+import os
+import struct
+import time
+
+import app
+from cache_backend import MemoryCacheBackend, SQLiteCacheBackend, _encode
+from label_index import LabelIndex
+from pr_record import compact_record
+from snapshot import SnapshotReader, SnapshotRestoringCache, write_snapshot
+from test_delta_refresh import FakeGithub, make_pr
+
+
+def record(pr_id):
+    return compact_record({'id': pr_id, 'title': 'PR', 'issue_number': 'AIP1-1', 'project_id': 'AIP1',
+                           'estimate_time': '1h', 'actual_time': '2h', 'estimate_hours': 1, 'actual_hours': 2,
+                           'creator': 'alice', 'created_at': '2024-05-02', 'repo': 'app', 'labels': ['AI Generate'],
+                           'url': f'https://github.com/AperoVN/app/pull/{pr_id}'})
+
+
+def test_restore_is_lazy_and_keeps_age(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    old = MemoryCacheBackend(ttl=3600, max_bytes=10 * 1024 * 1024)
+    old.set('a', {'prs_data': [record(1)], 'timestamp': 100.0})
+    old.set('b', {'prs_data': [], 'timestamp': 200.0}, ttl=60)
+    old.set('gone', {'prs_data': []}, ttl=0.01)
+    time.sleep(0.02)
+    assert write_snapshot(path, old.dump()) == 2
+
+    snapshot = SnapshotReader.open(path)
+    cache = SnapshotRestoringCache(MemoryCacheBackend(ttl=3600, max_bytes=10 * 1024 * 1024), snapshot)
+    assert sorted(cache.keys()) == ['a', 'b']
+    # Chưa có entry nào được giải mã cho tới khi được dùng
+    assert cache.stats()['entries'] == 0
+    assert cache.stored_at('a') == old.stored_at('a')
+
+    restored = cache.get('a')
+    assert restored['timestamp'] == 100.0 and restored['prs_data'][0]['url'].endswith('/pull/1')
+    assert cache.stored_at('a') == old.stored_at('a')
+    assert cache.snapshot_stats()['restored'] == 1 and cache.stats()['entries'] == 1
+    # Thời hạn còn lại của entry được giữ nguyên
+    assert cache.get('b')['timestamp'] == 200.0
+    assert 0 < cache._backend._entries['b'][2] - time.time() <= 60
+
+    # Ghi đè/xóa key không bị snapshot cũ ghi lại
+    cache.delete('a')
+    assert cache.get('a') is None
+    cache.clear()
+    assert cache.keys() == []
+    snapshot.close()
+
+
+def test_merge_keeps_other_workers_entries_and_labels(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    write_snapshot(path, [('a', _encode({'v': 1}), 1.0, time.time() + 60),
+                          ('b', _encode({'v': 1}), 1.0, time.time() + 60)],
+                   {'AperoVN': {'refreshed_at': 1.0, 'labels': [['bug', 1, 0]]}}, merge=True)
+    write_snapshot(path, [('b', _encode({'v': 2}), 2.0, time.time() + 60)],
+                   {'Other': {'refreshed_at': 2.0, 'labels': []}}, merge=True)
+
+    snapshot = SnapshotReader.open(path)
+    values = {key: SnapshotRestoringCache(MemoryCacheBackend(3600, 1 << 20), snapshot).get(key)['v']
+              for key in ('a', 'b')}
+    assert values == {'a': 1, 'b': 2}
+    assert set(snapshot.labels) == {'AperoVN', 'Other'}
+    snapshot.close()
+
+    # Không merge: snapshot chỉ còn dữ liệu vừa ghi
+    write_snapshot(path, [('c', _encode({'v': 3}), 3.0, time.time() + 60)])
+    snapshot = SnapshotReader.open(path)
+    assert list(snapshot.entries) == ['c'] and snapshot.labels == {}
+    snapshot.close()
+
+
+def test_invalid_snapshot_is_ignored(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    assert SnapshotReader.open(path) is None
+    open(path, 'wb').close()
+    assert SnapshotReader.open(path) is None
+
+    write_snapshot(path, [('a', _encode({'v': 1}), 1.0, time.time() + 60)])
+    data = bytearray(open(path, 'rb').read())
+    # Phiên bản định dạng khác
+    struct.pack_into('<I', data, len(data) - 12, 99)
+    open(path, 'wb').write(bytes(data))
+    assert SnapshotReader.open(path) is None
+    # File ghi dở (mất footer)
+    open(path, 'wb').write(bytes(data[:-5]))
+    assert SnapshotReader.open(path) is None
+
+
+def test_sqlite_cache_loads_only_missing_entries(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    old = SQLiteCacheBackend(str(tmp_path / 'old.sqlite3'), ttl=3600, max_bytes=1 << 20)
+    old.set('a', {'v': 'old'})
+    old.set('b', {'v': 'old'})
+    write_snapshot(path, old.dump())
+
+    cache = SQLiteCacheBackend(str(tmp_path / 'new.sqlite3'), ttl=3600, max_bytes=1 << 20)
+    cache.set('a', {'v': 'new'})
+    snapshot = SnapshotReader.open(path)
+    assert cache.load(snapshot.iter_entries()) == 1
+    snapshot.close()
+    assert cache.get('a') == {'v': 'new'} and cache.get('b') == {'v': 'old'}
+    assert cache.stored_at('b') == old.stored_at('b')
+
+
+def test_restarted_worker_serves_restored_results(fake_app, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'CACHE_BACKEND', 'memory')
+    monkeypatch.setattr(app, 'SNAPSHOT_ENABLED', True)
+    monkeypatch.setattr(app, 'SNAPSHOT_PATH', str(tmp_path / 'snapshot.bin'))
+    monkeypatch.setattr(app, '_label_index', LabelIndex(str(tmp_path / 'labels.sqlite3'), 3600, 20))
+    FakeGithub.prs = [make_pr(i, 'alice', 'AIP1-1 Estimate Time: 1h', created='2024-05-02') for i in range(3)]
+
+    result = app.fetch_and_parse_prs('AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')
+    assert app.save_snapshot() == 1
+    FakeGithub.queries = []
+
+    # Worker mới: cache và index label trống
+    monkeypatch.setattr(app, '_pr_cache', MemoryCacheBackend(ttl=3600, max_bytes=10 * 1024 * 1024))
+    monkeypatch.setattr(app, '_label_index', LabelIndex(str(tmp_path / 'labels-new.sqlite3'), 3600, 20))
+    app.restore_snapshot()
+    assert isinstance(app._pr_cache, SnapshotRestoringCache)
+    assert app._label_index.get('AperoVN')[0] == ['AI Generate']
+
+    restored = app.fetch_and_parse_prs('AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')
+    assert FakeGithub.queries == []
+    assert restored['stats'] == result['stats'] and restored['timestamp'] == result['timestamp']
+
+    # Xóa cache cũng xóa snapshot
+    assert app.app.test_client().get('/clear-cache').status_code == 200
+    assert not os.path.exists(app.SNAPSHOT_PATH)
+
+
+def test_worker_saves_only_entries_written_since_last_save(fake_app, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'CACHE_BACKEND', 'memory')
+    monkeypatch.setattr(app, 'SNAPSHOT_PATH', str(tmp_path / 'snapshot.bin'))
+    monkeypatch.setattr(app, '_snapshot_since', 0)
+    monkeypatch.setattr(app, '_label_index', LabelIndex(str(tmp_path / 'labels.sqlite3'), 3600, 20))
+    saved = []
+    write = app.write_snapshot
+    # Ghi lại key của các entry được serialize cho snapshot
+    monkeypatch.setattr(app, 'write_snapshot', lambda path, entries, *args, **kwargs: write(
+        path, [e for e in entries if not saved.append(e[0])], *args, **kwargs))
+    FakeGithub.prs = [make_pr(1, 'alice', 'AIP1-1 Estimate Time: 1h', created='2024-05-02')]
+
+    app.fetch_and_parse_prs('AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')
+    assert app.save_snapshot() == 1 and len(saved) == 1
+
+    # Không có gì mới: snapshot giữ entry cũ mà không serialize lại
+    assert app.save_snapshot() == 1 and len(saved) == 1
+
+    app.fetch_and_parse_prs('AperoVN', 'AI Generate', '2024-05-01', '2024-05-15')
+    assert app.save_snapshot() == 2 and len(saved) == 2
@@ -0,0 +1,160 @@
+import glob
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+
+import app
+from label_index import LabelIndex
+from pr_index import PRIndex
+from test_delta_refresh import FakeGithub, make_pr
+from webhooks import WebhookQueue, verify_signature
+
+SECRET = 'webhook-secret'
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'webhook_payloads')
+
+
+def signed_post(client, event, body, secret=SECRET):
+    signature = 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return client.post('/webhooks/github', data=body, content_type='application/json',
+                       headers={'X-GitHub-Event': event, 'X-Hub-Signature-256': signature})
+
+
+def setup_app(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, '_label_index', LabelIndex(str(tmp_path / 'labels.sqlite3'), ttl=3600, max_orgs=5))
+    monkeypatch.setattr(app, '_webhook_queue', WebhookQueue(app.handle_webhook_event, 10))
+    monkeypatch.setattr(app, 'GITHUB_WEBHOOK_SECRET', SECRET)
+
+
+def test_verify_signature():
+    body = b'{"action": "opened"}'
+    signature = 'sha256=' + hmac.new(b's', body, hashlib.sha256).hexdigest()
+    assert verify_signature('s', body, signature)
+    assert not verify_signature('other', body, signature)
+    assert not verify_signature('s', body, signature[len('sha256='):])
+    assert not verify_signature('', body, signature)
+
+
+def test_rejects_unsigned_and_unconfigured(fake_app, monkeypatch, tmp_path):
+    setup_app(monkeypatch, tmp_path)
+    client = app.app.test_client()
+    assert signed_post(client, 'pull_request', b'{}', secret='wrong').status_code == 401
+    assert signed_post(client, 'ping', b'{"zen": "ok"}').status_code == 200
+
+    monkeypatch.setattr(app, 'GITHUB_WEBHOOK_SECRET', '')
+    assert signed_post(client, 'pull_request', b'{}').status_code == 503
+    assert app._webhook_queue.stats()['received'] == 0
+
+
+def test_full_queue_returns_503(fake_app, monkeypatch, tmp_path):
+    setup_app(monkeypatch, tmp_path)
+    monkeypatch.setattr(app, '_webhook_queue', WebhookQueue(app.handle_webhook_event, 1))
+    # Chiếm chỗ trong hàng đợi mà không khởi động thread xử lý
+    app._webhook_queue._queue.put_nowait(('label', {}))
+    response = signed_post(app.app.test_client(), 'label', b'{"action": "created"}')
+    assert response.status_code == 503
+    assert app._webhook_queue.stats()['dropped'] == 1
+
+
+def test_replayed_payloads_update_cached_results(fake_app, monkeypatch, tmp_path):
+    setup_app(monkeypatch, tmp_path)
+    FakeGithub.prs = [make_pr(i, 'bob', 'AIP1-1 Estimate Time: 1h Actual Time: 2h', created='2024-05-02')
+                      for i in range(1, 4)]
+    cache_key = app.create_cache_key('AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')
+    app.refresh_cache_entry(cache_key, 'AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')
+    # Entry của org khác không bị động tới
+    other_key = app.create_cache_key('OtherOrg', 'AI Generate', '2024-05-01', '2024-05-31')
+    app.refresh_cache_entry(other_key, 'OtherOrg', 'AI Generate', '2024-05-01', '2024-05-31')
+    original = app._pr_cache.get(cache_key)
+    client = app.app.test_client()
+
+    snapshots = []
+    for path in sorted(glob.glob(os.path.join(PAYLOAD_DIR, '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            recorded = json.load(f)
+        response = signed_post(client, recorded['event'], json.dumps(recorded['payload']).encode('utf-8'))
+        assert response.status_code == 202
+        app._webhook_queue.join()
+        snapshots.append(app._pr_cache.get(cache_key))
+
+    opened, edited, labeled, unlabeled = snapshots
+    new_pr = next(r for r in opened['prs_data'] if r['id'] == 9000501)
+    assert (new_pr['creator'], new_pr['estimate_hours'], new_pr['actual_hours']) == ('alice', 2.0, 1.5)
+    assert opened['stats']['total_actual'] == original['stats']['total_actual'] + 1.5
+    assert opened['stats']['developers']['alice']['total_prs'] == 1
+    assert opened['revision'] == 1 and opened['timestamp'] == original['timestamp']
+
+    # PR được sửa: thống kê trừ giá trị cũ và cộng giá trị mới
+    assert edited['stats']['total_actual'] == original['stats']['total_actual'] + 3
+    assert len(edited['prs_data']) == len(original['prs_data']) + 1
+
+    assert 'Needs QA' in app._label_index.get('AperoVN')[0]
+
+    # Gỡ label của truy vấn: PR bị loại khỏi kết quả
+    assert [r['id'] for r in unlabeled['prs_data']] == [r['id'] for r in original['prs_data']]
+    assert unlabeled['stats']['total_actual'] == original['stats']['total_actual']
+    assert 'alice' not in unlabeled['stats']['developers']
+    assert labeled['revision'] == 2 and unlabeled['revision'] == 3
+
+    assert app._pr_cache.get(other_key).get('revision') is None
+    assert app._webhook_queue.stats() == {'received': 4, 'processed': 4, 'errors': 0, 'dropped': 0, 'queued': 0}
+
+
+def test_webhook_matches_search_records_by_url(fake_app, monkeypatch, tmp_path):
+    setup_app(monkeypatch, tmp_path)
+    monkeypatch.setattr(app, 'PR_INDEX_ENABLED', True)
+    monkeypatch.setattr(app, '_pr_index', PRIndex(str(tmp_path / 'index.sqlite3'), sync_ttl=3600))
+    FakeGithub.prs = [make_pr(i, 'bob', 'AIP1-1 Estimate Time: 1h Actual Time: 2h', created='2024-05-02')
+                      for i in range(1, 4)]
+    cache_key = app.create_cache_key('AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')
+    original = app.refresh_cache_entry(cache_key, 'AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')
+
+    # Webhook chứa id pull request, khác id issue mà search REST trả về
+    payload = {'action': 'edited', 'organization': {'login': 'AperoVN'}, 'pull_request': {
+        'id': 7000002, 'title': 'PR', 'body': 'AIP1-1 Estimate Time: 1h Actual Time: 5h',
+        'created_at': '2024-05-02T00:00:00Z', 'html_url': 'https://github.com/AperoVN/repo/pull/2',
+        'user': {'login': 'bob'}, 'labels': [{'name': 'AI Generate'}]}}
+    assert signed_post(app.app.test_client(), 'pull_request', json.dumps(payload).encode('utf-8')).status_code == 202
+    app._webhook_queue.join()
+
+    edited = app._pr_cache.get(cache_key)
+    assert len(edited['prs_data']) == 3
+    assert edited['stats']['developers']['bob'] == {'total_prs': 3, 'total_estimate': 3, 'total_actual': 9}
+    assert edited['stats']['total_actual'] == original['stats']['total_actual'] + 3
+    indexed = app._pr_index.query('AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')
+    assert sorted(r['id'] for r in indexed) == [1, 2, 3]
+    assert app._pr_index.rollup_stats('AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')['total_actual'] == 9
+
+    # PR mới từ webhook rồi được search trả về với id issue: index không giữ hai bản
+    app._pr_index.upsert('AperoVN', [dict(indexed[0], id=7000099, url='https://github.com/AperoVN/repo/pull/99')])
+    app._pr_index.upsert('AperoVN', [dict(indexed[0], id=99, url='https://github.com/AperoVN/repo/pull/99')])
+    assert app._pr_index.find_id('https://github.com/AperoVN/repo/pull/99') == 99
+    assert len(app._pr_index.query('AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')) == 4
+
+
+def test_webhook_update_skips_other_orgs_and_waits_for_fetch_lease(fake_app, monkeypatch, tmp_path):
+    setup_app(monkeypatch, tmp_path)
+    FakeGithub.prs = [make_pr(i, 'bob', 'AIP1-1 Estimate Time: 1h', created='2024-05-02') for i in range(1, 3)]
+    cache_key = app.create_cache_key('AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')
+    app.refresh_cache_entry(cache_key, 'AperoVN', 'AI Generate', '2024-05-01', '2024-05-31')
+    app.refresh_cache_entry(app.create_cache_key('OtherOrg', 'AI Generate', '2024-05-01', '2024-05-31'),
+                            'OtherOrg', 'AI Generate', '2024-05-01', '2024-05-31')
+    assert app.cache_key_org(cache_key) == 'AperoVN'
+    assert app.cache_key_org('graphql:AperoVN_type: bug_2024-05-01') == 'AperoVN'
+    record = dict(app._pr_cache.get(cache_key)['prs_data'][0], actual_hours=5)
+    before = app._pr_cache.stats()
+
+    # Một lần fetch đang giữ khóa của key: webhook chờ tới khi fetch xong rồi mới sửa entry
+    assert app._pr_cache.try_lock(f'fetch:{cache_key}', 'other-worker', 60)
+    worker = threading.Thread(target=app.apply_pull_request_event, args=('AperoVN', dict(record)))
+    worker.start()
+    time.sleep(0.3)
+    assert app._pr_cache.peek(cache_key)[0].get('revision') is None
+    app._pr_cache.unlock(f'fetch:{cache_key}', 'other-worker')
+    worker.join(5)
+
+    assert app._pr_cache.peek(cache_key)[0]['revision'] == 1
+    after = app._pr_cache.stats()
+    assert (after['hits'], after['misses']) == (before['hits'], before['misses'])
@@ -0,0 +1,85 @@
+"""Nhận webhook GitHub (pull_request, label) và xử lý trên hàng đợi nền"""
+import hashlib
+import hmac
+import queue
+import threading
+from datetime import datetime
+
+from github_search import _Named
+
+# Các event được xử lý; event khác được nhận nhưng bỏ qua
+WEBHOOK_EVENTS = ('pull_request', 'label', 'ping')
+
+
+def verify_signature(secret, body, signature):
+    """Kiểm tra header X-Hub-Signature-256 (HMAC-SHA256 của body với secret)"""
+    if not secret or not signature or not signature.startswith('sha256='):
+        return False
+    expected = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len('sha256='):])
+
+
+class WebhookPullRequest:
+    """PR lấy từ payload webhook - có cùng các thuộc tính như Issue của PyGithub mà app sử dụng"""
+    __slots__ = ('id', 'title', 'body', 'created_at', 'html_url', 'user', 'labels')
+
+    def __init__(self, data):
+        self.id = data['id']
+        self.title = data['title']
+        self.body = data.get('body') or ''
+        self.created_at = datetime.strptime(data['created_at'], '%Y-%m-%dT%H:%M:%SZ')
+        self.html_url = data['html_url']
+        self.user = _Named(login=(data.get('user') or {}).get('login', 'ghost'))
+        self.labels = [_Named(name=label['name']) for label in data.get('labels', [])]
+
+
+class WebhookQueue:
+    """Hàng đợi event webhook với một thread xử lý - endpoint trả về ngay sau khi đưa event vào hàng đợi"""
+
+    def __init__(self, handler, maxsize):
+        self.handler = handler
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._counters = {'received': 0, 'processed': 0, 'errors': 0, 'dropped': 0}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def submit(self, event, payload):
+        """Đưa event vào hàng đợi; trả về False nếu hàng đợi đã đầy"""
+        self._count('received')
+        try:
+            self._queue.put_nowait((event, payload))
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._start()
+        return True
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='webhook-worker', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            event, payload = self._queue.get()
+            try:
+                self.handler(event, payload)
+                self._count('processed')
+            except Exception as e:
+                self._count('errors')
+                print(f"Error processing {event} webhook: {e}")
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """Chờ xử lý hết các event đang có (dùng cho test và script replay)"""
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, 'queued': self._queue.qsize()}